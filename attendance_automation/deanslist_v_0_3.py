@@ -8,26 +8,69 @@ from datetime import datetime
 import time
 import os
 
-def deanslist_automation():
-    """
-    This script automates logging into Deanslist, selecting students from an
-    Excel file, and recording their tardiness.
-    """
-    # --- Load Credentials ---
+# --- Configuration ---
+CREDENTIALS_FILE = 'credentials.json'
+DEANSLIST_BASE_URL = "https://ednovate.deanslistsoftware.com"
+DEANSLIST_LOGIN_URL = f"{DEANSLIST_BASE_URL}/login.php?al=%2F"
+TARDY_BEHAVIOR_NAME = "Tardy to school"
+
+def load_deanslist_credentials():
+    """Loads the 'deanslist' section ('username', 'password') of credentials.json."""
     try:
-        with open('credentials.json', 'r') as f:
+        with open(CREDENTIALS_FILE, 'r') as f:
             credentials = json.load(f)
-        deanslist_credentials = credentials.get('deanslist', {})
-        username = deanslist_credentials.get('username')
-        password = deanslist_credentials.get('password')
-
-        if not username or not password:
-            print("❌ Deanslist username or password not found in credentials.json")
-            return
     except FileNotFoundError:
-        print("❌ Error: credentials.json file not found.")
-        return
+        print(f"❌ Error: {CREDENTIALS_FILE} file not found.")
+        return None
 
+    deanslist_credentials = credentials.get('deanslist', {})
+    if not deanslist_credentials.get('username') or not deanslist_credentials.get('password'):
+        print(f"❌ Deanslist username or password not found in {CREDENTIALS_FILE}")
+        return None
+    return deanslist_credentials
+
+def load_tardy_students():
+    """
+    Reads today's daily Raptor master report and returns the unique names of
+    the students to record as tardy.
+    """
+    today_date = datetime.now().strftime('%Y-%m-%d')
+    excel_file = f'daily_raptor_report_master/daily_raptor_master_report_{today_date}.xlsx'
+
+    if not os.path.exists(excel_file):
+        print(f"❌ Error: The file {excel_file} was not found.")
+        return None
+
+    print(f"📄 Reading students from {excel_file}...")
+    df = pd.read_excel(excel_file)
+
+    if 'Full Name' not in df.columns:
+        print("❌ Error: 'Full Name' column not found in the Excel file.")
+        return None
+
+    student_names = []
+    for name in df['Full Name'].unique():
+        if pd.notna(name) and str(name).strip() and str(name).strip() not in student_names:
+            student_names.append(str(name).strip())
+    print(f"Found {len(student_names)} unique students to process.")
+    return student_names
+
+def confirm_submission(message):
+    """Asks the user to confirm before anything is saved. Returns False on 'q'."""
+    while True:
+        user_input = input(f"\n{message} Press 'Enter' to save and submit, or type 'q' to quit: ").lower()
+        if user_input == 'q':
+            print("🛑 Submission cancelled by user.")
+            return False
+        if user_input == '':
+            return True
+
+def record_tardies_via_ui(deanslist_credentials, student_names):
+    """
+    Records the tardy behavior by driving the Deanslist tracker in Chrome:
+    Record Student Data -> All Students -> Behavior(s) -> Tardy to school ->
+    Student(s), then clicks each student and saves.
+    """
     # --- Initialize WebDriver ---
     options = webdriver.ChromeOptions()
     # options.add_argument('--headless')  # Uncomment to run without a browser window
@@ -36,37 +79,28 @@ def deanslist_automation():
 
     try:
         # --- Login ---
-        print("🚀 Starting Deanslist automation...")
-        driver.get("https://ednovate.deanslistsoftware.com/login.php?al=%2F")
+        driver.get(DEANSLIST_LOGIN_URL)
         driver.maximize_window()
-        
+
         print("🔑 Logging in...")
-        wait.until(EC.presence_of_element_located((By.NAME, "username"))).send_keys(username)
-        driver.find_element(By.NAME, "pw").send_keys(password)
+        wait.until(EC.presence_of_element_located((By.NAME, "username"))).send_keys(deanslist_credentials['username'])
+        driver.find_element(By.NAME, "pw").send_keys(deanslist_credentials['password'])
         driver.find_element(By.NAME, "submit").click()
         print("✅ Login successful!")
 
         # --- Navigate the Menu ---
-        # 1. Click "Record Student Data" tab
-
-# --- OPTION 1: Find by Text (Most Recommended) ---
-# This is often the most reliable method. It finds the div with the class 'nav-tab'
-# that also contains the exact text "Record Student Data".
-# The `normalize-space()` function handles any extra whitespace in the HTML.
+        # 1. Click "Record Student Data" tab. Finding it by its text is the most
+        # reliable option; the icon inside the tab is the fallback.
+        print(" navigating to 'Record Student Data'...")
         try:
             record_data_tab = wait.until(
-                EC.element_to_be_clickable((By.XPATH, "//div[contains(@class, 'nav-tab') and normalize-space()='Record Student Data']")))
-        record_data_tab.click()
-        print("Successfully clicked the tab using text content.")
-
-            
+                EC.element_to_be_clickable((By.XPATH, "//div[contains(@class, 'nav-tab') and normalize-space()='Record Student Data']"))
+            )
         except Exception as e:
-        print(f"Error with Option 1 (Find by Text): {e}")
-
-        print(" navigating to 'Record Student Data'...")
-        record_data_tab = wait.until(
-            EC.element_to_be_clickable((By.XPATH, "//div[contains(@class, 'nav-tab') and .//i[contains(@class, 'fa-cubes')]]"))
-        )
+            print(f"Could not find the tab by its text ({e}). Trying the tab icon...")
+            record_data_tab = wait.until(
+                EC.element_to_be_clickable((By.XPATH, "//div[contains(@class, 'nav-tab') and .//i[contains(@class, 'fa-cubes')]]"))
+            )
         record_data_tab.click()
 
         # 2. Click "All Students"
@@ -75,7 +109,7 @@ def deanslist_automation():
             EC.element_to_be_clickable((By.XPATH, "//td[@class='click' and normalize-space()='All Students']"))
         )
         all_students_roster.click()
-        
+
         # 3. Click "Behavior(s)" section
         print(" selecting 'Behavior(s)'...")
         behavior_section = wait.until(
@@ -84,9 +118,9 @@ def deanslist_automation():
         behavior_section.click()
 
         # 4. Click "Tardy to school"
-        print(" selecting 'Tardy to school'...")
+        print(f" selecting '{TARDY_BEHAVIOR_NAME}'...")
         tardy_to_school = wait.until(
-            EC.element_to_be_clickable((By.XPATH, "//td[contains(@class, 'cp-behavior') and normalize-space()='Tardy to school']"))
+            EC.element_to_be_clickable((By.XPATH, f"//td[contains(@class, 'cp-behavior') and normalize-space()='{TARDY_BEHAVIOR_NAME}']"))
         )
         tardy_to_school.click()
 
@@ -97,32 +131,13 @@ def deanslist_automation():
         )
         students_section.click()
 
-        # --- Process Students from Excel ---
-        today_date = datetime.now().strftime('%Y-%m-%d')
-        excel_file = f'daily_raptor_report_master/daily_raptor_master_report_{today_date}.xlsx'
-        
-        if not os.path.exists(excel_file):
-            print(f"❌ Error: The file {excel_file} was not found.")
-            driver.quit()
-            return
-            
-        print(f"📄 Reading student names from {excel_file}...")
-        df = pd.read_excel(excel_file)
-        
-        if 'Full Name' not in df.columns:
-            print("❌ Error: 'Full Name' column not found in the Excel file.")
-            driver.quit()
-            return
-            
-        student_names = [name for name in df['Full Name'].unique() if pd.notna(name) and str(name).strip()]
-        print(f"找到了 {len(student_names)} unique students to process.")
-
+        # --- Select Students ---
         not_found_students = []
         for name in student_names:
             try:
                 # Use a specific XPath to find the student by their exact name
                 student_element = wait.until(
-                    EC.element_to_be_clickable((By.XPATH, f"//td[contains(@class, 'click') and normalize-space()='{name.strip()}']"))
+                    EC.element_to_be_clickable((By.XPATH, f"//td[contains(@class, 'click') and normalize-space()='{name}']"))
                 )
                 student_element.click()
                 print(f"  - Selected: {name}")
@@ -137,14 +152,9 @@ def deanslist_automation():
             print("------------------------------------------")
 
         # --- Final User Confirmation ---
-        while True:
-            user_input = input("\nAll found students have been selected. Press 'Enter' to save and submit, or type 'q' to quit: ").lower()
-            if user_input == 'q':
-                print("🛑 Submission cancelled by user.")
-                return
-            if user_input == '':
-                break
-        
+        if not confirm_submission("All found students have been selected."):
+            return
+
         # --- Save the Form ---
         print("💾 Saving the form...")
         save_button = wait.until(EC.element_to_be_clickable((By.ID, "els-track-save")))
@@ -155,10 +165,29 @@ def deanslist_automation():
 
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
-    
+
     finally:
         print("Closing the browser.")
         driver.quit()
 
+def deanslist_automation():
+    """
+    This script automates logging into Deanslist, selecting students from an
+    Excel file, and recording their tardiness.
+    """
+    print("🚀 Starting Deanslist automation...")
+    deanslist_credentials = load_deanslist_credentials()
+    if not deanslist_credentials:
+        return
+
+    student_names = load_tardy_students()
+    if student_names is None:
+        return
+    if not student_names:
+        print("No students to record. Exiting.")
+        return
+
+    record_tardies_via_ui(deanslist_credentials, student_names)
+
 if __name__ == "__main__":
     deanslist_automation()
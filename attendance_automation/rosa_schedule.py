@@ -0,0 +1,168 @@
+import json
+import os
+from bisect import bisect_left, bisect_right
+from datetime import datetime, time as dt_time
+from functools import lru_cache
+import numpy as np
+
+# --- Configuration ---
+# Period tables and the date -> schedule calendar. Times are written the way
+# the school publishes them ("08:30 AM"); they are compiled to minutes after
+# midnight once, when the file is loaded.
+SCHEDULE_DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rosa_schedules.json')
+# Day keys used by the day menu, indexed by datetime.weekday() (Monday = 0)
+WEEKDAY_DAY_KEYS = ["M", "T", "W", "H", "F"]
+# Schedule name for days without school
+NO_SCHOOL_SCHEDULE = "none"
+
+# --- Compiled Schedules ---
+# Each schedule keeps its periods in order plus two sorted integer arrays:
+# period start minutes and period end minutes. A period's late-arrival window
+# runs from the end of the previous period (the start of the day for the first
+# one) to its own end, so the end minutes are also the window boundaries.
+# "Which period is it at T" and "whose late-arrival window does a sign-in at T
+# fall into" are then one bisect each, and a whole column of sign-in times is
+# binned with a single numpy searchsorted.
+
+@lru_cache(maxsize=None)
+def parse_time_to_minutes(time_str):
+    """'01:06 PM' -> 786. Raises ValueError for anything not in HH:MM AM/PM form."""
+    parsed = datetime.strptime(time_str.strip(), "%I:%M %p")
+    return parsed.hour * 60 + parsed.minute
+
+def minutes_to_time(minutes):
+    """786 -> datetime.time(13, 6)"""
+    return dt_time(minutes // 60, minutes % 60)
+
+class CompiledSchedule:
+    """One day's periods with integer-minute boundaries for bisect lookups."""
+
+    def __init__(self, name, period_rows):
+        self.name = name
+        self.periods = []
+        for index, row in enumerate(period_rows):
+            start_minute = parse_time_to_minutes(row['start'])
+            end_minute = parse_time_to_minutes(row['end'])
+            if end_minute <= start_minute:
+                raise ValueError(f"Schedule '{name}': {row['id']} ends ({row['end']}) before it starts ({row['start']}).")
+            if self.periods and start_minute < self.periods[-1]['end_minute']:
+                raise ValueError(f"Schedule '{name}': {row['id']} starts before {self.periods[-1]['id']} ends.")
+            # The legacy keys (start_str/end_str/cb_prefix) keep these dicts
+            # usable wherever the old hard-coded period tables were
+            self.periods.append({
+                'id': row['id'],
+                'name': row['name'],
+                'start_str': row['start'],
+                'end_str': row['end'],
+                'cb_prefix': row['cb_prefix'],
+                'index': index,
+                'start_minute': start_minute,
+                'end_minute': end_minute,
+            })
+        self.start_minutes = [period['start_minute'] for period in self.periods]
+        self.end_minutes = [period['end_minute'] for period in self.periods]
+        self.index_by_id = {period['id']: period['index'] for period in self.periods}
+
+    # Sequence access, so a compiled schedule can be used like the plain
+    # period lists it replaces (iteration, [i], [:i], len)
+    def __len__(self):
+        return len(self.periods)
+
+    def __getitem__(self, item):
+        return self.periods[item]
+
+    def __iter__(self):
+        return iter(self.periods)
+
+    def period_index(self, period_id):
+        """Position of a period ID in the day, or None."""
+        return self.index_by_id.get(period_id)
+
+    def period_at(self, minute):
+        """The period in session at minute (start <= minute < end), or None between/outside periods."""
+        index = bisect_right(self.start_minutes, minute) - 1
+        if index >= 0 and minute < self.end_minutes[index]:
+            return self.periods[index]
+        return None
+
+    def late_arrival_period_at(self, minute):
+        """
+        The period a student signing in at minute is late to: the one whose
+        late-arrival window (previous period's end, this period's end] contains
+        it. None before the first period starts or after the last one ends.
+        """
+        if not self.periods or minute < self.start_minutes[0]:
+            return None
+        index = bisect_left(self.end_minutes, minute)
+        if index == len(self.periods):
+            return None
+        return self.periods[index]
+
+    def late_arrival_window(self, index):
+        """(start_str, end_str) of the late-arrival window for the period at index."""
+        period = self.periods[index]
+        window_start = self.periods[index - 1]['end_str'] if index > 0 else period['start_str']
+        return window_start, period['end_str']
+
+    def bin_late_arrivals(self, seconds_of_day):
+        """
+        Bins many sign-in times at once. seconds_of_day is an array of seconds
+        after midnight (NaN for missing times). Returns an int array of period
+        indexes, -1 where the time falls outside the school day.
+        """
+        seconds_of_day = np.asarray(seconds_of_day, dtype=float)
+        if not self.periods:
+            return np.full(seconds_of_day.shape, -1, dtype=int)
+        end_seconds = np.asarray(self.end_minutes, dtype=float) * 60
+        indexes = np.searchsorted(end_seconds, seconds_of_day, side='left')
+        outside = (np.isnan(seconds_of_day)
+                   | (seconds_of_day < self.start_minutes[0] * 60)
+                   | (indexes >= len(self.periods)))
+        indexes[outside] = -1
+        return indexes
+
+class ScheduleBook:
+    """All compiled schedules plus the calendar that picks one per date."""
+
+    def __init__(self, schedules, weekdays, dates):
+        self.schedules = schedules
+        self.weekdays = weekdays
+        self.dates = dates
+
+    def schedule_name_for_date(self, day):
+        """A date override, else the weekday default, else no school."""
+        schedule_name = self.dates.get(day.strftime("%Y-%m-%d"))
+        if schedule_name is not None:
+            return schedule_name
+        if day.weekday() < len(WEEKDAY_DAY_KEYS):
+            return self.weekdays.get(WEEKDAY_DAY_KEYS[day.weekday()], NO_SCHOOL_SCHEDULE)
+        return NO_SCHOOL_SCHEDULE
+
+    def schedule_for_date(self, day):
+        return self.schedules[self.schedule_name_for_date(day)]
+
+def compile_schedule_book(data):
+    """Compiles the parsed data file. Raises ValueError if it's inconsistent."""
+    schedules = {name: CompiledSchedule(name, rows) for name, rows in data.get('schedules', {}).items()}
+    schedules.setdefault(NO_SCHOOL_SCHEDULE, CompiledSchedule(NO_SCHOOL_SCHEDULE, []))
+    weekdays = data.get('weekdays', {})
+    dates = data.get('dates', {})
+    for label, schedule_name in list(weekdays.items()) + list(dates.items()):
+        if schedule_name not in schedules:
+            raise ValueError(f"Unknown schedule '{schedule_name}' for '{label}'. Use one of: {', '.join(schedules)}.")
+    return ScheduleBook(schedules, weekdays, dates)
+
+@lru_cache(maxsize=None)
+def load_schedule_book(data_path=SCHEDULE_DATA_FILE):
+    """
+    Loads and compiles the schedule data file once per process.
+
+    Raises:
+        OSError, json.JSONDecodeError, ValueError: If the file is missing or invalid.
+    """
+    with open(data_path, 'r') as f:
+        data = json.load(f)
+    try:
+        return compile_schedule_book(data)
+    except ValueError as e:
+        raise ValueError(f"{data_path}: {e}") from None
@@ -0,0 +1,216 @@
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+import rosa_v_0_3 as rosa
+from rosa_schedule import SCHEDULE_DATA_FILE, load_schedule_book, minutes_to_time
+
+# Usage (run from the folder holding credentials.json, like rosa_v_0_3.py):
+#   python rosa_scheduler.py                      # run until stopped (Ctrl+C)
+#   python rosa_scheduler.py --headless --catch-up
+#   python rosa_scheduler.py --dry-run            # print today's triggers and exit
+
+# --- Configuration ---
+# Which schedule applies on which date (a default per weekday plus overrides
+# for specific dates) comes from the calendar in the schedule data file.
+# Periods already processed, so a restarted scheduler doesn't mark them twice,
+# and the failed attempts of periods that haven't completed yet
+SCHEDULER_STATE_FILE = 'rosa_scheduler_state.json'
+# Minutes after a period ends before its late arrivals are processed, so
+# sign-ins right at the boundary have reached the Raptor report
+TRIGGER_GRACE_MINUTES = 2
+# With --catch-up, periods that ended at most this long ago are still run at startup
+CATCH_UP_LIMIT_MINUTES = 60
+# Longest single sleep, so clock changes and Ctrl+C are noticed promptly
+MAX_SLEEP_SECONDS = 60
+# A period run that doesn't complete is tried again after a short wait, up to
+# this many attempts in total (counted across restarts). Each retry resumes
+# from the stage that failed (see the period run checkpoints in rosa_v_0_3.py).
+PERIOD_ATTEMPT_LIMIT = 3
+RETRY_DELAY_MINUTES = 5
+
+# --- Calendar ---
+# Each period's late-arrival window is the one the interactive menu uses:
+# from the end of the previous period to the end of this one. The window for
+# a period closes at its end time, so that is when it is processed (plus the
+# grace minutes).
+
+def load_schedules(data_path):
+    """Loads the compiled schedules and calendar. Returns None if the file is unusable."""
+    try:
+        return load_schedule_book(data_path)
+    except (OSError, ValueError) as e:  # json.JSONDecodeError is a ValueError
+        print(f"Error: Could not load schedules from '{data_path}': {e}")
+        return None
+
+def build_triggers_for_date(schedule_book, day):
+    """
+    Returns the day's runs as a list of dicts sorted by trigger time:
+    {'trigger_at', 'period', 'periods_for_day', 'filter_start', 'filter_end'}.
+    """
+    periods_for_day = schedule_book.schedule_for_date(day)
+    triggers = []
+    for period_obj in periods_for_day:
+        filter_start, filter_end = periods_for_day.late_arrival_window(period_obj['index'])
+        triggers.append({
+            'trigger_at': datetime.combine(day, minutes_to_time(period_obj['end_minute'])) + timedelta(minutes=TRIGGER_GRACE_MINUTES),
+            'period': period_obj,
+            'periods_for_day': periods_for_day,
+            'filter_start': filter_start,
+            'filter_end': filter_end,
+        })
+    return triggers
+
+# --- Scheduler State ---
+
+def load_scheduler_state(state_path, day):
+    """Returns (set of period IDs already processed, {period ID: failed attempts}) for this date."""
+    try:
+        with open(state_path, 'r') as f:
+            state = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return set(), {}
+    day_state = state.get(day.strftime("%Y-%m-%d"), {})
+    if isinstance(day_state, list):  # Written before failed attempts were recorded
+        return set(day_state), {}
+    return set(day_state.get('completed', [])), dict(day_state.get('failed_attempts', {}))
+
+def save_scheduler_state(state_path, day, completed_period_ids, failed_attempts):
+    """Records the processed periods and failed attempts for this date (only today's entry is kept)."""
+    state = {day.strftime("%Y-%m-%d"): {
+        'completed': sorted(completed_period_ids),
+        'failed_attempts': {period_id: failed_attempts[period_id] for period_id in sorted(failed_attempts)},
+    }}
+    temp_path = f"{state_path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(temp_path, state_path)
+
+def log(message):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}")
+
+def sleep_until(target_time):
+    """Sleeps until target_time in short steps."""
+    while True:
+        remaining = (target_time - datetime.now()).total_seconds()
+        if remaining <= 0:
+            return
+        time.sleep(min(remaining, MAX_SLEEP_SECONDS))
+
+# --- Daemon Loop ---
+
+def run_day(schedule_book, day, state_path, headless=False, catch_up=False):
+    """Runs every pending period of one school day at its trigger time."""
+    triggers = build_triggers_for_date(schedule_book, day)
+    schedule_name = schedule_book.schedule_name_for_date(day)
+    if not triggers:
+        log(f"No school on {day.strftime('%A %Y-%m-%d')} (schedule '{schedule_name}').")
+        return
+
+    completed_period_ids, failed_attempts = load_scheduler_state(state_path, day)
+    # Periods that ended before the scheduler got to this day are skipped
+    # (or caught up within the limit), unless an earlier run of them failed
+    # and has attempts left. Periods that end while an earlier one is still
+    # being processed (or retried) run right after it.
+    skip_before = datetime.now() - timedelta(minutes=CATCH_UP_LIMIT_MINUTES if catch_up else 0)
+    log(f"{day.strftime('%A %Y-%m-%d')}: '{schedule_name}' schedule, {len(triggers)} period(s).")
+    period_names = {trigger['period']['id']: trigger['period']['name'] for trigger in triggers}
+    earlier_failures = [period_id for period_id in failed_attempts if period_id not in completed_period_ids]
+    if earlier_failures:
+        log("⚠️ Earlier failed runs today: " + ", ".join(
+            f"{period_names.get(period_id, period_id)} ({failed_attempts[period_id]} of {PERIOD_ATTEMPT_LIMIT} attempts)"
+            for period_id in earlier_failures))
+    for trigger in triggers:
+        period_obj = trigger['period']
+        if period_obj['id'] in completed_period_ids:
+            continue
+        attempts = failed_attempts.get(period_obj['id'], 0)
+        if attempts >= PERIOD_ATTEMPT_LIMIT:
+            log(f"❌ Not retrying {period_obj['name']}: it failed {attempts} times. Run rosa_v_0_3.py for it.")
+            continue
+        if trigger['trigger_at'] < skip_before and not attempts:
+            log(f"⏭️ Skipping {period_obj['name']}: its window closed at {trigger['filter_end']}.")
+            continue
+
+        if trigger['trigger_at'] > datetime.now():
+            log(f"🕒 Next: {period_obj['name']} at {trigger['trigger_at'].strftime('%I:%M %p')} "
+                f"(sign-ins {trigger['filter_start']} - {trigger['filter_end']}).")
+            sleep_until(trigger['trigger_at'])
+
+        while True:
+            log(f"🚀 Processing late arrivals for {period_obj['name']} ({trigger['filter_start']} - {trigger['filter_end']})...")
+            result = rosa.automate_raptor_and_powerschool(
+                period_obj, trigger['periods_for_day'], trigger['filter_start'], trigger['filter_end'],
+                auto_confirm=True, headless=headless,
+            )
+            if result['completed']:
+                completed_period_ids.add(period_obj['id'])
+                failed_attempts.pop(period_obj['id'], None)
+                save_scheduler_state(state_path, day, completed_period_ids, failed_attempts)
+                log(f"✅ {period_obj['name']} processed.")
+                break
+            attempts += 1
+            failed_attempts[period_obj['id']] = attempts
+            save_scheduler_state(state_path, day, completed_period_ids, failed_attempts)
+            if attempts >= PERIOD_ATTEMPT_LIMIT:
+                log(f"❌ {period_obj['name']} did not complete after {attempts} attempts. "
+                    f"It won't be retried automatically; run rosa_v_0_3.py for it.")
+                break
+            log(f"⚠️ {period_obj['name']} did not complete (attempt {attempts} of {PERIOD_ATTEMPT_LIMIT}). "
+                f"Retrying in {RETRY_DELAY_MINUTES} minutes.")
+            sleep_until(datetime.now() + timedelta(minutes=RETRY_DELAY_MINUTES))
+
+def run_scheduler(data_path, state_path, headless=False, catch_up=False):
+    """Processes each school day's periods as they end, until interrupted."""
+    while True:
+        # Re-read the calendar every day so edits take effect without a restart
+        load_schedule_book.cache_clear()
+        schedule_book = load_schedules(data_path)
+        if schedule_book is None:
+            return 1
+        today = datetime.now().date()
+        run_day(schedule_book, today, state_path, headless=headless, catch_up=catch_up)
+        next_day = datetime.combine(today + timedelta(days=1), datetime.min.time())
+        log(f"Done for today. Sleeping until {next_day.strftime('%Y-%m-%d')}.")
+        sleep_until(next_day)
+        # Missed periods are never caught up on a new day, only at startup
+        catch_up = False
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Runs the Raptor -> PowerSchool late-arrival processing automatically at the end of each period."
+    )
+    parser.add_argument("--schedules", default=SCHEDULE_DATA_FILE,
+                        help="Period tables and calendar JSON (default: rosa_schedules.json next to this script).")
+    parser.add_argument("--state", default=SCHEDULER_STATE_FILE,
+                        help=f"Processed periods and failed attempts file (default: {SCHEDULER_STATE_FILE}).")
+    parser.add_argument("--headless", action="store_true", help="Run Chrome without a window.")
+    parser.add_argument("--catch-up", action="store_true",
+                        help=f"At startup, also process periods that ended within the last {CATCH_UP_LIMIT_MINUTES} minutes.")
+    parser.add_argument("--dry-run", action="store_true", help="Print today's schedule and trigger times, then exit.")
+    args = parser.parse_args()
+
+    if args.dry_run:
+        schedule_book = load_schedules(args.schedules)
+        if schedule_book is None:
+            return 1
+        today = datetime.now().date()
+        print(f"{today.strftime('%A %Y-%m-%d')}: '{schedule_book.schedule_name_for_date(today)}' schedule")
+        for trigger in build_triggers_for_date(schedule_book, today):
+            print(f"  {trigger['trigger_at'].strftime('%I:%M %p')}  {trigger['period']['name']}: "
+                  f"sign-ins {trigger['filter_start']} - {trigger['filter_end']}")
+        return 0
+
+    os.makedirs(rosa.RAPTOR_REPORTS_DIR, exist_ok=True)
+    os.makedirs(rosa.DAILY_MASTER_REPORTS_DIR, exist_ok=True)
+    log("ROSA scheduler started. Press Ctrl+C to stop.")
+    try:
+        return run_scheduler(args.schedules, args.state, headless=args.headless, catch_up=args.catch_up)
+    except KeyboardInterrupt:
+        log("Scheduler stopped by user.")
+        return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+import contextlib
+import csv
+import json
+import math
+import os
+import time
+from datetime import datetime
+
+# --- Configuration ---
+# Per-run timing reports (JSON + CSV) and the rolling step history/summary
+TIMING_DIR = 'rosa_timing'
+STEP_HISTORY_FILE = 'step_history.csv'
+SUMMARY_FILE = 'summary.json'
+# The rolling summary covers this many most recent runs of each operation
+SUMMARY_RUNS = 50
+STEP_FIELDS = ['step', 'depth', 'start_offset_seconds', 'seconds', 'self_seconds', 'ok']
+
+# --- Step Timing ---
+# A run collects one record per timed step: its name, nesting depth, when it
+# started relative to the run, how long it took in total and its self time,
+# the total minus the steps nested in it. Self time is what tells which step
+# is slow: a marking step's total includes the review prompt (review_wait)
+# nested in it, i.e. however long someone sat at the prompt. Timing a step is two
+# perf_counter() calls and a list append, so it can wrap every browser and
+# pandas step; outside a run (e.g. when a function is imported and called
+# directly) the wrappers do nothing. At the end of the run the records are
+# written as rosa_timing/run_<timestamp>_<operation>.json/.csv, appended to
+# the step history, and the p50/p95 per step over recent runs is recomputed.
+
+_current_run = None
+
+class timed_step(contextlib.ContextDecorator):
+    """Times a block (with timed_step("name"):) or a function (@timed_step("name"))."""
+
+    def __init__(self, name):
+        self.name = name
+        # One entry per active use, so a decorated function can call itself
+        self.entries = []
+
+    def __enter__(self):
+        run = _current_run
+        if run is not None:
+            # The frame collects the total time of the steps nested in this one
+            frame = {'child_seconds': 0.0}
+            run['stack'].append(frame)
+            self.entries.append((run, frame, time.perf_counter()))
+        else:
+            self.entries.append(None)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        entry = self.entries.pop()
+        if entry is not None:
+            end = time.perf_counter()
+            run, frame, start = entry
+            run['stack'].pop()
+            seconds = end - start
+            if run['stack']:
+                run['stack'][-1]['child_seconds'] += seconds
+            run['steps'].append({
+                'step': self.name,
+                'depth': len(run['stack']),
+                'start_offset_seconds': round(start - run['start'], 4),
+                'seconds': round(seconds, 4),
+                'self_seconds': round(seconds - frame['child_seconds'], 4),
+                'ok': exc_type is None,
+            })
+        return False
+
+class timed_run(contextlib.ContextDecorator):
+    """
+    Times a whole operation as a run (its total is the step '<operation>').
+    An operation started from inside another one is folded into the outer
+    run as a step instead of writing its own report.
+    """
+
+    def __init__(self, operation, timing_dir=TIMING_DIR):
+        self.operation = operation
+        self.timing_dir = timing_dir
+        self.step = timed_step(operation)
+        self.owned_runs = []
+
+    def __enter__(self):
+        global _current_run
+        owns_run = _current_run is None
+        if owns_run:
+            _current_run = {'operation': self.operation, 'started_at': datetime.now().isoformat(timespec='seconds'),
+                            'start': time.perf_counter(), 'stack': [], 'steps': []}
+        self.owned_runs.append(_current_run if owns_run else None)
+        self.step.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _current_run
+        self.step.__exit__(exc_type, exc, tb)
+        run = self.owned_runs.pop()
+        if run is not None:
+            _current_run = None
+            try:
+                write_run_report(run, self.timing_dir)
+            except OSError as e:
+                print(f"Warning: Could not write the timing report: {e}")
+        return False
+
+# --- Reports ---
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    # The smallest value with at least fraction of the values at or below it
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+def write_run_report(run, timing_dir=TIMING_DIR):
+    """Writes the run's JSON and CSV reports, appends to the step history and refreshes the summary."""
+    os.makedirs(timing_dir, exist_ok=True)
+    run_id_base = f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}_{run['operation']}"
+    run_id = run_id_base
+    counter = 1
+    while os.path.exists(os.path.join(timing_dir, f"run_{run_id}.json")):
+        run_id = f"{run_id_base}-{counter}"
+        counter += 1
+    # Steps are recorded as they finish; list them in the order they started
+    steps = sorted(run['steps'], key=lambda step: (step['start_offset_seconds'], step['depth']))
+
+    with open(os.path.join(timing_dir, f"run_{run_id}.json"), 'w') as f:
+        json.dump({'run_id': run_id, 'operation': run['operation'], 'started_at': run['started_at'],
+                   'steps': steps}, f, indent=2)
+    with open(os.path.join(timing_dir, f"run_{run_id}.csv"), 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=STEP_FIELDS)
+        writer.writeheader()
+        writer.writerows(steps)
+
+    history_path = os.path.join(timing_dir, STEP_HISTORY_FILE)
+    write_header = not os.path.exists(history_path)
+    with open(history_path, 'a', newline='') as f:
+        writer = csv.writer(f)
+        if write_header:
+            writer.writerow(['run_id', 'operation', 'step', 'seconds', 'self_seconds', 'ok'])
+        for step in steps:
+            writer.writerow([run_id, run['operation'], step['step'], step['seconds'], step['self_seconds'], step['ok']])
+
+    summary = summarize_step_history(history_path)
+    with open(os.path.join(timing_dir, SUMMARY_FILE), 'w') as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"\n⏱️ Step timings for this run, total / self (self p50/p95 over the last {SUMMARY_RUNS} '{run['operation']}' runs):")
+    operation_summary = summary.get(run['operation'], {})
+    for step in steps:
+        step_summary = operation_summary.get(step['step'], {})
+        print(f"  {'  ' * step['depth']}{step['step']}: {step['seconds']:.2f} s / {step['self_seconds']:.2f} s"
+              f" (p50 {step_summary.get('p50_self_seconds', 0):.2f} s, p95 {step_summary.get('p95_self_seconds', 0):.2f} s)")
+    print(f"Timing report: {os.path.join(timing_dir, f'run_{run_id}.json')}")
+
+def summarize_step_history(history_path, runs=SUMMARY_RUNS):
+    """
+    Returns {operation: {step: {'count', 'p50_seconds', 'p95_seconds', 'max_seconds',
+    'p50_self_seconds', 'p95_self_seconds'}}} over each operation's most recent
+    runs. Failed steps are left out.
+    """
+    durations = {}
+    recent_run_ids = {}
+    with open(history_path, 'r', newline='') as f:
+        for row in csv.DictReader(f):
+            run_ids = recent_run_ids.setdefault(row['operation'], [])
+            if not run_ids or run_ids[-1] != row['run_id']:
+                run_ids.append(row['run_id'])
+            if row['ok'] == 'True':
+                durations.setdefault((row['operation'], row['run_id'], row['step']), []).append(
+                    (float(row['seconds']), float(row['self_seconds'])))
+
+    summary = {}
+    for operation, run_ids in recent_run_ids.items():
+        kept_run_ids = set(run_ids[-runs:])
+        step_durations = {}
+        for (step_operation, run_id, step), seconds in durations.items():
+            if step_operation == operation and run_id in kept_run_ids:
+                step_durations.setdefault(step, []).extend(seconds)
+        summary[operation] = {}
+        for step, timings in step_durations.items():
+            seconds = sorted(total for total, _ in timings)
+            self_seconds = sorted(self_time for _, self_time in timings)
+            summary[operation][step] = {
+                'count': len(seconds),
+                'p50_seconds': round(percentile(seconds, 0.50), 3),
+                'p95_seconds': round(percentile(seconds, 0.95), 3),
+                'max_seconds': round(seconds[-1], 3),
+                'p50_self_seconds': round(percentile(self_seconds, 0.50), 3),
+                'p95_self_seconds': round(percentile(self_seconds, 0.95), 3),
+            }
+    return summary
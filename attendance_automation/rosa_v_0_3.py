@@ -1,3 +1,5 @@
+import argparse
+import contextlib
 import json
 import time
 import os
@@ -14,6 +16,8 @@ import pandas as pd
 import re
 from selenium.webdriver.support.ui import Select
 import numpy as np
+from rosa_schedule import NO_SCHOOL_SCHEDULE, SCHEDULE_DATA_FILE, load_schedule_book, parse_time_to_minutes, minutes_to_time
+from rosa_timing import timed_run, timed_step
 
 # --- Configuration ---
 CREDENTIALS_FILE = 'credentials.json'
@@ -27,39 +31,22 @@ DAILY_MASTER_REPORTS_DIR = 'daily_raptor_report_master'
 MEET_ATTENDANCE_DIR = 'meet_attendance'
 
 # --- School Period Definitions ---
-M_TH_NORMAL_PERIODS = [
-    {"id": "AMA", "name": "AM Advisory (Normal)", "start_str": "08:30 AM", "end_str": "09:05 AM", "cb_prefix": "cb7"},
-    {"id": "P1",  "name": "Period 1 (Normal)",    "start_str": "09:10 AM", "end_str": "10:12 AM", "cb_prefix": "cb1"},
-    {"id": "P2",  "name": "Period 2 (Normal)",    "start_str": "10:17 AM", "end_str": "11:19 AM", "cb_prefix": "cb2"},
-    {"id": "P3",  "name": "Period 3 (Normal)",    "start_str": "11:24 AM", "end_str": "01:01 PM", "cb_prefix": "cb3"},
-    {"id": "P4",  "name": "Period 4 (Normal)",    "start_str": "01:06 PM", "end_str": "02:08 PM", "cb_prefix": "cb4"},
-    {"id": "P5",  "name": "Period 5 (Normal)",    "start_str": "02:13 PM", "end_str": "03:15 PM", "cb_prefix": "cb5"},
-    {"id": "PMA", "name": "PM Advisory (Normal)", "start_str": "03:20 PM", "end_str": "03:30 PM", "cb_prefix": "cb8"},
-]
-
-M_TH_ENRICHMENT_PERIODS = [
-    {"id": "AMA", "name": "AM Advisory (Enrichment)", "start_str": "08:30 AM", "end_str": "09:05 AM", "cb_prefix": "cb7"},
-    {"id": "P1",  "name": "Period 1 (Enrichment)",    "start_str": "09:10 AM", "end_str": "10:05 AM", "cb_prefix": "cb1"},
-    {"id": "P2",  "name": "Period 2 (Enrichment)",    "start_str": "10:10 AM", "end_str": "11:05 AM", "cb_prefix": "cb2"},
-    {"id": "P3",  "name": "Period 3 (Enrichment)",    "start_str": "11:10 AM", "end_str": "12:40 PM", "cb_prefix": "cb3"},
-    {"id": "P4",  "name": "Period 4 (Enrichment)",    "start_str": "12:45 PM", "end_str": "01:40 PM", "cb_prefix": "cb4"},
-    {"id": "P5",  "name": "Period 5 (Enrichment)",    "start_str": "01:45 PM", "end_str": "02:40 PM", "cb_prefix": "cb5"},
-    {"id": "PMA", "name": "PM Advisory (Enrichment)", "start_str": "02:45 PM", "end_str": "03:30 PM", "cb_prefix": "cb8"},
-]
-
-ACTUAL_F_PERIODS = [
-    {"id": "AMA", "name": "AM Advisory (Fri)", "start_str": "08:30 AM", "end_str": "08:40 AM", "cb_prefix": "cb7"},
-    {"id": "P1",  "name": "Period 1 (Fri)",    "start_str": "08:45 AM", "end_str": "09:26 AM", "cb_prefix": "cb1"},
-    {"id": "P2",  "name": "Period 2 (Fri)",    "start_str": "09:31 AM", "end_str": "10:12 AM", "cb_prefix": "cb2"},
-    {"id": "P3",  "name": "Period 3 (Fri)",    "start_str": "10:17 AM", "end_str": "10:58 AM", "cb_prefix": "cb3"},
-    {"id": "P4",  "name": "Period 4 (Fri)",    "start_str": "11:03 AM", "end_str": "11:44 AM", "cb_prefix": "cb4"},
-    {"id": "P5",  "name": "Period 5 (Fri)",    "start_str": "11:49 AM", "end_str": "12:30 PM", "cb_prefix": "cb5"},
-    {"id": "PMA", "name": "PM Advisory (Fri)", "start_str": "12:35 PM", "end_str": "01:30 PM", "cb_prefix": "cb8"},
-]
-
-SPECIAL_DAY_SCHEDULE = [
-    {"id": "AMA", "name": "AM Advisory (Special Day)", "start_str": "08:00 AM", "end_str": "04:00 PM", "cb_prefix": "cb7"}
-]
+# The period tables and the date -> schedule calendar live in rosa_schedules.json
+# and are compiled the first time an operation needs them (see rosa_schedule.py),
+# so a mistake in the file is reported by the operation instead of breaking the
+# import (rosa_scheduler.py imports this module). Each schedule is a
+# CompiledSchedule: it iterates and indexes like a list of period dicts
+# ('id', 'name', 'start_str', 'end_str', 'cb_prefix', ...) and adds bisect
+# lookups by time. Schedules are looked up by the name used in the calendar
+# ("normal", "enrichment", "friday", "special"); "none" marks a day without school.
+
+def get_schedule_book():
+    """Loads the compiled schedules and calendar. Returns None if the file is unusable."""
+    try:
+        return load_schedule_book()
+    except (OSError, ValueError) as e:  # json.JSONDecodeError is a ValueError
+        print(f"Error: Could not load schedules from '{SCHEDULE_DATA_FILE}': {e}")
+        return None
 
 ALL_POSSIBLE_PERIOD_CBS = [
     "cb7;1", "cb7;2", # AMA
@@ -123,13 +110,84 @@ def load_credentials(filepath, app_name):
         print(f"An unexpected error occurred while loading credentials: {e}")
         return None, None
 
+# --- Helper Function for the Late-Arrival Window of a Period ---
+def get_late_arrival_window(periods_for_day, period_index):
+    """
+    Returns the (start_str, end_str) sign-in window for students arriving late
+    to periods_for_day[period_index]: from the end of the previous period (or
+    the start of the first period) to the end of this period.
+    """
+    return periods_for_day.late_arrival_window(period_index)
+
+# --- Helpers for Day and Period Selection ---
+DAY_NAMES = {"M": "Monday", "T": "Tuesday", "W": "Wednesday", "H": "Thursday", "F": "Friday", "S": "Special Day (e.g., Testing)"}
+# Day key for a command-line run without --day: today's periods from the calendar
+TODAY_DAY_KEY = "today"
+
+def get_period_menu_number(period_obj):
+    """The number a period is picked by in the menu: 7 for AMA, 1-5 for P1-P5, 8 for PMA."""
+    if period_obj['id'] == 'AMA':
+        return "7"
+    if period_obj['id'].startswith('P') and len(period_obj['id']) == 2:
+        return period_obj['id'][1]
+    if period_obj['id'] == 'PMA':
+        return "8"
+    return None
+
+def build_effective_periods_config(schedule_book, active_m_th_schedule):
+    """Maps each day key to its periods, with the chosen M-Th schedule for Monday-Thursday."""
+    return {
+        "M": active_m_th_schedule,
+        "T": active_m_th_schedule,
+        "W": active_m_th_schedule,
+        "H": active_m_th_schedule,
+        "F": schedule_book.schedules["friday"],
+        "S": schedule_book.schedules["special"]
+    }
+
+def resolve_period_selection(effective_periods_config, day_key, period_choice, filter_start_str=None, filter_end_str=None):
+    """
+    Non-interactive counterpart of get_user_day_and_period_selection. period_choice
+    is a period ID (AMA, P1-P5, PMA) or its menu number (7, 1-5, 8). The filter
+    window defaults to the period's late-arrival window; Special Days (S) need
+    both times given explicitly.
+
+    Returns:
+        tuple: Same as get_user_day_and_period_selection.
+
+    Raises:
+        ValueError: For an unknown day or period, or a bad time.
+    """
+    current_day_periods = effective_periods_config.get(day_key)
+    if not current_day_periods:
+        raise ValueError(f"Unknown day '{day_key}'. Use one of: {', '.join(effective_periods_config)}.")
+
+    period_index_in_list = current_day_periods.period_index(str(period_choice).upper())
+    if period_index_in_list is None:
+        for period_obj in current_day_periods:
+            if get_period_menu_number(period_obj) == str(period_choice):
+                period_index_in_list = period_obj['index']
+    if period_index_in_list is None:
+        period_ids = ", ".join(p['id'] for p in current_day_periods)
+        raise ValueError(f"Unknown period '{period_choice}' for {DAY_NAMES.get(day_key, day_key)}. Use one of: {period_ids}.")
+
+    if day_key == "S" and not (filter_start_str and filter_end_str):
+        raise ValueError("Special Day runs need both a START and an END time for ID filtering.")
+    default_start_str, default_end_str = get_late_arrival_window(current_day_periods, period_index_in_list)
+    filter_start_str = filter_start_str or default_start_str
+    filter_end_str = filter_end_str or default_end_str
+    for time_str in (filter_start_str, filter_end_str):
+        try:
+            parse_time_to_minutes(time_str)
+        except ValueError:
+            raise ValueError(f"Invalid time '{time_str}'. Please use HH:MM AM/PM (e.g., 08:30 AM or 01:15 PM).")
+
+    return day_key, current_day_periods[period_index_in_list], current_day_periods, filter_start_str, filter_end_str
+
 # --- Helper Function for User Input (Raptor Automation) ---
 def get_user_day_and_period_selection(effective_periods_config):
     print("\n🗓️ Select the day of the week:")
-    days_map = {
-        "1": ("M", "Monday"), "2": ("T", "Tuesday"), "3": ("W", "Wednesday"),
-        "4": ("H", "Thursday"), "5": ("F", "Friday"), "6": ("S", "Special Day (e.g., Testing)")
-    }
+    days_map = {str(number): (day_key, DAY_NAMES[day_key]) for number, day_key in enumerate(DAY_NAMES, start=1)}
     for key, (_, name) in days_map.items():
         print(f"  {key}. {name}")
 
@@ -150,7 +208,7 @@ def get_user_day_and_period_selection(effective_periods_config):
         while True:
             try:
                 filter_start_str_input = safe_input("Enter the START time for ID filtering (e.g., 08:00 AM)")
-                datetime.strptime(filter_start_str_input, "%I:%M %p")
+                parse_time_to_minutes(filter_start_str_input)
                 filter_start_str = filter_start_str_input
                 break
             except ValueError:
@@ -158,7 +216,7 @@ def get_user_day_and_period_selection(effective_periods_config):
         while True:
             try:
                 filter_end_str_input = safe_input("Enter the END time for ID filtering (e.g., 03:00 PM)")
-                datetime.strptime(filter_end_str_input, "%I:%M %p")
+                parse_time_to_minutes(filter_end_str_input)
                 filter_end_str = filter_end_str_input
                 break
             except ValueError:
@@ -170,20 +228,13 @@ def get_user_day_and_period_selection(effective_periods_config):
     else:
         current_day_periods = effective_periods_config.get(selected_day_key)
         if not current_day_periods:
-            print(f"Warning: Period data for day key '{selected_day_key}' ({days_map.get(day_choice_num, ('','Unknown'))[1]}) is not fully defined. Defaulting to a standard M-Th Normal schedule structure for this day.")
-            current_day_periods = M_TH_NORMAL_PERIODS
+            print(f"Warning: Period data for day key '{selected_day_key}' ({days_map.get(day_choice_num, ('','Unknown'))[1]}) is not fully defined. Defaulting to the M-Th schedule structure for this day.")
+            current_day_periods = effective_periods_config["M"]
 
         period_input_map = {}
         display_options_str = []
         for period_obj in current_day_periods:
-            user_input_val = None
-            if period_obj['id'] == 'AMA':
-                user_input_val = "7"
-            elif period_obj['id'].startswith('P') and len(period_obj['id']) == 2:
-                user_input_val = period_obj['id'][1]
-            elif period_obj['id'] == 'PMA':
-                user_input_val = "8"
-            
+            user_input_val = get_period_menu_number(period_obj)
             if user_input_val:
                 period_input_map[user_input_val] = period_obj
                 display_options_str.append(f"  {user_input_val}. {period_obj['name']} ({period_obj['start_str']} - {period_obj['end_str']})")
@@ -192,31 +243,26 @@ def get_user_day_and_period_selection(effective_periods_config):
         for s in display_options_str:
             print(s)
 
+        # Offer the period whose late-arrival window we're in right now as the default
+        now = datetime.now()
+        suggested_period_obj = current_day_periods.late_arrival_period_at(now.hour * 60 + now.minute)
+        period_prompt = "Enter number for the period (e.g., 7 for AMA, 1 for P1, 8 for PMA)"
+        if suggested_period_obj:
+            period_prompt += f" [Enter = {get_period_menu_number(suggested_period_obj)}, {suggested_period_obj['name']}]"
+
         selected_period_obj = None
         while selected_period_obj is None:
-            period_choice_str = safe_input("Enter number for the period (e.g., 7 for AMA, 1 for P1, 8 for PMA)")
-            if period_choice_str in period_input_map:
+            period_choice_str = safe_input(period_prompt)
+            if period_choice_str == "" and suggested_period_obj:
+                selected_period_obj = suggested_period_obj
+            elif period_choice_str in period_input_map:
                 selected_period_obj = period_input_map[period_choice_str]
             else:
                 print("Invalid period number. Please try again.")
 
-        period_index_in_list = -1
-        for i, p in enumerate(current_day_periods):
-            if p['id'] == selected_period_obj['id']:
-                period_index_in_list = i
-                break
-
-        if period_index_in_list == -1:
-            print("Error: Could not find the selected period in the defined schedule. Exiting.")
-            sys.exit(1)
+        period_index_in_list = selected_period_obj['index']
 
-        if period_index_in_list == 0:
-            filter_start_time_str = selected_period_obj['start_str']
-        else:
-            previous_period_obj = current_day_periods[period_index_in_list - 1]
-            filter_start_time_str = previous_period_obj['end_str']
-
-        filter_end_time_str = selected_period_obj['end_str']
+        filter_start_time_str, filter_end_time_str = get_late_arrival_window(current_day_periods, period_index_in_list)
 
         print(f"\n🔍 IDs will be filtered from the Excel sheet for student sign-in times between: {filter_start_time_str} and {filter_end_time_str}")
         print(f"Students in this list will be marked UL (Unexcused Late) for {selected_period_obj['name']}.")
@@ -226,10 +272,12 @@ def get_user_day_and_period_selection(effective_periods_config):
 
         return selected_day_key, selected_period_obj, current_day_periods, filter_start_time_str, filter_end_time_str
 
-def setup_webdriver(download_dir):
+@timed_step("setup_webdriver")
+def setup_webdriver(download_dir, headless=False):
     print("Setting up WebDriver...")
     chrome_options = ChromeOptions()
-    # chrome_options.add_argument("--headless") # Keep commented for visual debugging if needed
+    if headless: # Off by default so runs can be watched; the scheduler turns it on for unattended runs
+        chrome_options.add_argument("--headless=new")
     chrome_options.add_argument("--disable-gpu")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--window-size=1920,1080")
@@ -247,6 +295,7 @@ def setup_webdriver(download_dir):
     wait = WebDriverWait(driver, 45)
     return driver, wait
 
+@timed_step("powerschool_login")
 def powerschool_login(driver, wait, username, password):
     print(f"Navigating to PowerSchool login page: {POWERSCHOOL_LOGIN_URL}")
     driver.get(POWERSCHOOL_LOGIN_URL)
@@ -266,10 +315,35 @@ def powerschool_login(driver, wait, username, password):
         print(f"PowerSchool login failed or main dashboard element not found: {e}")
         driver.save_screenshot('powerschool_login_failure.png')
         return False
-def consolidate_attendance():
+
+@timed_step("review_wait")
+def confirm_or_continue(prompt_message, auto_confirm):
+    """Waits for the user to review a step, unless running unattended (auto_confirm)."""
+    if auto_confirm:
+        print(f"{prompt_message.split('. ')[0]}: auto-confirmed (unattended run).")
+        return
+    safe_input(prompt_message)
+
+@timed_run("consolidate")
+def consolidate_attendance(min_total_absences=None, auto_confirm=False, headless=False):
+    """
+    Downloads the PowerSchool Meeting Attendance report, flags students with at
+    least min_total_absences absences and no presence codes, and marks them AU
+    for every period and for the day.
+
+    Args:
+        min_total_absences (int): Absence threshold. Asked for when None.
+        auto_confirm (bool): Submit without waiting for review at each step.
+        headless (bool): Run Chrome without a window.
+
+    Returns:
+        dict: 'completed' plus the report path and the flagged student IDs.
+    """
+    result = {'operation': 'consolidate', 'completed': False, 'min_total_absences': min_total_absences,
+              'report_path': None, 'flagged_student_ids': []}
     powerschool_username, powerschool_password = load_credentials(CREDENTIALS_FILE, 'powerschool')
     if not powerschool_username or not powerschool_password:
-        return
+        return result
 
     os.makedirs(MEET_ATTENDANCE_DIR, exist_ok=True)
     print(f"Ensured '{MEET_ATTENDANCE_DIR}' directory exists.")
@@ -277,56 +351,56 @@ def consolidate_attendance():
     download_directory_for_chrome = os.path.join(os.getcwd(), MEET_ATTENDANCE_DIR)
     print(f"PowerSchool Meeting Attendance files will be downloaded to: {download_directory_for_chrome}")
 
-    min_total_absences = 2
-    while True:
+    while min_total_absences is None:
         try:
             absences_input = safe_input("Enter the minimum number of TOTAL absences (e.g., 2, 3, 4) to flag a student: ")
             min_total_absences = int(absences_input)
             if min_total_absences < 1:
                 print("Please enter a positive integer.")
-            else:
-                break
+                min_total_absences = None
         except ValueError:
             print("Invalid input. Please enter a number.")
+    result['min_total_absences'] = min_total_absences
     print(f"Students will be flagged if they have {min_total_absences} or more TOTAL absences AND no presence codes (T, UL, LE, INA, S, or blank) for the day.")
 
     driver = None
     try:
-        driver, wait = setup_webdriver(download_directory_for_chrome)
+        driver, wait = setup_webdriver(download_directory_for_chrome, headless=headless)
 
         if not powerschool_login(driver, wait, powerschool_username, powerschool_password):
             print("Failed to login to PowerSchool. Exiting consolidation process.")
-            return
+            return result
 
-        print(f"Navigating to Meeting Attendance Status page: {POWERSCHOOL_MEETING_ATTENDANCE_URL}")
-        driver.get(POWERSCHOOL_MEETING_ATTENDANCE_URL)
-        wait.until(EC.url_to_be(POWERSCHOOL_MEETING_ATTENDANCE_URL))
-        print("Successfully navigated to Meeting Attendance Status page.")
+        with timed_step("meet_attendance_export"):
+            print(f"Navigating to Meeting Attendance Status page: {POWERSCHOOL_MEETING_ATTENDANCE_URL}")
+            driver.get(POWERSCHOOL_MEETING_ATTENDANCE_URL)
+            wait.until(EC.url_to_be(POWERSCHOOL_MEETING_ATTENDANCE_URL))
+            print("Successfully navigated to Meeting Attendance Status page.")
 
-        print("Attempting to click the export dropdown menu...")
-        
-        export_dropdown_button_id = "exportDropDownButton"
-        export_dropdown_button_locator = (By.ID, export_dropdown_button_id)
+            print("Attempting to click the export dropdown menu...")
 
-        print(f"Waiting for export dropdown button (ID: {export_dropdown_button_id}) to be clickable...")
-        export_dropdown_button = wait.until(EC.element_to_be_clickable(export_dropdown_button_locator))
-        
-        print(f"Waiting for export dropdown button (ID: {export_dropdown_button_id}) to be fully enabled (aria-disabled='false')...")
-        wait.until(lambda driver: export_dropdown_button.get_attribute("aria-disabled") == "false")
-        
-        export_dropdown_button.click()
-        print("Export dropdown button clicked.")
-        
-        time.sleep(0.5) 
+            export_dropdown_button_id = "exportDropDownButton"
+            export_dropdown_button_locator = (By.ID, export_dropdown_button_id)
+
+            print(f"Waiting for export dropdown button (ID: {export_dropdown_button_id}) to be clickable...")
+            export_dropdown_button = wait.until(EC.element_to_be_clickable(export_dropdown_button_locator))
 
-        print("Waiting for the download options list to become visible...")
-        download_options_list_xpath = "//ul[contains(@class, 'multiButtonList') and contains(@class, 'groupFunctions') and @aria-hidden='false']"
-        wait.until(EC.visibility_of_element_located((By.XPATH, download_options_list_xpath)))
-        print("Download options list is visible.")
+            print(f"Waiting for export dropdown button (ID: {export_dropdown_button_id}) to be fully enabled (aria-disabled='false')...")
+            wait.until(lambda driver: export_dropdown_button.get_attribute("aria-disabled") == "false")
 
-        print("Attempting to click 'Excel Spreadsheet (XLSX)' download option...")
-        excel_option_id = "export-option-excelOptionId"
-        excel_download_option = wait.until(EC.element_to_be_clickable((By.ID, excel_option_id)))
+            export_dropdown_button.click()
+            print("Export dropdown button clicked.")
+
+            time.sleep(0.5)
+
+            print("Waiting for the download options list to become visible...")
+            download_options_list_xpath = "//ul[contains(@class, 'multiButtonList') and contains(@class, 'groupFunctions') and @aria-hidden='false']"
+            wait.until(EC.visibility_of_element_located((By.XPATH, download_options_list_xpath)))
+            print("Download options list is visible.")
+
+            print("Attempting to click 'Excel Spreadsheet (XLSX)' download option...")
+            excel_option_id = "export-option-excelOptionId"
+            excel_download_option = wait.until(EC.element_to_be_clickable((By.ID, excel_option_id)))
 
         files_before_download = set(os.listdir(download_directory_for_chrome))
         print(f"Files in download directory '{MEET_ATTENDANCE_DIR}' before export: {len(files_before_download)}")
@@ -339,26 +413,27 @@ def consolidate_attendance():
         downloaded_excel_file_path = None
         download_wait_timeout = 60
         download_poll_interval = 1
-        time_waited = 0
-        while time_waited < download_wait_timeout:
-            files_after_download = set(os.listdir(download_directory_for_chrome))
-            new_files = files_after_download - files_before_download
-            for file_name in new_files:
-                if file_name.endswith(".xlsx") and not file_name.endswith((".crdownload", ".tmp")):
-                    print(f"New .xlsx file detected: {file_name}")
-                    time.sleep(2)
-                    downloaded_excel_file_path = os.path.join(download_directory_for_chrome, file_name)
+        with timed_step("meet_attendance_download_wait"):
+            time_waited = 0
+            while time_waited < download_wait_timeout:
+                files_after_download = set(os.listdir(download_directory_for_chrome))
+                new_files = files_after_download - files_before_download
+                for file_name in new_files:
+                    if file_name.endswith(".xlsx") and not file_name.endswith((".crdownload", ".tmp")):
+                        print(f"New .xlsx file detected: {file_name}")
+                        time.sleep(2)
+                        downloaded_excel_file_path = os.path.join(download_directory_for_chrome, file_name)
+                        break
+                if downloaded_excel_file_path:
                     break
-            if downloaded_excel_file_path:
-                break
-            time.sleep(download_poll_interval)
-            time_waited += download_poll_interval
-            if time_waited % 10 == 0: print(f"Still waiting for download... ({time_waited}s / {download_wait_timeout}s)")
+                time.sleep(download_poll_interval)
+                time_waited += download_poll_interval
+                if time_waited % 10 == 0: print(f"Still waiting for download... ({time_waited}s / {download_wait_timeout}s)")
 
         if not downloaded_excel_file_path:
             print("❌ Error: PowerSchool Meeting Attendance download did not complete or .xlsx file not found within the timeout.")
             driver.save_screenshot('meet_attendance_download_error.png')
-            return
+            return result
 
         timestamp_str = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         new_file_name_base = f"meet-attendance-raw_{timestamp_str}"
@@ -373,178 +448,189 @@ def consolidate_attendance():
 
         os.rename(downloaded_excel_file_path, final_meet_attendance_path)
         print(f"Raw Meeting Attendance report renamed and stored: {final_meet_attendance_path}")
+        result['report_path'] = final_meet_attendance_path
 
-        print("Processing Meeting Attendance report for total absences...")
-        try:
-            df_meet_attendance = pd.read_excel(final_meet_attendance_path)
-
-            print("Date filtering for Meeting Attendance report is disabled. Processing all rows.")
-
-            period_cols = []
-            for col in df_meet_attendance.columns:
-                if col in ['AMA', 'PMA']:
-                    period_cols.append(col)
-                elif re.fullmatch(r'\d+', str(col)):
-                    try:
-                        num_col = int(col)
-                        if 1 <= num_col <= 5:
-                            period_cols.append(col)
-                    except ValueError:
-                        pass
-            
-            def sort_key(col_name):
-                if col_name == 'AMA':
-                    return 0
-                elif re.fullmatch(r'\d+', str(col_name)):
-                    return int(col_name)
-                elif col_name == 'PMA':
-                    return 999
-                return 500
-
-            period_cols.sort(key=sort_key)
-
-            if not period_cols:
-                print("Warning: No recognized period columns found (e.g., 'AMA', '1', '2', '3', '4', '5', 'PMA'). Cannot check for total absences.")
-                total_absence_ids = set()
-            else:
-                print(f"Identified period columns (in processing order): {period_cols}")
-                
-                total_absence_ids = set()
-                
-                if 'Student Number' not in df_meet_attendance.columns:
-                    print("Error: 'Student Number' column not found in the Meeting Attendance report. Cannot process for absences.")
-                    return
-
-                for index, row in df_meet_attendance.iterrows():
-                    student_number = str(row['Student Number']).strip()
-                    if not student_number or pd.isna(student_number):
-                        continue
-
-                    total_absences_for_day = 0
-                    has_any_present_code_today = False
-
-                    for period_col in period_cols:
-                        period_status = str(row.get(period_col, '')).strip().upper()
-                        
-                        if period_status in ABSENCE_CODES:
-                            total_absences_for_day += 1
-                        elif period_status in PRESENT_CODES:
-                            has_any_present_code_today = True
-                    
-                    if total_absences_for_day >= min_total_absences and not has_any_present_code_today:
-                        total_absence_ids.add(student_number)
-                        print(f"  Student Number {student_number} identified with {min_total_absences} or more total absences and no presence codes.")
-                
-            ids_to_paste = "\n".join(list(total_absence_ids))
-            print(f"Identified {len(total_absence_ids)} student(s) with {min_total_absences} or more total absences AND no presence codes for the day.")
-            if not ids_to_paste:
-                print("No students found with the specified total absences criteria. Exiting consolidation.")
-                return
-
-        except Exception as excel_process_error:
-            print(f"Error processing Meeting Attendance Excel file: {excel_process_error}")
-            driver.save_screenshot('meet_attendance_process_error.png')
-            return
-
-        print("Navigating to PowerSchool MultiSelect for identified students...")
-        driver.get("https://ednovate.powerschool.com/admin/home.html")
-        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "a.dialogDivM.custom_link[title='MultiSelect - Students']")))
-
-        print("Attempting to click 'MultiSelect - Students' link...")
-        multiselect_link = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "a.dialogDivM.custom_link[title='MultiSelect - Students']")))
-        multiselect_link.click()
-        print("'MultiSelect - Students' link clicked.")
-
-        print("Waiting for MultiSelect dialog to appear and textarea to be visible...")
-        multiselect_textarea = wait.until(EC.visibility_of_element_located((By.ID, "multiSelValsStu")))
-        multiselect_textarea.clear()
-        multiselect_textarea.send_keys(ids_to_paste)
-        print(f"IDs pasted into PowerSchool MultiSelect textarea for {len(total_absence_ids)} students.")
-
-        print("Attempting to click 'Search' button in MultiSelect dialog...")
-        search_button_xpath = "//button[contains(., 'Search') and @onclick=\"MultiSelect.searchType='admin'; MultiSelect.powerScheduler = 'Home'; MultiSelect.collectIDs();\"]"
-        search_button = wait.until(EC.element_to_be_clickable((By.XPATH, search_button_xpath)))
-        search_button.click()
-        print("'Search' button clicked in MultiSelect dialog.")
-
-        print("Waiting for student selection count to appear...")
-        student_count_element = wait.until(EC.visibility_of_element_located((By.XPATH, "//h2[contains(text(), 'Current Student Selection')]")))
-        time.sleep(0.5)
-        count_text = student_count_element.text
-        match = re.search(r'\((\d+)\)', count_text)
-        if match: print(f"Number of students selected: {match.group(1)}")
-        else: print("Could not extract student count.")
-
-        print("Attempting to click 'Group Functions' dropdown button...")
-        group_functions_button = wait.until(EC.element_to_be_clickable((By.ID, "selectFunctionDropdownButtonStudent")))
-        group_functions_button.click()
-        print("'Group Functions' dropdown button clicked.")
-        time.sleep(0.5)
+        with timed_step("process_meet_attendance"):
+            print("Processing Meeting Attendance report for total absences...")
+            try:
+                df_meet_attendance = pd.read_excel(final_meet_attendance_path)
+
+                print("Date filtering for Meeting Attendance report is disabled. Processing all rows.")
+
+                period_cols = []
+                for col in df_meet_attendance.columns:
+                    if col in ['AMA', 'PMA']:
+                        period_cols.append(col)
+                    elif re.fullmatch(r'\d+', str(col)):
+                        try:
+                            num_col = int(col)
+                            if 1 <= num_col <= 5:
+                                period_cols.append(col)
+                        except ValueError:
+                            pass
+
+                def sort_key(col_name):
+                    if col_name == 'AMA':
+                        return 0
+                    elif re.fullmatch(r'\d+', str(col_name)):
+                        return int(col_name)
+                    elif col_name == 'PMA':
+                        return 999
+                    return 500
+
+                period_cols.sort(key=sort_key)
+
+                if not period_cols:
+                    print("Warning: No recognized period columns found (e.g., 'AMA', '1', '2', '3', '4', '5', 'PMA'). Cannot check for total absences.")
+                    total_absence_ids = set()
+                else:
+                    print(f"Identified period columns (in processing order): {period_cols}")
+
+                    total_absence_ids = set()
+
+                    if 'Student Number' not in df_meet_attendance.columns:
+                        print("Error: 'Student Number' column not found in the Meeting Attendance report. Cannot process for absences.")
+                        return result
+
+                    for index, row in df_meet_attendance.iterrows():
+                        student_number = str(row['Student Number']).strip()
+                        if not student_number or pd.isna(student_number):
+                            continue
+
+                        total_absences_for_day = 0
+                        has_any_present_code_today = False
+
+                        for period_col in period_cols:
+                            period_status = str(row.get(period_col, '')).strip().upper()
+
+                            if period_status in ABSENCE_CODES:
+                                total_absences_for_day += 1
+                            elif period_status in PRESENT_CODES:
+                                has_any_present_code_today = True
+
+                        if total_absences_for_day >= min_total_absences and not has_any_present_code_today:
+                            total_absence_ids.add(student_number)
+                            print(f"  Student Number {student_number} identified with {min_total_absences} or more total absences and no presence codes.")
+
+                ids_to_paste = "\n".join(list(total_absence_ids))
+                result['flagged_student_ids'] = sorted(total_absence_ids)
+                print(f"Identified {len(total_absence_ids)} student(s) with {min_total_absences} or more total absences AND no presence codes for the day.")
+                if not ids_to_paste:
+                    print("No students found with the specified total absences criteria. Exiting consolidation.")
+                    result['completed'] = True
+                    return result
+
+            except Exception as excel_process_error:
+                print(f"Error processing Meeting Attendance Excel file: {excel_process_error}")
+                driver.save_screenshot('meet_attendance_process_error.png')
+                return result
+
+        with timed_step("select_students"):
+            print("Navigating to PowerSchool MultiSelect for identified students...")
+            driver.get("https://ednovate.powerschool.com/admin/home.html")
+            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "a.dialogDivM.custom_link[title='MultiSelect - Students']")))
+
+            print("Attempting to click 'MultiSelect - Students' link...")
+            multiselect_link = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "a.dialogDivM.custom_link[title='MultiSelect - Students']")))
+            multiselect_link.click()
+            print("'MultiSelect - Students' link clicked.")
+
+            print("Waiting for MultiSelect dialog to appear and textarea to be visible...")
+            multiselect_textarea = wait.until(EC.visibility_of_element_located((By.ID, "multiSelValsStu")))
+            multiselect_textarea.clear()
+            multiselect_textarea.send_keys(ids_to_paste)
+            print(f"IDs pasted into PowerSchool MultiSelect textarea for {len(total_absence_ids)} students.")
+
+            print("Attempting to click 'Search' button in MultiSelect dialog...")
+            search_button_xpath = "//button[contains(., 'Search') and @onclick=\"MultiSelect.searchType='admin'; MultiSelect.powerScheduler = 'Home'; MultiSelect.collectIDs();\"]"
+            search_button = wait.until(EC.element_to_be_clickable((By.XPATH, search_button_xpath)))
+            search_button.click()
+            print("'Search' button clicked in MultiSelect dialog.")
+
+            print("Waiting for student selection count to appear...")
+            student_count_element = wait.until(EC.visibility_of_element_located((By.XPATH, "//h2[contains(text(), 'Current Student Selection')]")))
+            time.sleep(0.5)
+            count_text = student_count_element.text
+            match = re.search(r'\((\d+)\)', count_text)
+            if match: print(f"Number of students selected: {match.group(1)}")
+            else: print("Could not extract student count.")
+
+            print("Attempting to click 'Group Functions' dropdown button...")
+            group_functions_button = wait.until(EC.element_to_be_clickable((By.ID, "selectFunctionDropdownButtonStudent")))
+            group_functions_button.click()
+            print("'Group Functions' dropdown button clicked.")
+            time.sleep(0.5)
 
-        print("Attempting to click 'Mass Update Attendance' link...")
-        mass_update_attendance_link = wait.until(EC.element_to_be_clickable((By.ID, "lnk_studentsMassUpdateAttendance")))
-        mass_update_attendance_link.click()
-        print("'Mass Update Attendance' link clicked.")
+            print("Attempting to click 'Mass Update Attendance' link...")
+            mass_update_attendance_link = wait.until(EC.element_to_be_clickable((By.ID, "lnk_studentsMassUpdateAttendance")))
+            mass_update_attendance_link.click()
+            print("'Mass Update Attendance' link clicked.")
 
-        print("Waiting for redirection to batch attendance update page...")
-        expected_url_batch_attendance = "https://ednovate.powerschool.com/admin/attendance/record/batch/meetinggroup.html?dothisfor=selected"
-        wait.until(EC.url_to_be(expected_url_batch_attendance))
-        print(f"Successfully redirected to: {driver.current_url}")
+            print("Waiting for redirection to batch attendance update page...")
+            expected_url_batch_attendance = "https://ednovate.powerschool.com/admin/attendance/record/batch/meetinggroup.html?dothisfor=selected"
+            wait.until(EC.url_to_be(expected_url_batch_attendance))
+            print(f"Successfully redirected to: {driver.current_url}")
 
-        print("\nMarking all standard periods (AMA, P1-P5, PMA) as AU (Truant Absence)...")
-        for cb_name in ALL_POSSIBLE_PERIOD_CBS:
-            print(f"  Selecting checkbox for {cb_name}...")
-            try:
-                cb_xpath = f"//input[@type='checkbox' and @name='{cb_name}']"
-                checkbox = wait.until(EC.element_to_be_clickable((By.XPATH, cb_xpath)))
-                if not checkbox.is_selected():
-                    checkbox.click()
-                print(f"    ✅ Checkbox {cb_name} selected.")
-            except Exception as e:
-                print(f"    ❌ Error selecting checkbox {cb_name}: {e}")
-
-        print("  Selecting 'AU' as attendance code...")
-        attendance_code_select_au = wait.until(EC.element_to_be_clickable((By.NAME, "att_attcodelist")))
-        select_au = Select(attendance_code_select_au)
-        select_au.select_by_value("AU")
-        print("    ✅ 'AU' selected.")
-
-        safe_input("👉 Review ALL selected periods for AU. Press Enter to SUBMIT attendance update.")
-        submit_button_ps_au = wait.until(EC.element_to_be_clickable((By.ID, "btnSubmit")))
-        submit_button_ps_au.click()
-        print("    ✅ Submit button clicked for AU marking. Waiting for page to process...")
-        wait.until(EC.staleness_of(submit_button_ps_au))
-        wait.until(EC.presence_of_element_located((By.NAME, "att_attcodelist"))) 
-        print("    ✅ Page processed after AU submission.")
+        with timed_step("mark_periods_au"):
+            print("\nMarking all standard periods (AMA, P1-P5, PMA) as AU (Truant Absence)...")
+            for cb_name in ALL_POSSIBLE_PERIOD_CBS:
+                print(f"  Selecting checkbox for {cb_name}...")
+                try:
+                    cb_xpath = f"//input[@type='checkbox' and @name='{cb_name}']"
+                    checkbox = wait.until(EC.element_to_be_clickable((By.XPATH, cb_xpath)))
+                    if not checkbox.is_selected():
+                        checkbox.click()
+                    print(f"    ✅ Checkbox {cb_name} selected.")
+                except Exception as e:
+                    print(f"    ❌ Error selecting checkbox {cb_name}: {e}")
+
+            print("  Selecting 'AU' as attendance code...")
+            attendance_code_select_au = wait.until(EC.element_to_be_clickable((By.NAME, "att_attcodelist")))
+            select_au = Select(attendance_code_select_au)
+            select_au.select_by_value("AU")
+            print("    ✅ 'AU' selected.")
+
+            confirm_or_continue("👉 Review ALL selected periods for AU. Press Enter to SUBMIT attendance update.", auto_confirm)
+            submit_button_ps_au = wait.until(EC.element_to_be_clickable((By.ID, "btnSubmit")))
+            submit_button_ps_au.click()
+            print("    ✅ Submit button clicked for AU marking. Waiting for page to process...")
+            wait.until(EC.staleness_of(submit_button_ps_au))
+            wait.until(EC.presence_of_element_located((By.NAME, "att_attcodelist")))
+            print("    ✅ Page processed after AU submission.")
 
         # --- CORRECTED: Daily Batch Attendance Update (Consolidation) ---
         print("\n--- Moving to Daily Batch Attendance Update for selected students ---")
-        daily_link_xpath = "//a[contains(@href, 'dailygroup.html?dothisfor=selected') and normalize-space()='Daily']"
-        daily_link = wait.until(EC.element_to_be_clickable((By.XPATH, daily_link_xpath)))
-        daily_link.click()
-        print("Clicked 'Daily' link for batch update.")
-
-        print("Waiting for redirection to Daily batch attendance update page...")
-        expected_url_daily_batch = "https://ednovate.powerschool.com/admin/attendance/record/batch/dailygroup.html?dothisfor=selected"
-        wait.until(EC.url_to_be(expected_url_daily_batch))
-        print(f"Successfully redirected to: {driver.current_url}")
-
-        print("  Selecting 'AU' as attendance code for Daily record...")
-        daily_attendance_code_select = wait.until(EC.element_to_be_clickable((By.NAME, "att_attcodelist")))
-        select_daily_au = Select(daily_attendance_code_select)
-        select_daily_au.select_by_value("AU")
-        print("    ✅ 'AU' (Truant Absence) selected for Daily record.")
-
-        safe_input("👉 Review 'Daily' attendance update. Press Enter to SUBMIT.")
-        submit_button_daily_au = wait.until(EC.element_to_be_clickable((By.ID, "btnSubmit")))
-        submit_button_daily_au.click()
-        print("    ✅ Submit button clicked for Daily AU marking.")
-        wait.until(EC.staleness_of(submit_button_daily_au))
-        print("    ✅ Daily attendance update processed.")
+        with timed_step("mark_daily_au"):
+            daily_link_xpath = "//a[contains(@href, 'dailygroup.html?dothisfor=selected') and normalize-space()='Daily']"
+            daily_link = wait.until(EC.element_to_be_clickable((By.XPATH, daily_link_xpath)))
+            daily_link.click()
+            print("Clicked 'Daily' link for batch update.")
+
+            print("Waiting for redirection to Daily batch attendance update page...")
+            expected_url_daily_batch = "https://ednovate.powerschool.com/admin/attendance/record/batch/dailygroup.html?dothisfor=selected"
+            wait.until(EC.url_to_be(expected_url_daily_batch))
+            print(f"Successfully redirected to: {driver.current_url}")
+
+            print("  Selecting 'AU' as attendance code for Daily record...")
+            daily_attendance_code_select = wait.until(EC.element_to_be_clickable((By.NAME, "att_attcodelist")))
+            select_daily_au = Select(daily_attendance_code_select)
+            select_daily_au.select_by_value("AU")
+            print("    ✅ 'AU' (Truant Absence) selected for Daily record.")
+
+            confirm_or_continue("👉 Review 'Daily' attendance update. Press Enter to SUBMIT.", auto_confirm)
+            submit_button_daily_au = wait.until(EC.element_to_be_clickable((By.ID, "btnSubmit")))
+            submit_button_daily_au.click()
+            print("    ✅ Submit button clicked for Daily AU marking.")
+            wait.until(EC.staleness_of(submit_button_daily_au))
+            print("    ✅ Daily attendance update processed.")
         # --- END CORRECTED: Daily Batch Attendance Update (Consolidation) ---
 
-        print("\n🎉 PowerSchool consolidation process complete. Browser will stay open for 10 seconds for final review.")
-        time.sleep(10)
+        result['completed'] = True
+        if auto_confirm:
+            print("\n🎉 PowerSchool consolidation process complete.")
+        else:
+            print("\n🎉 PowerSchool consolidation process complete. Browser will stay open for 10 seconds for final review.")
+            time.sleep(10)
 
     except SystemExit:
         print("Application exited by user during consolidation process.")
@@ -562,34 +648,61 @@ def consolidate_attendance():
         if driver:
             print("Closing the browser.")
             driver.quit()
-
-def automate_raptor_and_powerschool(selected_period_object, all_periods_for_day, filter_start_str, filter_end_str):
-    raptor_username, raptor_password = load_credentials(CREDENTIALS_FILE, 'raptor')
-    if not raptor_username or not raptor_password:
-        return
-
-    powerschool_username, powerschool_password = load_credentials(CREDENTIALS_FILE, 'powerschool')
-    if not powerschool_username or not powerschool_password:
-        return
-
-    os.makedirs(RAPTOR_REPORTS_DIR, exist_ok=True)
-    os.makedirs(DAILY_MASTER_REPORTS_DIR, exist_ok=True)
-    print(f"Ensured '{RAPTOR_REPORTS_DIR}' and '{DAILY_MASTER_REPORTS_DIR}' directories exist.")
-
-    print("Setting up WebDriver...")
-    driver = None
-
-    download_directory_for_chrome = os.path.join(os.getcwd(), RAPTOR_REPORTS_DIR)
-    print(f"RaptorTech Excel files will be downloaded to: {download_directory_for_chrome}")
-
-    driver, wait = setup_webdriver(download_directory_for_chrome)
-    downloaded_excel_file_path = None
-
+    return result
+
+# --- Checkpointed Raptor -> PowerSchool Runs ---
+# A period run is a fixed sequence of stages. After each stage completes, a
+# checkpoint file records it along with what it produced (the export path,
+# the parsed students and IDs, the master report path), so a run that fails
+# part-way can be re-run and resumes at the first incomplete stage: a failed
+# PowerSchool submission doesn't mean logging in to Raptor and downloading
+# the export again. 'select' (PowerSchool login + MultiSelect) only leaves
+# state in the browser, so it is repeated whenever a marking stage still has
+# to run. The checkpoint is removed once the run completes, so the next run
+# for the same period starts fresh with a new export.
+PERIOD_RUN_STAGES = ('export', 'parse', 'persist', 'select', 'mark_au', 'mark_ul')
+CHECKPOINTS_DIR = 'rosa_checkpoints'
+
+def get_checkpoint_path(period_id, report_date):
+    """rosa_checkpoints/period_2026-10-19_P2.json (one checkpoint per period per report date)."""
+    return os.path.join(CHECKPOINTS_DIR, f"period_{report_date}_{period_id}.json")
+
+def load_checkpoint(checkpoint_path, run_key):
+    """
+    Returns the saved checkpoint for this run, or a fresh one if there is none
+    or it was written for a different filter window.
+    """
+    fresh_checkpoint = {'run_key': run_key, 'completed_stages': [], 'artifacts': {}}
     try:
-        print(f"Navigating to initial URL: {INITIAL_AND_TARGET_REPORTS_URL}")
-        driver.get(INITIAL_AND_TARGET_REPORTS_URL)
-        print(f"Current URL after initial navigation: {driver.current_url}")
+        with open(checkpoint_path, 'r') as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return fresh_checkpoint
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Warning: Could not read checkpoint '{checkpoint_path}' ({e}). Starting a fresh run.")
+        return fresh_checkpoint
+    if checkpoint.get('run_key') != run_key:
+        print(f"Checkpoint '{checkpoint_path}' is for a different filter window. Starting a fresh run.")
+        return fresh_checkpoint
+    return checkpoint
+
+def save_checkpoint(checkpoint_path, checkpoint):
+    """Writes the checkpoint atomically (temp file + replace)."""
+    os.makedirs(os.path.dirname(checkpoint_path), exist_ok=True)
+    temp_path = f"{checkpoint_path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(temp_path, checkpoint_path)
+
+@timed_step("export_raptor_report")
+def export_raptor_report(driver, wait, raptor_username, raptor_password, download_directory_for_chrome):
+    """Logs in to Raptor, exports today's sign-in history and returns the renamed .xlsx path (None on failure)."""
+    downloaded_excel_file_path = None
+    print(f"Navigating to initial URL: {INITIAL_AND_TARGET_REPORTS_URL}")
+    driver.get(INITIAL_AND_TARGET_REPORTS_URL)
+    print(f"Current URL after initial navigation: {driver.current_url}")
 
+    with timed_step("raptor_login"):
         try:
             print("Checking for username field to determine if login is needed for RaptorTech...")
             username_field = wait.until(EC.visibility_of_element_located((By.ID, "Username")))
@@ -620,6 +733,7 @@ def automate_raptor_and_powerschool(selected_period_object, all_periods_for_day,
                 wait.until(EC.url_to_be(INITIAL_AND_TARGET_REPORTS_URL))
                 print(f"Current URL after ensuring reports page: {driver.current_url}")
 
+    with timed_step("raptor_generate_report"):
         print("Waiting for RaptorTech reports page content to load (e.g., tabs container)...")
         wait.until(EC.presence_of_element_located((By.CLASS_NAME, "nav-tabs")))
         print("Attempting to click 'Students' tab...")
@@ -645,15 +759,16 @@ def automate_raptor_and_powerschool(selected_period_object, all_periods_for_day,
         wait.until(EC.element_to_be_clickable((By.ID, "btnExcelExport")))
         print("RaptorTech 'Export to Excel' button is ready.")
 
-        btn_excel_export = driver.find_element(By.ID, "btnExcelExport")
-        files_before_download = set(os.listdir(download_directory_for_chrome))
-        print(f"Files in download directory '{RAPTOR_REPORTS_DIR}' before export: {len(files_before_download)}")
-        btn_excel_export.click()
-        print("'Export to Excel' button clicked.")
+    btn_excel_export = driver.find_element(By.ID, "btnExcelExport")
+    files_before_download = set(os.listdir(download_directory_for_chrome))
+    print(f"Files in download directory '{RAPTOR_REPORTS_DIR}' before export: {len(files_before_download)}")
+    btn_excel_export.click()
+    print("'Export to Excel' button clicked.")
 
-        print("Waiting for RaptorTech download to complete (max 60 seconds)...")
-        download_wait_timeout = 60
-        download_poll_interval = 1
+    print("Waiting for RaptorTech download to complete (max 60 seconds)...")
+    download_wait_timeout = 60
+    download_poll_interval = 1
+    with timed_step("raptor_download_wait"):
         time_waited = 0
         while time_waited < download_wait_timeout:
             files_after_download = set(os.listdir(download_directory_for_chrome))
@@ -670,230 +785,416 @@ def automate_raptor_and_powerschool(selected_period_object, all_periods_for_day,
             time_waited += download_poll_interval
             if time_waited % 10 == 0 : print(f"Still waiting for download... ({time_waited}s / {download_wait_timeout}s)")
 
-        if downloaded_excel_file_path:
-            print(f"Download complete. File saved as: {downloaded_excel_file_path}")
-            timestamp_str = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-            new_file_name_base = f"raptor-sign-in-raw_{timestamp_str}"
-            new_file_name = f"{new_file_name_base}.xlsx"
-            final_raptor_report_path = os.path.join(download_directory_for_chrome, new_file_name)
-
-            counter = 1
-            while os.path.exists(final_raptor_report_path):
-                new_file_name = f"{new_file_name_base}-{counter}.xlsx"
-                final_raptor_report_path = os.path.join(download_directory_for_chrome, new_file_name)
-                counter += 1
-
-            os.rename(downloaded_excel_file_path, final_raptor_report_path)
-            downloaded_excel_file_path = final_raptor_report_path
-            print(f"Raw Raptor report renamed and stored: {downloaded_excel_file_path}")
-
-            print("Extracting ID Numbers and Full Names from the downloaded Excel file for processing...")
-            ids_to_paste = ""
-            students_for_master_report = pd.DataFrame()
-            try:
-                df_raptor = pd.read_excel(downloaded_excel_file_path)
-
-                expected_cols = ['Date/Time', 'ID Number', 'First Name', 'Last Name']
-                if not all(col in df_raptor.columns for col in expected_cols):
-                    print(f"Error: Missing one or more expected columns ({expected_cols}) in the Raptor report.")
-                    if 'ID Number' not in df_raptor.columns:
-                        raise ValueError("Required 'ID Number' column missing.")
-                    if 'Date/Time' not in df_raptor.columns:
-                        raise ValueError("Required 'Date/Time' column missing for filtering.")
-
-                df_raptor['Date/Time'] = pd.to_datetime(df_raptor['Date/Time'], errors='coerce')
-
-                start_time_dt = datetime.strptime(filter_start_str, "%I:%M %p").time()
-                end_time_dt = datetime.strptime(filter_end_str, "%I:%M %p").time()
-                print(f"Filtering Excel data for times between {start_time_dt.strftime('%I:%M %p')} and {end_time_dt.strftime('%I:%M %p')}")
-
-                filtered_df = df_raptor[
-                    (df_raptor['Date/Time'].dt.time >= start_time_dt) &
-                    (df_raptor['Date/Time'].dt.time <= end_time_dt) &
-                    (df_raptor['Date/Time'].notna())
-                ].copy()
-
-                if 'ID Number' in filtered_df.columns:
-                    filtered_df['ID Number'] = filtered_df['ID Number'].dropna().apply(lambda x: str(int(float(x))) if str(x).replace('.', '', 1).isdigit() else np.nan)
-                    filtered_df.dropna(subset=['ID Number'], inplace=True)
-
-                    extracted_ids = filtered_df['ID Number'].tolist()
-                    ids_to_paste = "\n".join(extracted_ids)
-                    print(f"Extracted {len(extracted_ids)} unique ID(s) for PowerSchool processing.")
-
-                    if not filtered_df.empty:
-                        students_for_master_report = filtered_df[['ID Number', 'First Name', 'Last Name', 'Date/Time']].copy()
-                        students_for_master_report['Timestamp Processed'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        students_for_master_report['Marked Period'] = selected_period_object['name']
-                else:
-                    print("Error: 'ID Number' column not found in the filtered Excel data.")
-            except Exception as excel_error:
-                print(f"Error processing Excel file for IDs: {excel_error}")
+    if not downloaded_excel_file_path:
+        print("❌ Error: RaptorTech download did not complete or .xlsx file not found within the timeout.")
+        driver.save_screenshot('download_error_screenshot.png')
+        return None
+
+    print(f"Download complete. File saved as: {downloaded_excel_file_path}")
+    timestamp_str = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    new_file_name_base = f"raptor-sign-in-raw_{timestamp_str}"
+    new_file_name = f"{new_file_name_base}.xlsx"
+    final_raptor_report_path = os.path.join(download_directory_for_chrome, new_file_name)
+
+    counter = 1
+    while os.path.exists(final_raptor_report_path):
+        new_file_name = f"{new_file_name_base}-{counter}.xlsx"
+        final_raptor_report_path = os.path.join(download_directory_for_chrome, new_file_name)
+        counter += 1
+
+    os.rename(downloaded_excel_file_path, final_raptor_report_path)
+    downloaded_excel_file_path = final_raptor_report_path
+    print(f"Raw Raptor report renamed and stored: {downloaded_excel_file_path}")
+    return downloaded_excel_file_path
+
+@timed_step("parse_raptor_report")
+def parse_raptor_report(downloaded_excel_file_path, selected_period_object, all_periods_for_day, filter_start_str, filter_end_str):
+    """
+    Reads the Raptor export and returns (extracted_ids, students_for_master_report)
+    for the sign-ins between filter_start_str and filter_end_str.
+
+    Raises:
+        ValueError: If a required column is missing.
+    """
+    print("Extracting ID Numbers and Full Names from the downloaded Excel file for processing...")
+    extracted_ids = []
+    students_for_master_report = pd.DataFrame()
+
+    df_raptor = pd.read_excel(downloaded_excel_file_path)
+
+    expected_cols = ['Date/Time', 'ID Number', 'First Name', 'Last Name']
+    if not all(col in df_raptor.columns for col in expected_cols):
+        print(f"Error: Missing one or more expected columns ({expected_cols}) in the Raptor report.")
+        if 'ID Number' not in df_raptor.columns:
+            raise ValueError("Required 'ID Number' column missing.")
+        if 'Date/Time' not in df_raptor.columns:
+            raise ValueError("Required 'Date/Time' column missing for filtering.")
+
+    df_raptor['Date/Time'] = pd.to_datetime(df_raptor['Date/Time'], errors='coerce')
+
+    start_time_dt = minutes_to_time(parse_time_to_minutes(filter_start_str))
+    end_time_dt = minutes_to_time(parse_time_to_minutes(filter_end_str))
+    print(f"Filtering Excel data for times between {start_time_dt.strftime('%I:%M %p')} and {end_time_dt.strftime('%I:%M %p')}")
+
+    # Compare seconds after midnight as one vectorized column instead of
+    # building a datetime.time per row (NaT becomes NaN and never matches)
+    sign_in_times = df_raptor['Date/Time']
+    seconds_of_day = (sign_in_times - sign_in_times.dt.normalize()).dt.total_seconds()
+    filtered_df = df_raptor[
+        (seconds_of_day >= parse_time_to_minutes(filter_start_str) * 60) &
+        (seconds_of_day <= parse_time_to_minutes(filter_end_str) * 60)
+    ].copy()
+
+    period_indexes = all_periods_for_day.bin_late_arrivals(seconds_of_day.to_numpy())
+    window_counts = np.bincount(period_indexes[period_indexes >= 0], minlength=len(all_periods_for_day))
+    print("Sign-ins by late-arrival window today: " + ", ".join(
+        f"{period_obj['id']}: {count}" for period_obj, count in zip(all_periods_for_day, window_counts)))
+
+    if 'ID Number' in filtered_df.columns:
+        filtered_df['ID Number'] = filtered_df['ID Number'].dropna().apply(lambda x: str(int(float(x))) if str(x).replace('.', '', 1).isdigit() else np.nan)
+        filtered_df.dropna(subset=['ID Number'], inplace=True)
+
+        extracted_ids = filtered_df['ID Number'].tolist()
+        print(f"Extracted {len(extracted_ids)} unique ID(s) for PowerSchool processing.")
+
+        if not filtered_df.empty:
+            students_for_master_report = filtered_df[['ID Number', 'First Name', 'Last Name', 'Date/Time']].copy()
+            students_for_master_report['Timestamp Processed'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            students_for_master_report['Marked Period'] = selected_period_object['name']
+    else:
+        print("Error: 'ID Number' column not found in the filtered Excel data.")
+    return extracted_ids, students_for_master_report
+
+@timed_step("update_daily_master_report")
+def update_daily_master_report(students_for_master_report, report_date=None):
+    """
+    Merges the processed students into the master report of report_date
+    (YYYY-MM-DD, default today). Returns its path, or None on failure.
+    """
+    report_date = report_date or datetime.now().strftime("%Y-%m-%d")
+    master_file_name = f"daily_raptor_master_report_{report_date}.xlsx"
+    master_file_path = os.path.join(DAILY_MASTER_REPORTS_DIR, master_file_name)
+
+    existing_master_df = pd.DataFrame()
+    if os.path.exists(master_file_path):
+        try:
+            existing_master_df = pd.read_excel(master_file_path)
+            print(f"Loaded existing master report for today: {master_file_path}")
+        except Exception as e:
+            print(f"Error loading existing master report: {e}. Starting a new one.")
 
-            if not students_for_master_report.empty:
-                today_str = datetime.now().strftime("%Y-%m-%d")
-                master_file_name = f"daily_raptor_master_report_{today_str}.xlsx"
-                master_file_path = os.path.join(DAILY_MASTER_REPORTS_DIR, master_file_name)
+    combined_df = pd.concat([existing_master_df, students_for_master_report], ignore_index=True)
+    final_master_df = combined_df.drop_duplicates(subset=['ID Number', 'Marked Period'], keep='first')
 
-                existing_master_df = pd.DataFrame()
-                if os.path.exists(master_file_path):
-                    try:
-                        existing_master_df = pd.read_excel(master_file_path)
-                        print(f"Loaded existing master report for today: {master_file_path}")
-                    except Exception as e:
-                        print(f"Error loading existing master report: {e}. Starting a new one.")
+    if 'First Name' in final_master_df.columns and 'Last Name' in final_master_df.columns:
+        final_master_df['Full Name'] = final_master_df['First Name'].fillna('') + ' ' + final_master_df['Last Name'].fillna('')
+    else:
+        final_master_df['Full Name'] = ''
 
-                combined_df = pd.concat([existing_master_df, students_for_master_report], ignore_index=True)
-                final_master_df = combined_df.drop_duplicates(subset=['ID Number', 'Marked Period'], keep='first')
+    desired_columns_order = [
+        'ID Number', 'First Name', 'Last Name', 'Full Name',
+        'Date/Time', 'Marked Period', 'Timestamp Processed'
+    ]
+    final_master_df = final_master_df[[col for col in desired_columns_order if col in final_master_df.columns]]
 
-                if 'First Name' in final_master_df.columns and 'Last Name' in final_master_df.columns:
-                    final_master_df['Full Name'] = final_master_df['First Name'].fillna('') + ' ' + final_master_df['Last Name'].fillna('')
-                else:
-                    final_master_df['Full Name'] = ''
+    try:
+        writer = pd.ExcelWriter(master_file_path, engine='xlsxwriter')
+        final_master_df.to_excel(writer, sheet_name='Daily Report', index=False)
+        writer.close()
+        print(f"Daily master report updated: {master_file_path}")
+
+    except Exception as master_report_error:
+        print(f"Error updating daily master report '{master_file_path}': {master_report_error}")
+        return None
+    return master_file_path
+
+@timed_step("select_students")
+def select_students_for_mass_update(driver, wait, powerschool_username, powerschool_password, ids_to_paste):
+    """Logs in to PowerSchool and opens Mass Update Attendance for the given IDs. Returns False on failure."""
+    if not powerschool_login(driver, wait, powerschool_username, powerschool_password):
+        print("Failed to login to PowerSchool. Exiting Raptor automation.")
+        return False
 
-                desired_columns_order = [
-                    'ID Number', 'First Name', 'Last Name', 'Full Name',
-                    'Date/Time', 'Marked Period', 'Timestamp Processed'
-                ]
-                final_master_df = final_master_df[[col for col in desired_columns_order if col in final_master_df.columns]]
+    print("Attempting to click 'MultiSelect - Students' link...")
+    multiselect_link = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "a.dialogDivM.custom_link[title='MultiSelect - Students']")))
+    multiselect_link.click()
+    print("'MultiSelect - Students' link clicked.")
+    print("Waiting for MultiSelect dialog to appear and textarea to be visible...")
+    multiselect_textarea = wait.until(EC.visibility_of_element_located((By.ID, "multiSelValsStu")))
+    multiselect_textarea.clear()
+    multiselect_textarea.send_keys(ids_to_paste)
+    print(f"IDs pasted into PowerSchool MultiSelect textarea.")
+    print("Attempting to click 'Search' button in MultiSelect dialog...")
+    search_button_xpath = "//button[contains(., 'Search') and @onclick=\"MultiSelect.searchType='admin'; MultiSelect.powerScheduler = 'Home'; MultiSelect.collectIDs();\"]"
+    search_button = wait.until(EC.element_to_be_clickable((By.XPATH, search_button_xpath)))
+    search_button.click()
+    print("'Search' button clicked in MultiSelect dialog.")
+    print("Waiting for student selection count to appear...")
+    student_count_element = wait.until(EC.visibility_of_element_located((By.XPATH, "//h2[contains(text(), 'Current Student Selection')]")))
+    time.sleep(0.5)
+    count_text = student_count_element.text
+    match = re.search(r'\((\d+)\)', count_text)
+    if match: print(f"Number of students selected: {match.group(1)}")
+    else: print("Could not extract student count.")
+
+    print("Attempting to click 'Group Functions' dropdown button...")
+    group_functions_button = wait.until(EC.element_to_be_clickable((By.ID, "selectFunctionDropdownButtonStudent")))
+    group_functions_button.click()
+    print("'Group Functions' dropdown button clicked.")
+    time.sleep(0.5)
+    print("Attempting to click 'Mass Update Attendance' link...")
+    mass_update_attendance_link = wait.until(EC.element_to_be_clickable((By.ID, "lnk_studentsMassUpdateAttendance")))
+    mass_update_attendance_link.click()
+    print("'Mass Update Attendance' link clicked.")
+    print("Waiting for redirection to batch attendance update page...")
+    expected_url_batch_attendance = "https://ednovate.powerschool.com/admin/attendance/record/batch/meetinggroup.html?dothisfor=selected"
+    wait.until(EC.url_to_be(expected_url_batch_attendance))
+    print(f"Successfully redirected to: {driver.current_url}")
+    return True
+
+@timed_step("mark_periods_au")
+def mark_periods_au(driver, wait, periods_to_mark_AU, auto_confirm):
+    """Marks the selected students AU (Truant Absence) for the given periods."""
+    print(f"\n Marking {len(periods_to_mark_AU)} previous period(s) as AU (Truant Absence)...")
+    for period_obj in periods_to_mark_AU:
+        print(f"  Selecting checkboxes for {period_obj['name']} (A/B columns)...")
+        try:
+            for col in ['1', '2']:
+                cb_xpath = f"//input[@type='checkbox' and @name='{period_obj['cb_prefix']};{col}']"
+                checkbox = wait.until(EC.element_to_be_clickable((By.XPATH, cb_xpath)))
+                if not checkbox.is_selected():
+                    checkbox.click()
+            print(f"    ✅ Checkboxes for {period_obj['name']} selected.")
+        except Exception as e:
+            print(f"    ❌ Error selecting checkboxes for {period_obj['name']}: {e}")
+
+    print("  Selecting 'AU' as attendance code...")
+    attendance_code_select_au = wait.until(EC.element_to_be_clickable((By.NAME, "att_attcodelist")))
+    select_au = Select(attendance_code_select_au)
+    select_au.select_by_value("AU")
+    print("    ✅ 'AU' selected.")
+
+    confirm_or_continue("👉 Review selections for AU. Press Enter to SUBMIT and continue", auto_confirm)
+    submit_button_ps_au = wait.until(EC.element_to_be_clickable((By.ID, "btnSubmit")))
+    submit_button_ps_au.click()
+    print("    ✅ Submit button clicked for AU marking. Waiting for page to process...")
+    wait.until(EC.staleness_of(submit_button_ps_au))
+    wait.until(EC.element_to_be_clickable((By.NAME, "att_attcodelist")))
+    print("    ✅ Page processed after AU submission.")
+    time.sleep(1)
+
+@timed_step("mark_period_ul")
+def mark_period_ul(driver, wait, selected_period_object, auto_confirm):
+    """Marks the selected students UL (Unexcused Late) for the selected period."""
+    print(f"\n Marking current period ({selected_period_object['name']}) as UL (Unexcused Late)...")
+    try:
+        clear_button = driver.find_element(By.XPATH, "//a[@name='btnClear' and normalize-space(.)='Clear']")
+        clear_button.click()
+        print("  Clicked 'Clear' button to reset period checkboxes.")
+        time.sleep(0.5)
+    except Exception:
+        print("  'Clear' button not found or clickable, proceeding with selections.")
 
+    print(f"  Selecting checkboxes for {selected_period_object['name']} (A/B columns)...")
+    try:
+        for col in ['1', '2']:
+            cb_xpath_ul = f"//input[@type='checkbox' and @name='{selected_period_object['cb_prefix']};{col}']"
+            checkbox_ul = wait.until(EC.element_to_be_clickable((By.XPATH, cb_xpath_ul)))
+            if not checkbox_ul.is_selected():
+                checkbox_ul.click()
+        print(f"    ✅ Checkboxes for {selected_period_object['name']} selected for UL.")
+    except Exception as e:
+        print(f"    ❌ Error selecting checkboxes for {selected_period_object['name']} for UL: {e}")
+
+    print("  Selecting 'UL' as attendance code...")
+    attendance_code_select_ul = wait.until(EC.element_to_be_clickable((By.NAME, "att_attcodelist")))
+    select_ul = Select(attendance_code_select_ul)
+    select_ul.select_by_value("UL")
+    print("    ✅ 'UL' selected.")
+
+    confirm_or_continue("👉 Review selections for UL. Press Enter to SUBMIT", auto_confirm)
+    submit_button_ps_ul = wait.until(EC.element_to_be_clickable((By.ID, "btnSubmit")))
+    submit_button_ps_ul.click()
+    print("    ✅ Submit button clicked for UL marking.")
+    wait.until(EC.staleness_of(submit_button_ps_ul))
+    print("    ✅ Page processed after UL submission.")
+
+@timed_run("period")
+def automate_raptor_and_powerschool(selected_period_object, all_periods_for_day, filter_start_str, filter_end_str,
+                                    auto_confirm=False, headless=False, resume=True):
+    """
+    Exports today's Raptor sign-ins, records the students who signed in
+    between filter_start_str and filter_end_str in the daily master report and
+    marks them in PowerSchool: AU for the periods before the selected one, UL
+    for the selected period. Runs as the PERIOD_RUN_STAGES, resuming from a
+    checkpoint left by an earlier incomplete run of the same period today.
+
+    Args:
+        auto_confirm (bool): Submit without waiting for review at each step and
+                             skip the review pauses (used by the scheduler).
+        headless (bool): Run Chrome without a window.
+        resume (bool): Resume from the checkpoint if there is one. False
+                       discards it and starts from the Raptor export.
+
+    Returns:
+        dict: 'completed' (True also when nobody signed in late) plus the
+              report paths, the student IDs marked UL, the periods marked AU,
+              the stages run and the stage the run failed in, if any.
+    """
+    result = {'operation': 'period', 'completed': False, 'period_id': selected_period_object['id'],
+              'period_name': selected_period_object['name'], 'filter_start': filter_start_str,
+              'filter_end': filter_end_str, 'raptor_report_path': None, 'master_report_path': None,
+              'student_ids': [], 'au_period_ids': [], 'resumed_from': None, 'stages_run': [],
+              'failed_stage': None}
+    raptor_username, raptor_password = load_credentials(CREDENTIALS_FILE, 'raptor')
+    if not raptor_username or not raptor_password:
+        return result
+
+    powerschool_username, powerschool_password = load_credentials(CREDENTIALS_FILE, 'powerschool')
+    if not powerschool_username or not powerschool_password:
+        return result
+
+    os.makedirs(RAPTOR_REPORTS_DIR, exist_ok=True)
+    os.makedirs(DAILY_MASTER_REPORTS_DIR, exist_ok=True)
+    print(f"Ensured '{RAPTOR_REPORTS_DIR}' and '{DAILY_MASTER_REPORTS_DIR}' directories exist.")
+
+    # Fixed when the run starts, so a run resumed after midnight still belongs
+    # to the day of its export and master report
+    report_date = datetime.now().strftime("%Y-%m-%d")
+    checkpoint_path = get_checkpoint_path(selected_period_object['id'], report_date)
+    run_key = {'period_id': selected_period_object['id'], 'report_date': report_date,
+               'filter_start': filter_start_str, 'filter_end': filter_end_str}
+    if resume:
+        checkpoint = load_checkpoint(checkpoint_path, run_key)
+    else:
+        checkpoint = {'run_key': run_key, 'completed_stages': [], 'artifacts': {}}
+    completed_stages = checkpoint['completed_stages']
+    artifacts = checkpoint['artifacts']
+    if completed_stages:
+        result['resumed_from'] = next(stage for stage in PERIOD_RUN_STAGES if stage not in completed_stages)
+        print(f"♻️ Resuming from stage '{result['resumed_from']}' (completed earlier: {', '.join(completed_stages)}).")
+    result['raptor_report_path'] = artifacts.get('raptor_report_path')
+    result['master_report_path'] = artifacts.get('master_report_path')
+    result['student_ids'] = artifacts.get('student_ids', [])
+
+    download_directory_for_chrome = os.path.join(os.getcwd(), RAPTOR_REPORTS_DIR)
+    print(f"RaptorTech Excel files will be downloaded to: {download_directory_for_chrome}")
+
+    driver = None
+    wait = None
+    current_stage = None
+    failed_stage = None
+    # Set by 'parse' in this run; None when resuming after it
+    students_for_master_report = None
+
+    def complete_stage(stage_name, **stage_artifacts):
+        artifacts.update(stage_artifacts)
+        if stage_name not in completed_stages:
+            completed_stages.append(stage_name)
+        result['stages_run'].append(stage_name)
+        save_checkpoint(checkpoint_path, checkpoint)
+
+    try:
+        target_period_index = all_periods_for_day.period_index(selected_period_object['id'])
+        if target_period_index is None:
+            print(f"❌ Error: Could not find selected period {selected_period_object['name']} in the period list for processing.")
+            return result
+        periods_to_mark_AU = all_periods_for_day[:target_period_index]
+
+        for current_stage in PERIOD_RUN_STAGES:
+            if current_stage == 'select':
+                if not artifacts.get('student_ids'):
+                    print("No IDs extracted from Excel, skipping PowerSchool automation.")
+                    break
+                # Selecting only sets up the browser, so it's repeated while any marking is left
+                if 'mark_au' in completed_stages and 'mark_ul' in completed_stages:
+                    continue
+            elif current_stage in completed_stages:
+                continue
+
+            if driver is None and current_stage in ('export', 'select'):
+                driver, wait = setup_webdriver(download_directory_for_chrome, headless=headless)
+
+            if current_stage == 'export':
+                raptor_report_path = export_raptor_report(driver, wait, raptor_username, raptor_password,
+                                                          download_directory_for_chrome)
+                if not raptor_report_path:
+                    failed_stage = current_stage
+                    break
+                result['raptor_report_path'] = raptor_report_path
+                complete_stage(current_stage, raptor_report_path=raptor_report_path)
+
+            elif current_stage == 'parse':
                 try:
-                    writer = pd.ExcelWriter(master_file_path, engine='xlsxwriter')
-                    final_master_df.to_excel(writer, sheet_name='Daily Report', index=False)
-                    writer.close()
-                    print(f"Daily master report updated: {master_file_path}")
-
-                except Exception as master_report_error:
-                    print(f"Error updating daily master report '{master_file_path}': {master_report_error}")
-
-            if ids_to_paste:
-                if not powerschool_login(driver, wait, powerschool_username, powerschool_password):
-                    print("Failed to login to PowerSchool. Exiting Raptor automation.")
-                    return
-
-                print("Attempting to click 'MultiSelect - Students' link...")
-                multiselect_link = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "a.dialogDivM.custom_link[title='MultiSelect - Students']")))
-                multiselect_link.click()
-                print("'MultiSelect - Students' link clicked.")
-                print("Waiting for MultiSelect dialog to appear and textarea to be visible...")
-                multiselect_textarea = wait.until(EC.visibility_of_element_located((By.ID, "multiSelValsStu")))
-                multiselect_textarea.clear()
-                multiselect_textarea.send_keys(ids_to_paste)
-                print(f"IDs pasted into PowerSchool MultiSelect textarea.")
-                print("Attempting to click 'Search' button in MultiSelect dialog...")
-                search_button_xpath = "//button[contains(., 'Search') and @onclick=\"MultiSelect.searchType='admin'; MultiSelect.powerScheduler = 'Home'; MultiSelect.collectIDs();\"]"
-                search_button = wait.until(EC.element_to_be_clickable((By.XPATH, search_button_xpath)))
-                search_button.click()
-                print("'Search' button clicked in MultiSelect dialog.")
-                print("Waiting for student selection count to appear...")
-                student_count_element = wait.until(EC.visibility_of_element_located((By.XPATH, "//h2[contains(text(), 'Current Student Selection')]")))
-                time.sleep(0.5)
-                count_text = student_count_element.text
-                match = re.search(r'\((\d+)\)', count_text)
-                if match: print(f"Number of students selected: {match.group(1)}")
-                else: print("Could not extract student count.")
-
-                print("Attempting to click 'Group Functions' dropdown button...")
-                group_functions_button = wait.until(EC.element_to_be_clickable((By.ID, "selectFunctionDropdownButtonStudent")))
-                group_functions_button.click()
-                print("'Group Functions' dropdown button clicked.")
-                time.sleep(0.5)
-                print("Attempting to click 'Mass Update Attendance' link...")
-                mass_update_attendance_link = wait.until(EC.element_to_be_clickable((By.ID, "lnk_studentsMassUpdateAttendance")))
-                mass_update_attendance_link.click()
-                print("'Mass Update Attendance' link clicked.")
-                print("Waiting for redirection to batch attendance update page...")
-                expected_url_batch_attendance = "https://ednovate.powerschool.com/admin/attendance/record/batch/meetinggroup.html?dothisfor=selected"
-                wait.until(EC.url_to_be(expected_url_batch_attendance))
-                print(f"Successfully redirected to: {driver.current_url}")
-
-                target_period_index = -1
-                for i, p in enumerate(all_periods_for_day):
-                    if p['id'] == selected_period_object['id']:
-                        target_period_index = i
+                    extracted_ids, students_for_master_report = parse_raptor_report(
+                        artifacts['raptor_report_path'], selected_period_object, all_periods_for_day,
+                        filter_start_str, filter_end_str)
+                except Exception as excel_error:
+                    print(f"Error processing Excel file for IDs: {excel_error}")
+                    failed_stage = current_stage
+                    break
+                result['student_ids'] = extracted_ids
+                # Also kept as JSON records so a resumed run can write the master report without the export
+                master_rows = json.loads(students_for_master_report.to_json(orient='records', date_format='iso'))
+                complete_stage(current_stage, student_ids=extracted_ids, master_rows=master_rows)
+
+            elif current_stage == 'persist':
+                if students_for_master_report is None:
+                    # Resumed after 'parse': rebuild the rows from the checkpoint
+                    students_for_master_report = pd.DataFrame(artifacts.get('master_rows', []))
+                    if not students_for_master_report.empty:
+                        students_for_master_report['Date/Time'] = pd.to_datetime(students_for_master_report['Date/Time'])
+                master_report_path = None
+                if not students_for_master_report.empty:
+                    master_report_path = update_daily_master_report(students_for_master_report, report_date)
+                    if not master_report_path:
+                        failed_stage = current_stage
                         break
+                result['master_report_path'] = master_report_path
+                complete_stage(current_stage, master_report_path=master_report_path)
 
-                if target_period_index == -1:
-                    print(f"❌ Error: Could not find selected period {selected_period_object['name']} in the period list for processing.")
-                else:
-                    periods_to_mark_AU = all_periods_for_day[:target_period_index]
-                    if periods_to_mark_AU:
-                        print(f"\n Marking {len(periods_to_mark_AU)} previous period(s) as AU (Truant Absence)...")
-                        for period_obj in periods_to_mark_AU:
-                            print(f"  Selecting checkboxes for {period_obj['name']} (A/B columns)...")
-                            try:
-                                for col in ['1', '2']:
-                                    cb_xpath = f"//input[@type='checkbox' and @name='{period_obj['cb_prefix']};{col}']"
-                                    checkbox = wait.until(EC.element_to_be_clickable((By.XPATH, cb_xpath)))
-                                    if not checkbox.is_selected():
-                                        checkbox.click()
-                                print(f"    ✅ Checkboxes for {period_obj['name']} selected.")
-                            except Exception as e:
-                                print(f"    ❌ Error selecting checkbox {cb_name}: {e}")
-
-                        print("  Selecting 'AU' as attendance code...")
-                        attendance_code_select_au = wait.until(EC.element_to_be_clickable((By.NAME, "att_attcodelist")))
-                        select_au = Select(attendance_code_select_au)
-                        select_au.select_by_value("AU")
-                        print("    ✅ 'AU' selected.")
-
-                        safe_input("👉 Review selections for AU. Press Enter to SUBMIT and continue")
-                        submit_button_ps_au = wait.until(EC.element_to_be_clickable((By.ID, "btnSubmit")))
-                        submit_button_ps_au.click()
-                        print("    ✅ Submit button clicked for AU marking. Waiting for page to process...")
-                        wait.until(EC.staleness_of(submit_button_ps_au))
-                        wait.until(EC.element_to_be_clickable((By.NAME, "att_attcodelist")))
-                        print("    ✅ Page processed after AU submission.")
-                        time.sleep(1)
-
-                    print(f"\n Marking current period ({selected_period_object['name']}) as UL (Unexcused Late)...")
-                    try:
-                        clear_button = driver.find_element(By.XPATH, "//a[@name='btnClear' and normalize-space(.)='Clear']")
-                        clear_button.click()
-                        print("  Clicked 'Clear' button to reset period checkboxes.")
-                        time.sleep(0.5)
-                    except Exception:
-                        print("  'Clear' button not found or clickable, proceeding with selections.")
-
-                    print(f"  Selecting checkboxes for {selected_period_object['name']} (A/B columns)...")
-                    try:
-                        for col in ['1', '2']:
-                            cb_xpath_ul = f"//input[@type='checkbox' and @name='{selected_period_object['cb_prefix']};{col}']"
-                            checkbox_ul = wait.until(EC.element_to_be_clickable((By.XPATH, cb_xpath_ul)))
-                            if not checkbox_ul.is_selected():
-                                checkbox_ul.click()
-                        print(f"    ✅ Checkboxes for {selected_period_object['name']} selected for UL.")
-                    except Exception as e:
-                        print(f"    ❌ Error selecting checkboxes for {selected_period_object['name']} for UL: {e}")
-
-                    print("  Selecting 'UL' as attendance code...")
-                    attendance_code_select_ul = wait.until(EC.element_to_be_clickable((By.NAME, "att_attcodelist")))
-                    select_ul = Select(attendance_code_select_ul)
-                    select_ul.select_by_value("UL")
-                    print("    ✅ 'UL' selected.")
-
-                    safe_input("👉 Review selections for UL. Press Enter to SUBMIT")
-                    submit_button_ps_ul = wait.until(EC.element_to_be_clickable((By.ID, "btnSubmit")))
-                    submit_button_ps_ul.click()
-                    print("    ✅ Submit button clicked for UL marking.")
-                    wait.until(EC.staleness_of(submit_button_ps_ul))
-                    print("    ✅ Page processed after UL submission.")
-
-                print("\n🎉 PowerSchool batch update process complete. Browser will stay open for 10 seconds for final review.")
-                time.sleep(10)
-            else:
-                print("No IDs extracted from Excel, skipping PowerSchool automation.")
+            elif current_stage == 'select':
+                if not select_students_for_mass_update(driver, wait, powerschool_username, powerschool_password,
+                                                       "\n".join(artifacts['student_ids'])):
+                    failed_stage = current_stage
+                    break
+                complete_stage(current_stage)
+
+            elif current_stage == 'mark_au':
+                if periods_to_mark_AU:
+                    mark_periods_au(driver, wait, periods_to_mark_AU, auto_confirm)
+                complete_stage(current_stage, au_period_ids=[period_obj['id'] for period_obj in periods_to_mark_AU])
+
+            elif current_stage == 'mark_ul':
+                mark_period_ul(driver, wait, selected_period_object, auto_confirm)
+                complete_stage(current_stage)
+
+        result['au_period_ids'] = artifacts.get('au_period_ids', [])
+        if failed_stage:
+            result['failed_stage'] = failed_stage
+            print(f"⏸️ Run stopped at stage '{failed_stage}'. Run the same period again to resume from there.")
         else:
-            print("❌ Error: RaptorTech download did not complete or .xlsx file not found within the timeout.")
-            if driver: driver.save_screenshot('download_error_screenshot.png')
+            result['completed'] = True
+            if os.path.exists(checkpoint_path):
+                os.remove(checkpoint_path)
+            if artifacts.get('student_ids'):
+                if auto_confirm:
+                    print("\n🎉 PowerSchool batch update process complete.")
+                else:
+                    print("\n🎉 PowerSchool batch update process complete. Browser will stay open for 10 seconds for final review.")
+                    time.sleep(10)
 
-        print("Automation process complete. Browser will close in 5 seconds...")
-        time.sleep(5)
+        if driver and not auto_confirm:
+            print("Automation process complete. Browser will close in 5 seconds...")
+            time.sleep(5)
 
     except SystemExit:
+        result['failed_stage'] = current_stage
         print("Application exited by user during automation process.")
     except Exception as e:
-        print(f"❌ An unexpected error occurred during Raptor automation: {e}")
+        result['failed_stage'] = current_stage
+        print(f"❌ An unexpected error occurred during Raptor automation (stage '{current_stage}'): {e}")
+        print("Run the same period again to resume from this stage.")
         if driver:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             error_screenshot_name = f'raptor_automation_error_screenshot_{timestamp}.png'
@@ -906,19 +1207,32 @@ def automate_raptor_and_powerschool(selected_period_object, all_periods_for_day,
         if driver:
             print("Closing the browser.")
             driver.quit()
+    return result
 
 # --- New End of Day Refinement Function ---
-def end_of_day_refinement():
+@timed_run("eod")
+def end_of_day_refinement(auto_confirm=False, headless=False):
+    """
+    Marks every period T for all students, then A, as the end-of-day pass.
+
+    Args:
+        auto_confirm (bool): Submit without waiting for review at each step.
+        headless (bool): Run Chrome without a window.
+
+    Returns:
+        dict: 'completed' is True once both passes were submitted.
+    """
+    result = {'operation': 'eod', 'completed': False}
     powerschool_username, powerschool_password = load_credentials(CREDENTIALS_FILE, 'powerschool')
     if not powerschool_username or not powerschool_password:
-        return
+        return result
 
     driver = None
     try:
-        driver, wait = setup_webdriver(os.getcwd()) # No specific download dir needed for this
+        driver, wait = setup_webdriver(os.getcwd(), headless=headless) # No specific download dir needed for this
         if not powerschool_login(driver, wait, powerschool_username, powerschool_password):
             print("Failed to login to PowerSchool. Exiting End of Day Refinement.")
-            return
+            return result
 
         print(f"Navigating to PowerSchool Home: {POWERSCHOOL_LOGIN_URL}")
         driver.get("https://ednovate.powerschool.com/admin/home.html")
@@ -933,93 +1247,99 @@ def end_of_day_refinement():
         print("All students selected.")
 
         # --- First Pass: Mark as T (Tardy) ---
-        print("\n--- Starting First Pass: Marking selected periods as T (Tardy) ---")
-        print("Attempting to click 'Group Functions' dropdown button...")
-        group_functions_button = wait.until(EC.element_to_be_clickable((By.ID, "selectFunctionDropdownButtonStudent")))
-        group_functions_button.click()
-        print("'Group Functions' dropdown button clicked.")
-        time.sleep(0.5)
-
-        print("Attempting to click 'Mass Update Attendance' link...")
-        mass_update_attendance_link = wait.until(EC.element_to_be_clickable((By.ID, "lnk_studentsMassUpdateAttendance")))
-        mass_update_attendance_link.click()
-        print("'Mass Update Attendance' link clicked.")
-
-        print("Waiting for redirection to batch attendance update page...")
-        expected_url_batch_attendance = "https://ednovate.powerschool.com/admin/attendance/record/batch/meetinggroup.html?dothisfor=selected"
-        wait.until(EC.url_to_be(expected_url_batch_attendance))
-        print(f"Successfully redirected to: {driver.current_url}")
-
-        print("  Selecting checkboxes for AMA, P1-P5, PMA for T (Tardy) marking...")
-        periods_for_tardy_absent = ['cb7', 'cb1', 'cb2', 'cb3', 'cb4', 'cb5', 'cb8'] # AMA, P1-P5, PMA
-        for cb_prefix in periods_for_tardy_absent:
-            for col in ['1', '2']: # A and B columns for each period
-                cb_name = f"{cb_prefix};{col}"
-                print(f"    Selecting checkbox for {cb_name}...")
-                try:
-                    cb_xpath = f"//input[@type='checkbox' and @name='{cb_name}']"
-                    checkbox = wait.until(EC.element_to_be_clickable((By.XPATH, cb_xpath)))
-                    if not checkbox.is_selected():
-                        checkbox.click()
-                    print(f"      ✅ Checkbox {cb_name} selected.")
-                except Exception as e:
-                    print(f"      ❌ Error selecting checkbox {cb_name}: {e}")
-
-        print("  Selecting 'T - Tardy' as attendance code (Value: 824)...")
-        attendance_code_select_t = wait.until(EC.element_to_be_clickable((By.NAME, "att_attcodelist")))
-        select_t = Select(attendance_code_select_t)
-        select_t.select_by_value("824") # Value for T - Tardy
-        print("    ✅ 'T - Tardy' selected.")
-
-        safe_input("👉 Review ALL selected periods for T. Press Enter to SUBMIT this first batch update.")
-        submit_button_ps_t = wait.until(EC.element_to_be_clickable((By.ID, "btnSubmit")))
-        submit_button_ps_t.click()
-        print("    ✅ Submit button clicked for T marking. Waiting for page to process...")
-        wait.until(EC.staleness_of(submit_button_ps_t))
-        wait.until(EC.presence_of_element_located((By.NAME, "att_attcodelist")))
-        print("    ✅ Page processed after T submission.")
-        time.sleep(1)
-
-        # --- Second Pass: Mark as A (Absent) ---
-        print("\n--- Starting Second Pass: Marking all periods as A (Absent) ---")
-        print("  Clearing all previously selected checkboxes...")
-        try:
-            clear_button = driver.find_element(By.XPATH, "//a[@name='btnClear' and normalize-space(.)='Clear']")
-            clear_button.click()
-            print("  Clicked 'Clear' button to reset period checkboxes.")
+        with timed_step("mark_all_t"):
+            print("\n--- Starting First Pass: Marking selected periods as T (Tardy) ---")
+            print("Attempting to click 'Group Functions' dropdown button...")
+            group_functions_button = wait.until(EC.element_to_be_clickable((By.ID, "selectFunctionDropdownButtonStudent")))
+            group_functions_button.click()
+            print("'Group Functions' dropdown button clicked.")
             time.sleep(0.5)
-        except Exception:
-            print("  'Clear' button not found or clickable, proceeding with selections.")
-
-        print("  Selecting checkboxes for AMA, P1-P5, PMA for A (Absent) marking...")
-        for cb_prefix in periods_for_tardy_absent:
-            for col in ['1', '2']:
-                cb_name = f"{cb_prefix};{col}"
-                print(f"    Selecting checkbox for {cb_name}...")
-                try:
-                    cb_xpath = f"//input[@type='checkbox' and @name='{cb_name}']"
-                    checkbox = wait.until(EC.element_to_be_clickable((By.XPATH, cb_xpath)))
-                    if not checkbox.is_selected():
-                        checkbox.click()
-                    print(f"      ✅ Checkbox {cb_name} selected.")
-                except Exception as e:
-                    print(f"      ❌ Error selecting checkbox {cb_name}: {e}")
 
-        print("  Selecting 'A - Absent' as attendance code (Value: 829)...")
-        attendance_code_select_a = wait.until(EC.element_to_be_clickable((By.NAME, "att_attcodelist")))
-        select_a = Select(attendance_code_select_a)
-        select_a.select_by_value("829") # Value for A - Absent
-        print("    ✅ 'A - Absent' selected.")
-
-        safe_input("👉 Review ALL selected periods for A. Press Enter to SUBMIT this final batch update.")
-        submit_button_ps_a = wait.until(EC.element_to_be_clickable((By.ID, "btnSubmit")))
-        submit_button_ps_a.click()
-        print("    ✅ Submit button clicked for A marking.")
-        wait.until(EC.staleness_of(submit_button_ps_a))
-        print("    ✅ Page processed after A submission.")
+            print("Attempting to click 'Mass Update Attendance' link...")
+            mass_update_attendance_link = wait.until(EC.element_to_be_clickable((By.ID, "lnk_studentsMassUpdateAttendance")))
+            mass_update_attendance_link.click()
+            print("'Mass Update Attendance' link clicked.")
+
+            print("Waiting for redirection to batch attendance update page...")
+            expected_url_batch_attendance = "https://ednovate.powerschool.com/admin/attendance/record/batch/meetinggroup.html?dothisfor=selected"
+            wait.until(EC.url_to_be(expected_url_batch_attendance))
+            print(f"Successfully redirected to: {driver.current_url}")
+
+            print("  Selecting checkboxes for AMA, P1-P5, PMA for T (Tardy) marking...")
+            periods_for_tardy_absent = ['cb7', 'cb1', 'cb2', 'cb3', 'cb4', 'cb5', 'cb8'] # AMA, P1-P5, PMA
+            for cb_prefix in periods_for_tardy_absent:
+                for col in ['1', '2']: # A and B columns for each period
+                    cb_name = f"{cb_prefix};{col}"
+                    print(f"    Selecting checkbox for {cb_name}...")
+                    try:
+                        cb_xpath = f"//input[@type='checkbox' and @name='{cb_name}']"
+                        checkbox = wait.until(EC.element_to_be_clickable((By.XPATH, cb_xpath)))
+                        if not checkbox.is_selected():
+                            checkbox.click()
+                        print(f"      ✅ Checkbox {cb_name} selected.")
+                    except Exception as e:
+                        print(f"      ❌ Error selecting checkbox {cb_name}: {e}")
+
+            print("  Selecting 'T - Tardy' as attendance code (Value: 824)...")
+            attendance_code_select_t = wait.until(EC.element_to_be_clickable((By.NAME, "att_attcodelist")))
+            select_t = Select(attendance_code_select_t)
+            select_t.select_by_value("824") # Value for T - Tardy
+            print("    ✅ 'T - Tardy' selected.")
+
+            confirm_or_continue("👉 Review ALL selected periods for T. Press Enter to SUBMIT this first batch update.", auto_confirm)
+            submit_button_ps_t = wait.until(EC.element_to_be_clickable((By.ID, "btnSubmit")))
+            submit_button_ps_t.click()
+            print("    ✅ Submit button clicked for T marking. Waiting for page to process...")
+            wait.until(EC.staleness_of(submit_button_ps_t))
+            wait.until(EC.presence_of_element_located((By.NAME, "att_attcodelist")))
+            print("    ✅ Page processed after T submission.")
+            time.sleep(1)
 
-        print("\n🎉 End of Day Refinement process complete. Browser will stay open for 10 seconds for final review.")
-        time.sleep(10)
+        # --- Second Pass: Mark as A (Absent) ---
+        with timed_step("mark_all_a"):
+            print("\n--- Starting Second Pass: Marking all periods as A (Absent) ---")
+            print("  Clearing all previously selected checkboxes...")
+            try:
+                clear_button = driver.find_element(By.XPATH, "//a[@name='btnClear' and normalize-space(.)='Clear']")
+                clear_button.click()
+                print("  Clicked 'Clear' button to reset period checkboxes.")
+                time.sleep(0.5)
+            except Exception:
+                print("  'Clear' button not found or clickable, proceeding with selections.")
+
+            print("  Selecting checkboxes for AMA, P1-P5, PMA for A (Absent) marking...")
+            for cb_prefix in periods_for_tardy_absent:
+                for col in ['1', '2']:
+                    cb_name = f"{cb_prefix};{col}"
+                    print(f"    Selecting checkbox for {cb_name}...")
+                    try:
+                        cb_xpath = f"//input[@type='checkbox' and @name='{cb_name}']"
+                        checkbox = wait.until(EC.element_to_be_clickable((By.XPATH, cb_xpath)))
+                        if not checkbox.is_selected():
+                            checkbox.click()
+                        print(f"      ✅ Checkbox {cb_name} selected.")
+                    except Exception as e:
+                        print(f"      ❌ Error selecting checkbox {cb_name}: {e}")
+
+            print("  Selecting 'A - Absent' as attendance code (Value: 829)...")
+            attendance_code_select_a = wait.until(EC.element_to_be_clickable((By.NAME, "att_attcodelist")))
+            select_a = Select(attendance_code_select_a)
+            select_a.select_by_value("829") # Value for A - Absent
+            print("    ✅ 'A - Absent' selected.")
+
+            confirm_or_continue("👉 Review ALL selected periods for A. Press Enter to SUBMIT this final batch update.", auto_confirm)
+            submit_button_ps_a = wait.until(EC.element_to_be_clickable((By.ID, "btnSubmit")))
+            submit_button_ps_a.click()
+            print("    ✅ Submit button clicked for A marking.")
+            wait.until(EC.staleness_of(submit_button_ps_a))
+            print("    ✅ Page processed after A submission.")
+
+        result['completed'] = True
+        if auto_confirm:
+            print("\n🎉 End of Day Refinement process complete.")
+        else:
+            print("\n🎉 End of Day Refinement process complete. Browser will stay open for 10 seconds for final review.")
+            time.sleep(10)
 
     except SystemExit:
         print("Application exited by user during End of Day Refinement process.")
@@ -1037,6 +1357,7 @@ def end_of_day_refinement():
         if driver:
             print("Closing the browser.")
             driver.quit()
+    return result
 
 
 # --- Main Menu Prompt ---
@@ -1049,7 +1370,8 @@ def main_menu_prompt():
     choice = safe_input("Enter choice (1, 2, or 3)").strip()
     return choice
 
-if __name__ == "__main__":
+def run_interactive_menu():
+    """The original menu-driven flow."""
     print(ROSA_ASCII_ART) # Display ASCII art
     print("Reliable Operations and Student Attendance") # Followed by text
     print("-----------------------------------------------------")
@@ -1068,6 +1390,10 @@ if __name__ == "__main__":
             consolidate_attendance()
         elif operation_choice == '2':
             print("\nStarting Raptor Attendance workflow...")
+            schedule_book = get_schedule_book()
+            if schedule_book is None:
+                print("Fix rosa_schedules.json and start the workflow again.")
+                return
             print("📅 Please select the schedule type for Monday-Thursday operations for this session:")
             print("  1. Normal Schedule")
             print("  2. Enrichment Schedule")
@@ -1076,32 +1402,25 @@ if __name__ == "__main__":
             while active_m_th_schedule is None:
                 schedule_choice = safe_input("Enter M-Th schedule choice (1 or 2)")
                 if schedule_choice == "1":
-                    active_m_th_schedule = M_TH_NORMAL_PERIODS
+                    active_m_th_schedule = schedule_book.schedules["normal"]
                     print(" Normal Schedule selected for M-Th operations.")
                 elif schedule_choice == "2":
-                    active_m_th_schedule = M_TH_ENRICHMENT_PERIODS
+                    active_m_th_schedule = schedule_book.schedules["enrichment"]
                     print(" Enrichment Schedule selected for M-Th operations.")
                 else:
                     print("Invalid choice. Please enter 1 or 2.")
 
-            effective_periods_config = {
-                "M": active_m_th_schedule,
-                "T": active_m_th_schedule,
-                "W": active_m_th_schedule,
-                "H": active_m_th_schedule,
-                "F": ACTUAL_F_PERIODS,
-                "S": SPECIAL_DAY_SCHEDULE
-            }
+            effective_periods_config = build_effective_periods_config(schedule_book, active_m_th_schedule)
 
-            if not ACTUAL_F_PERIODS or len(ACTUAL_F_PERIODS) < 1:
-                print("🚨 WARNING: Friday period schedule (ACTUAL_F_PERIODS) appears to be missing or empty in the script.")
+            if len(effective_periods_config["F"]) < 1:
+                print("🚨 WARNING: The Friday period schedule appears to be missing or empty in rosa_schedules.json.")
 
             selected_day_key, selected_period, all_periods_for_day, filter_start, filter_end = get_user_day_and_period_selection(effective_periods_config)
 
             print(f"\n--- Script Configuration for this Run ---")
             print(f"Selected Day Type: {selected_day_key}")
             if selected_day_key in ['M','T','W','H']:
-                if active_m_th_schedule == M_TH_NORMAL_PERIODS:
+                if active_m_th_schedule is schedule_book.schedules["normal"]:
                     print(f"M-Th Schedule Type: Normal")
                 else:
                     print(f"M-Th Schedule Type: Enrichment")
@@ -1121,3 +1440,119 @@ if __name__ == "__main__":
     except Exception as main_err:
         print(f"❌ An unexpected error occurred in the main execution block: {main_err}")
 
+# --- Command-Line Interface ---
+# Without arguments ROSA shows the interactive menu. With a subcommand every
+# choice comes from flags, so runs can be scripted, chained and timed:
+#   python rosa_v_0_3.py consolidate --min-absences 3 --yes --json
+#   python rosa_v_0_3.py period --day M --schedule enrichment --period P2 --yes
+#   python rosa_v_0_3.py period --day S --period AMA --start "08:00 AM" --end "10:00 AM"
+#   python rosa_v_0_3.py eod --yes --headless --json
+# With --json, progress messages go to stderr and stdout carries one JSON
+# object describing the run. The exit code is 0 if the run completed.
+
+def build_arg_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--yes", action="store_true", help="Submit without pausing for review at each step.")
+    common.add_argument("--headless", action="store_true", help="Run Chrome without a window.")
+    common.add_argument("--json", action="store_true", help="Print the result as JSON on stdout (progress goes to stderr).")
+
+    parser = argparse.ArgumentParser(description="ROSA: Reliable Operations and Student Attendance.")
+    subparsers = parser.add_subparsers(dest="operation", required=True)
+
+    consolidate_parser = subparsers.add_parser("consolidate", parents=[common],
+                                               help="Consolidate Absences (from Meeting Attendance Report).")
+    consolidate_parser.add_argument("--min-absences", type=int, required=True,
+                                    help="Minimum number of TOTAL absences to flag a student.")
+
+    period_parser = subparsers.add_parser("period", parents=[common],
+                                          help="Raptor Attendance (Daily Sign-in / Late Arrivals) for one period.")
+    period_parser.add_argument("--day", choices=list(DAY_NAMES),
+                               help="Day key: M, T, W, H, F, or S for a Special Day. "
+                                    "Defaults to today, with the schedule from the calendar in rosa_schedules.json.")
+    period_parser.add_argument("--schedule", choices=["normal", "enrichment"],
+                               help="Monday-Thursday schedule for --day M-H (default: normal). Without --day, replaces "
+                                    "the calendar's normal or enrichment schedule for today.")
+    period_parser.add_argument("--period",
+                               help="Period to mark UL: AMA, P1-P5, PMA (or the menu numbers 7, 1-5, 8). "
+                                    "Defaults to the period whose late-arrival window is open now.")
+    period_parser.add_argument("--start", help="START time for ID filtering, e.g. '08:00 AM'. Required for --day S.")
+    period_parser.add_argument("--end", help="END time for ID filtering, e.g. '03:00 PM'. Required for --day S.")
+    period_parser.add_argument("--fresh", action="store_true",
+                               help="Ignore the checkpoint of an earlier incomplete run and start from the Raptor export.")
+
+    subparsers.add_parser("eod", parents=[common],
+                          help="End of Day Refinement (Mass Tardy/Absent for All Students).")
+    return parser
+
+def run_operation(args, parser):
+    """Runs the operation chosen on the command line and returns its result dict."""
+    if args.operation == "consolidate":
+        if args.min_absences < 1:
+            parser.error("--min-absences must be a positive integer.")
+        return consolidate_attendance(min_total_absences=args.min_absences, auto_confirm=args.yes, headless=args.headless)
+
+    if args.operation == "period":
+        schedule_book = get_schedule_book()
+        if schedule_book is None:
+            return {'operation': 'period', 'completed': False}
+        now = datetime.now()
+        day_key = args.day
+        if day_key is None:
+            # Today's period table is the one the calendar picks for the date,
+            # whatever the weekday (e.g. enrichment on a Friday, or a make-up
+            # day on a Saturday)
+            todays_schedule = schedule_book.schedule_for_date(now.date())
+            if todays_schedule.name == NO_SCHOOL_SCHEDULE:
+                parser.error("There is no school today according to the calendar; pass --day.")
+            if args.schedule is not None and todays_schedule.name in ("normal", "enrichment"):
+                todays_schedule = schedule_book.schedules[args.schedule]
+            day_key = "S" if todays_schedule.name == "special" else TODAY_DAY_KEY
+            effective_periods_config = {day_key: todays_schedule}
+        else:
+            effective_periods_config = build_effective_periods_config(schedule_book, schedule_book.schedules[args.schedule or "normal"])
+
+        period_choice = args.period
+        if period_choice is None:
+            current_period = effective_periods_config[day_key].late_arrival_period_at(now.hour * 60 + now.minute)
+            if current_period is None:
+                parser.error("No late-arrival window is open right now; pass --period.")
+            period_choice = current_period['id']
+        try:
+            _, selected_period, all_periods_for_day, filter_start, filter_end = resolve_period_selection(
+                effective_periods_config, day_key, period_choice, args.start, args.end)
+        except ValueError as e:
+            parser.error(str(e))
+        os.makedirs(RAPTOR_REPORTS_DIR, exist_ok=True)
+        os.makedirs(DAILY_MASTER_REPORTS_DIR, exist_ok=True)
+        print(f"Target Period for UL: {selected_period['name']}")
+        print(f"Excel Date/Time Filter: From {filter_start} to {filter_end}")
+        return automate_raptor_and_powerschool(selected_period, all_periods_for_day, filter_start, filter_end,
+                                               auto_confirm=args.yes, headless=args.headless, resume=not args.fresh)
+
+    return end_of_day_refinement(auto_confirm=args.yes, headless=args.headless)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        run_interactive_menu()
+        return 0
+
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    start_time = time.perf_counter()
+    if args.json:
+        with contextlib.redirect_stdout(sys.stderr):
+            result = run_operation(args, parser)
+    else:
+        result = run_operation(args, parser)
+    result['elapsed_seconds'] = round(time.perf_counter() - start_time, 3)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        status = "completed" if result['completed'] else "did not complete"
+        print(f"\n{args.operation}: {status} in {result['elapsed_seconds']:.1f} s.")
+    return 0 if result['completed'] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
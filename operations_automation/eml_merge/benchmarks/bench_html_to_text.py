@@ -0,0 +1,94 @@
+import argparse
+import email
+import os
+import statistics
+import sys
+import time
+from email.policy import default
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from eml_merger import HTML_TEXT_BACKENDS  # noqa: E402
+
+# Checks that the HTML-to-text backends produce the same body text on a folder
+# of real .eml files, and times each backend per email.
+#
+# Usage:
+#   python benchmarks/bench_html_to_text.py path/to/eml_folder
+#   python benchmarks/bench_html_to_text.py path/to/eml_folder --show-diffs 5
+
+REFERENCE_BACKEND = 'html.parser'
+
+def load_html_bodies(eml_folder_path):
+    """Returns (filename, html_body) for every .eml file in the folder that has an HTML part."""
+    html_bodies = []
+    for filename in sorted(os.listdir(eml_folder_path)):
+        if not filename.lower().endswith('.eml'):
+            continue
+        with open(os.path.join(eml_folder_path, filename), 'rb') as f:
+            msg = email.message_from_binary_file(f, policy=default)
+        for part in msg.walk():
+            if part.get_content_type() == 'text/html' and 'attachment' not in str(part.get('Content-Disposition')):
+                charset = part.get_content_charset()
+                html_bodies.append((filename, part.get_payload(decode=True).decode(charset if charset else 'utf-8', errors='ignore')))
+                break
+    return html_bodies
+
+def normalize_text(text):
+    """
+    Stripped lines with each run of blank lines collapsed to one: what ends up
+    in the PDF, where a blank line starts a new paragraph but more than one
+    makes no difference (see split_body_paragraphs).
+    """
+    lines = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line or (lines and lines[-1]):
+            lines.append(line)
+    if lines and not lines[-1]:
+        lines.pop()
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description="Parity check and micro-benchmark of the HTML-to-text backends.")
+    parser.add_argument("eml_folder", help="Folder of .eml files to use as the corpus.")
+    parser.add_argument("--show-diffs", type=int, default=3, help="Number of differing emails to print.")
+    args = parser.parse_args()
+
+    html_bodies = load_html_bodies(args.eml_folder)
+    if not html_bodies:
+        print(f"No .eml files with an HTML body found in '{args.eml_folder}'.")
+        return 1
+
+    outputs = {}
+    for backend, html_to_text in HTML_TEXT_BACKENDS.items():
+        timings = []
+        outputs[backend] = []
+        for _, html_body in html_bodies:
+            start_time = time.perf_counter()
+            outputs[backend].append(html_to_text(html_body))
+            timings.append(time.perf_counter() - start_time)
+        print(f"{backend:>12}: median {statistics.median(timings) * 1000:.3f} ms/email, total {sum(timings):.3f} s")
+
+    for backend in HTML_TEXT_BACKENDS:
+        if backend == REFERENCE_BACKEND:
+            continue
+        exact_matches = 0
+        normalized_matches = 0
+        shown_diffs = 0
+        for (filename, _), reference_text, backend_text in zip(html_bodies, outputs[REFERENCE_BACKEND], outputs[backend]):
+            if backend_text == reference_text:
+                exact_matches += 1
+                normalized_matches += 1
+            elif normalize_text(backend_text) == normalize_text(reference_text):
+                normalized_matches += 1
+            elif shown_diffs < args.show_diffs:
+                shown_diffs += 1
+                print(f"\n--- {filename}: {backend} differs from {REFERENCE_BACKEND} ---")
+                print(f"{REFERENCE_BACKEND}: {normalize_text(reference_text)[:10]}")
+                print(f"{backend}: {normalize_text(backend_text)[:10]}")
+        print(f"\n{backend} vs {REFERENCE_BACKEND}: {exact_matches}/{len(html_bodies)} identical, "
+              f"{normalized_matches}/{len(html_bodies)} identical after collapsing whitespace and runs of blank lines")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
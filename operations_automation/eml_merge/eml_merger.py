@@ -1,15 +1,658 @@
+import argparse
+import datetime
 import email
+import hashlib
+import json
+from email.parser import BytesHeaderParser
 from email.policy import default
+from email.utils import parsedate_to_datetime
+import math
+import mmap
 import os
+import re
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from bs4 import BeautifulSoup
+from pypdf import PdfWriter
+try:
+    from lxml import etree
+except ImportError:
+    etree = None  # The 'lxml' backend falls back to BeautifulSoup's html.parser
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib.units import inch
 from reportlab.lib.pagesizes import letter
-import tkinter as tk
-from tkinter import filedialog, messagebox # Import messagebox for user feedback
 
-def eml_to_pdf_batch_converter(output_pdf_name="merged_emails.pdf"):
+# Usage:
+#   python eml_merger.py                                   (folder dialog)
+#   python eml_merger.py path/to/eml_folder -o merged_emails.pdf
+#   python eml_merger.py export.mbox -o merged_emails.pdf
+#   python eml_merger.py path/to/Maildir -o merged_emails.pdf --workers 4
+
+# --- Message Sources ---
+# Messages are passed around as small references instead of parsed messages,
+# so only the worker that renders a message ever reads it:
+#   ('file', path)                 an .eml file, or a message file in a Maildir
+#   ('mbox', path, start, stop)    a byte range of an mbox file
+# An mbox is indexed with a single scan for its "From " separator lines and
+# each message is read straight from its byte range, so large mailbox exports
+# are never exploded into .eml files. Body lines that started with "From " were
+# escaped as ">From " when the mbox was written (">>From " for ">From ", and
+# so on); reading a message removes one ">" from each of them again.
+INPUT_FORMATS = ('auto', 'folder', 'mbox', 'maildir')
+MAILDIR_SUBFOLDERS = ('cur', 'new')
+MBOX_ESCAPED_FROM_LINE = re.compile(rb'^>(>*From )', re.MULTILINE)
+
+def list_eml_folder(eml_folder_path):
+    """References to the .eml files in a folder, sorted by file name."""
+    eml_files = sorted(f for f in os.listdir(eml_folder_path) if f.lower().endswith('.eml'))
+    return [('file', os.path.join(eml_folder_path, filename)) for filename in eml_files]
+
+def list_maildir(maildir_path):
+    """References to the messages in a Maildir's cur/ and new/ folders, sorted by file name."""
+    message_paths = []
+    for subfolder in MAILDIR_SUBFOLDERS:
+        subfolder_path = os.path.join(maildir_path, subfolder)
+        if os.path.isdir(subfolder_path):
+            message_paths.extend(
+                os.path.join(subfolder_path, filename)
+                for filename in os.listdir(subfolder_path) if not filename.startswith('.')
+            )
+    message_paths.sort(key=os.path.basename)
+    return [('file', message_path) for message_path in message_paths]
+
+def list_mbox(mbox_path):
+    """References to the messages of an mbox file, in file order, as byte ranges."""
+    message_refs = []
+    message_start = None
+    offset = 0
+    with open(mbox_path, 'rb') as f:
+        for line in f:
+            if line.startswith(b'From '):
+                if message_start is not None:
+                    message_refs.append(('mbox', mbox_path, message_start, offset))
+                message_start = offset
+            offset += len(line)
+    if message_start is not None:
+        message_refs.append(('mbox', mbox_path, message_start, offset))
+    return message_refs
+
+def detect_input_format(input_path):
+    """Guesses 'maildir', 'folder' or 'mbox' from what is at input_path."""
+    if os.path.isdir(input_path):
+        # Like mailbox.Maildir, either folder is enough (new/ may never have been created)
+        is_maildir = any(os.path.isdir(os.path.join(input_path, subfolder)) for subfolder in MAILDIR_SUBFOLDERS)
+        return 'maildir' if is_maildir else 'folder'
+    return 'mbox'
+
+def list_messages(input_path, input_format='auto'):
+    """Returns the message references of a folder of .eml files, an mbox or a Maildir."""
+    if input_format == 'auto':
+        input_format = detect_input_format(input_path)
+    if input_format == 'maildir':
+        return list_maildir(input_path)
+    if input_format == 'folder':
+        return list_eml_folder(input_path)
+    return list_mbox(input_path)
+
+def read_message_bytes(message_ref):
+    """Reads the raw bytes of a referenced message (without the mbox "From " line, with ">From " unescaped)."""
+    if message_ref[0] == 'mbox':
+        _, mbox_path, start, stop = message_ref
+        with open(mbox_path, 'rb') as f:
+            f.seek(start)
+            message_bytes = f.read(stop - start)
+        if b'\n' not in message_bytes:
+            return b''
+        return MBOX_ESCAPED_FROM_LINE.sub(rb'\1', message_bytes.split(b'\n', 1)[1])
+    with open(message_ref[1], 'rb') as f:
+        return f.read()
+
+def describe_message_ref(message_ref):
+    """A short label for a message in progress and error output."""
+    if message_ref[0] == 'mbox':
+        return f"{os.path.basename(message_ref[1])} @ byte {message_ref[2]}"
+    return os.path.basename(message_ref[1])
+
+# --- Header Pre-Pass ---
+# Before any body or HTML work, only the headers of every message are read:
+# each file (or the mbox) is memory-mapped and just the bytes up to the first
+# blank line are parsed with BytesHeaderParser. A file's mapping is closed as
+# soon as its headers are parsed; only the mbox mapping stays open for the
+# pass. Messages whose Message-ID was already seen (the same thread exported
+# twice) are dropped, and the rest are sorted by their real Date header;
+# messages without a usable Date keep their listing order after the dated ones.
+HEADER_END_MARKERS = (b'\r\n\r\n', b'\n\n')
+
+def _header_bytes(mapped, start, stop):
+    """Returns the header block of the message in mapped[start:stop]."""
+    header_end = stop
+    for marker in HEADER_END_MARKERS:
+        marker_position = mapped.find(marker, start, stop)
+        if marker_position != -1:
+            header_end = min(header_end, marker_position + len(marker))
+    return mapped[start:header_end]
+
+def _map_file(path):
+    """Memory-maps a file read-only. Returns None for an empty file (which can't be mapped)."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def read_message_headers(message_ref, mapped_files):
+    """
+    Parses only the headers of a referenced message. mapped_files caches the
+    mmap of each mbox, so an mbox is mapped once for all its messages; a
+    message file is mapped only while its headers are parsed, so the open
+    mappings (each holds a file descriptor) don't grow with the folder size.
+    Returns None for an empty or unreadable message.
+    """
+    path = message_ref[1]
+    if message_ref[0] == 'mbox':
+        if path not in mapped_files:
+            mapped_files[path] = _map_file(path)
+        mapped = mapped_files[path]
+        if mapped is None:
+            return None
+        start, stop = message_ref[2], message_ref[3]
+        # Skip the mbox "From " separator line
+        start = mapped.find(b'\n', start, stop) + 1 or stop
+        return BytesHeaderParser(policy=default).parsebytes(_header_bytes(mapped, start, stop))
+
+    mapped = _map_file(path)
+    if mapped is None:
+        return None
+    with mapped:
+        return BytesHeaderParser(policy=default).parsebytes(_header_bytes(mapped, 0, len(mapped)))
+
+def message_timestamp(date_header):
+    """Seconds since the epoch for a Date header, or None if it can't be parsed."""
+    try:
+        message_date = parsedate_to_datetime(str(date_header))
+    except (TypeError, ValueError, IndexError):
+        return None
+    if message_date is None:
+        return None
+    if message_date.tzinfo is None:
+        # RFC 5322 "-0000": no zone information, treat as UTC
+        return message_date.replace(tzinfo=datetime.timezone.utc).timestamp()
+    return message_date.timestamp()
+
+def order_messages(message_refs, drop_duplicates=True, sort_by_date=True):
+    """
+    Header-only pre-pass: drops messages with an already seen Message-ID and
+    sorts the rest chronologically by their Date header.
+
+    Returns:
+        tuple: (ordered message references, number of duplicates dropped)
+    """
+    mapped_files = {}
+    seen_message_ids = set()
+    kept_messages = []
+    duplicate_count = 0
+    try:
+        for listing_position, message_ref in enumerate(message_refs):
+            try:
+                headers = read_message_headers(message_ref, mapped_files)
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not read the headers of '{describe_message_ref(message_ref)}': {e}")
+                headers = None
+
+            message_id = str(headers['message-id'] or '').strip() if headers else ''
+            if drop_duplicates and message_id:
+                if message_id in seen_message_ids:
+                    duplicate_count += 1
+                    continue
+                seen_message_ids.add(message_id)
+            timestamp = message_timestamp(headers['date']) if headers and headers['date'] else None
+            kept_messages.append((timestamp, listing_position, message_ref))
+    finally:
+        for mapped in mapped_files.values():
+            if mapped is not None:
+                mapped.close()
+
+    if sort_by_date:
+        kept_messages.sort(key=lambda item: (item[0] is None, item[0] or 0, item[1]))
+    return [message_ref for _, _, message_ref in kept_messages], duplicate_count
+
+# --- Chunked PDF Build ---
+# Emails are laid out EMAILS_PER_CHUNK at a time into temporary chunk PDFs,
+# which are then concatenated into the final PDF with pypdf. Only one chunk's
+# flowables are in memory at a time, and a chunk that fails to build doesn't
+# lose the others: its emails are reported, the remaining chunks are still
+# merged, and the chunk folder (the cache's chunks/ folder when the conversion
+# cache is used) is kept for inspection.
+EMAILS_PER_CHUNK = 200
+CHUNK_FOLDER_SUFFIX = ".chunks"
+
+# --- Conversion Cache ---
+# Re-runs on a growing folder reuse earlier work from a cache folder next to
+# the output PDF. Each input (folder, mbox or Maildir) gets its own subfolder,
+# named by the hash of its path, so inputs converted into the same output
+# folder never prune each other's entries. Within it, entries are keyed by
+# message content hash:
+#   messages/  the extracted subject, sender, date and body text of each
+#              message, so parsing and HTML conversion run only for new ones.
+#   chunks/    each rendered chunk PDF, keyed by its first email number and
+#              the hashes of its messages. Rendered PDFs can't be cached per
+#              message, since emails flow across pages and carry their number
+#              in the title, so with the cache chunk boundaries must not move
+#              when emails are added (see get_chunk_size). Chunks before the
+#              newest emails then come straight from the cache.
+# After a complete run, the input's cache entries the run didn't use are removed.
+# Bump CACHE_VERSION whenever the extracted content or the layout changes.
+EML_CACHE_DIR = ".eml_merge_cache"
+CACHE_VERSION = 3
+
+def compute_message_hash(message_ref):
+    """Returns the SHA-256 hex digest of a referenced message's raw bytes."""
+    return hashlib.sha256(read_message_bytes(message_ref)).hexdigest()
+
+def get_cache_dir(pdf_file_path, source_path):
+    """The conversion cache folder for one input converted next to an output PDF."""
+    source_key = hashlib.sha256(os.path.abspath(source_path).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(os.path.dirname(os.path.abspath(pdf_file_path)), EML_CACHE_DIR, source_key)
+
+def get_message_cache_path(cache_dir, message_hash, html_backend):
+    return os.path.join(cache_dir, "messages", f"{message_hash}_{html_backend}_v{CACHE_VERSION}.json")
+
+def get_chunk_cache_path(cache_dir, first_email_number, message_hashes, html_backend):
+    chunk_key = json.dumps([CACHE_VERSION, html_backend, first_email_number, message_hashes])
+    return os.path.join(cache_dir, "chunks", f"{hashlib.sha256(chunk_key.encode('utf-8')).hexdigest()}.pdf")
+
+def prune_cache(cache_dir, used_message_hashes, used_chunk_paths):
+    """Deletes the cached messages and chunks of one input that its last complete run didn't use."""
+    used_chunk_files = {os.path.basename(chunk_path) for chunk_path in used_chunk_paths}
+    for subfolder, is_used in (
+        ("messages", lambda filename: filename.split('_', 1)[0] in used_message_hashes),
+        ("chunks", lambda filename: filename in used_chunk_files),
+    ):
+        subfolder_path = os.path.join(cache_dir, subfolder)
+        if not os.path.isdir(subfolder_path):
+            continue
+        for filename in os.listdir(subfolder_path):
+            if not is_used(filename):
+                try:
+                    os.remove(os.path.join(subfolder_path, filename))
+                except OSError:
+                    pass
+
+# --- Parallel Rendering ---
+# Parsing (email + BeautifulSoup) and layout are CPU-bound, so chunks are
+# built on a pool of worker processes and concatenated in their sorted order.
+# Chunks are shrunk when there are fewer than one per worker, so small folders
+# still use every core.
+CONVERSION_WORKERS = os.cpu_count() or 1
+
+def get_chunk_size(email_count, emails_per_chunk, workers, stable_boundaries=False):
+    """
+    Emails per chunk: at most emails_per_chunk, and few enough that every
+    worker gets a chunk. With stable_boundaries (the conversion cache) a
+    shrunk size is rounded down to a power of two, so it and every chunk
+    boundary only change when the folder doubles, not with each new email.
+    """
+    chunk_size = max(1, min(emails_per_chunk, math.ceil(email_count / max(1, workers))))
+    if stable_boundaries and chunk_size < emails_per_chunk:
+        chunk_size = 1 << (chunk_size.bit_length() - 1)
+    return chunk_size
+
+# --- HTML to Text ---
+# HTML bodies are turned into text by a pluggable backend. 'lxml' walks the
+# libxml2 parse tree directly and skips everything inside <style>, <script>
+# and <template>, as BeautifulSoup's get_text does. It produces the same lines
+# and paragraph breaks as the original BeautifulSoup path ('html.parser'), up
+# to the length of runs of blank lines and whitespace libxml2 drops (e.g.
+# after </html>), at a small fraction of the cost. tests/test_eml_merger.py
+# checks the parity on small fixtures; benchmarks/bench_html_to_text.py
+# compares and times both backends on a folder of real emails.
+HTML_TEXT_BACKEND = 'lxml'
+SKIPPED_HTML_TAGS = ('script', 'style', 'template')
+
+def html_to_text_bs4(html_body):
+    """The original conversion: BeautifulSoup's html.parser and get_text."""
+    soup = BeautifulSoup(html_body, 'html.parser')
+    return soup.get_text(separator='\n')
+
+def html_to_text_lxml(html_body):
+    """
+    Joins the text nodes of the HTML with newlines, in document order, like
+    get_text(separator='\n'). Comments and everything inside SKIPPED_HTML_TAGS
+    (including nested elements, e.g. the markup of a <template>) are left out.
+    Comments stay in the tree so the text on either side of one remains two
+    text nodes, as in BeautifulSoup.
+    """
+    parser = etree.HTMLParser(remove_pis=True)
+    root = etree.fromstring(html_body, parser)
+    if root is None:
+        return ""
+    text_nodes = []
+    skipped_depth = 0
+    for event, element in etree.iterwalk(root, events=('start', 'end', 'comment')):
+        if event == 'start':
+            if element.tag in SKIPPED_HTML_TAGS:
+                skipped_depth += 1
+            elif element.text and not skipped_depth:
+                text_nodes.append(element.text)
+            continue
+        if event == 'end' and element.tag in SKIPPED_HTML_TAGS:
+            skipped_depth -= 1
+        if element.tail and element is not root and not skipped_depth:
+            # An element's tail follows its whole subtree; a comment's follows the comment
+            text_nodes.append(element.tail)
+    return '\n'.join(text_nodes)
+
+HTML_TEXT_BACKENDS = {
+    'lxml': html_to_text_lxml,
+    'html.parser': html_to_text_bs4,
+}
+
+def html_to_text(html_body, backend=HTML_TEXT_BACKEND):
+    """Converts an HTML body to plain text with the given backend (see HTML_TEXT_BACKENDS)."""
+    if backend == 'lxml' and etree is None:
+        backend = 'html.parser'
+    try:
+        return HTML_TEXT_BACKENDS[backend](html_body)
+    except Exception:
+        # e.g. a body lxml refuses to parse; the original parser is more forgiving
+        return html_to_text_bs4(html_body)
+
+# --- Body Paragraphs ---
+# A body is laid out as many small Paragraphs instead of one giant one:
+# ReportLab's cost for a single Paragraph grows faster than its length and it
+# can only split it across pages by re-wrapping the whole thing. Bodies are
+# split on blank lines, and any block longer than MAX_PARAGRAPH_CHARS is cut
+# further at line (or, for very long lines, word) boundaries.
+MAX_PARAGRAPH_CHARS = 2000
+BLANK_LINE = re.compile(r'\n(?:[ \t\r\f\v]*\n)+')
+
+def split_long_text(text, max_chars=MAX_PARAGRAPH_CHARS):
+    """Cuts text into pieces of at most max_chars, preferring line breaks, then spaces."""
+    pieces = []
+    while len(text) > max_chars:
+        cut = text.rfind('\n', 0, max_chars)
+        if cut <= 0:
+            cut = text.rfind(' ', 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        pieces.append(text[:cut])
+        text = text[cut:].lstrip('\n')
+    if text:
+        pieces.append(text)
+    return pieces
+
+def split_body_paragraphs(body_content, max_chars=MAX_PARAGRAPH_CHARS):
+    """Splits body text into paragraph-sized pieces (see MAX_PARAGRAPH_CHARS)."""
+    paragraphs = []
+    for block in BLANK_LINE.split(body_content):
+        block = block.strip('\n')
+        if block.strip():
+            paragraphs.extend(split_long_text(block, max_chars))
+    return paragraphs
+
+def build_body_flowables(body_content, body_style):
+    """Returns one Paragraph per paragraph-sized piece of the body."""
+    flowables = []
+    for paragraph_text in split_body_paragraphs(body_content):
+        # Prepare text for ReportLab Paragraph:
+        # 1. Replace ampersands, less-than, and greater-than signs to avoid XML parsing issues in ReportLab.
+        # 2. Replace newlines with <br/> for proper line breaks in the PDF paragraph.
+        formatted_text = paragraph_text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+        formatted_text = formatted_text.replace('\n', '<br/>\n')
+        flowables.append(Paragraph(formatted_text, body_style))
+    return flowables
+
+def extract_email_body(msg, html_backend=HTML_TEXT_BACKEND):
+    """
+    Returns the body of a parsed email as plain text, preferring the HTML part
+    (converted to text with html_backend) over the plain text part.
+    Attachments are ignored.
+    """
+    body_content = ""
+    if msg.is_multipart():
+        # Iterate over parts to find the body
+        for part in msg.walk():
+            ctype = part.get_content_type()
+            cdispo = str(part.get('Content-Disposition'))
+
+            # Prioritize HTML content, then plain text.
+            # Ensure it's not an attachment.
+            if ctype == 'text/html' and 'attachment' not in cdispo:
+                charset = part.get_content_charset()
+                html_body = part.get_payload(decode=True).decode(charset if charset else 'utf-8', errors='ignore')
+                # Strip HTML tags and get clean text
+                body_content = html_to_text(html_body, html_backend)
+                break # Found HTML, no need to look for plain text now
+            elif ctype == 'text/plain' and 'attachment' not in cdispo:
+                charset = part.get_content_charset()
+                plain_body = part.get_payload(decode=True).decode(charset if charset else 'utf-8', errors='ignore')
+                # Only set plain_body if HTML hasn't been found yet
+                if not body_content: # This ensures HTML preference
+                    body_content = plain_body
+    else: # Not multipart, assume single part message
+        ctype = msg.get_content_type()
+        if ctype == 'text/html':
+            charset = msg.get_content_charset()
+            html_body = msg.get_payload(decode=True).decode(charset if charset else 'utf-8', errors='ignore')
+            body_content = html_to_text(html_body, html_backend)
+        elif ctype == 'text/plain':
+            charset = msg.get_content_charset()
+            plain_body = msg.get_payload(decode=True).decode(charset if charset else 'utf-8', errors='ignore')
+            body_content = plain_body
+    return body_content
+
+def extract_email_content(message_ref, html_backend=HTML_TEXT_BACKEND):
+    """Parses a referenced message into its subject, sender, date and body text."""
+    # Parse the email message using the default policy for robustness
+    msg = email.message_from_bytes(read_message_bytes(message_ref), policy=default)
+
+    # Extract common email headers
+    return {
+        'subject': str(msg['subject']) if msg['subject'] else "No Subject",
+        'from': str(msg['from']) if msg['from'] else "Unknown Sender",
+        'date': str(msg['date']) if msg['date'] else "Unknown Date",
+        'body': extract_email_body(msg, html_backend),
+    }
+
+def load_email_content(message_ref, html_backend=HTML_TEXT_BACKEND, message_hash=None, cache_dir=None):
+    """
+    Returns the extracted content of a message, from the conversion cache when
+    message_hash and cache_dir are given and the message was seen before.
+    """
+    if message_hash is None or cache_dir is None:
+        return extract_email_content(message_ref, html_backend)
+
+    cache_path = get_message_cache_path(cache_dir, message_hash, html_backend)
+    try:
+        with open(cache_path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+
+    content = extract_email_content(message_ref, html_backend)
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(content, f)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        print(f"Warning: Could not cache '{describe_message_ref(message_ref)}': {e}")
+    return content
+
+def build_email_flowables(message_ref, email_number, email_count, styles, html_backend=HTML_TEXT_BACKEND,
+                          message_hash=None, cache_dir=None):
+    """
+    Parses one referenced message (see Message Sources) and returns the
+    ReportLab flowables for it: a title, the sender and date, the body and a
+    divider. A message that can't be parsed yields an error paragraph instead.
+    """
+    normal_style = styles['Normal']
+    heading_style = styles['h2']
+    body_style = styles['BodyText']
+    flowables = []
+
+    try:
+        content = load_email_content(message_ref, html_backend, message_hash, cache_dir)
+        subject = content['subject']
+        from_header = content['from']
+        date_header = content['date']
+
+        print(f"Processing ({email_number}/{email_count}): {subject[:70]}...") # Print progress to console
+
+        # Add a prominent title for each email in the PDF
+        flowables.append(Paragraph(f"--- Email {email_number}: {subject} ---", heading_style))
+        flowables.append(Spacer(1, 0.1 * inch)) # Small space after title
+
+        # Add sender and date information
+        flowables.append(Paragraph(f"<b>From:</b> {from_header}", normal_style))
+        flowables.append(Paragraph(f"<b>Date:</b> {date_header}", normal_style))
+        flowables.append(Spacer(1, 0.1 * inch)) # Small space after headers
+
+        body_content = content['body']
+        body_flowables = build_body_flowables(body_content, body_style) if body_content else []
+        if body_flowables:
+            flowables.extend(body_flowables)
+        else:
+            flowables.append(Paragraph("<i>No readable body content found for this email.</i>", normal_style))
+
+        # Add a separator between emails for readability
+        flowables.append(Spacer(1, 0.5 * inch)) # Space before divider
+        flowables.append(Paragraph("=" * 100, normal_style)) # A visual divider line
+        flowables.append(Spacer(1, 0.5 * inch)) # Space after divider
+
+    except Exception as e:
+        # Catch any errors during processing of a single file
+        error_message = f"Error processing '{describe_message_ref(message_ref)}': {e}"
+        print(error_message)
+        flowables = [Paragraph(f"<b>{error_message}</b>", styles['h5']), Spacer(1, 0.5 * inch)]
+    return flowables
+
+def render_chunk_pdf(chunk_pdf_path, message_refs, first_email_number, email_count, html_backend=HTML_TEXT_BACKEND,
+                     message_hashes=None, cache_dir=None):
+    """
+    Lays out one chunk of emails into its own PDF (written via a temp file, so
+    a failed chunk never leaves a partial PDF behind). Emails are numbered from
+    first_email_number so the numbering continues across chunks.
+    """
+    styles = getSampleStyleSheet()
+    story = []
+    for offset, message_ref in enumerate(message_refs):
+        message_hash = message_hashes[offset] if message_hashes else None
+        story.extend(build_email_flowables(
+            message_ref, first_email_number + offset, email_count, styles, html_backend, message_hash, cache_dir
+        ))
+    os.makedirs(os.path.dirname(chunk_pdf_path), exist_ok=True)
+    temp_path = f"{chunk_pdf_path}.tmp"
+    SimpleDocTemplate(temp_path, pagesize=letter).build(story)
+    os.replace(temp_path, chunk_pdf_path)
+    return chunk_pdf_path
+
+def concatenate_chunk_pdfs(chunk_pdf_paths, pdf_file_path):
+    """Appends the chunk PDFs, in order, into the final PDF (via a temp file)."""
+    writer = PdfWriter()
+    for chunk_pdf_path in chunk_pdf_paths:
+        writer.append(chunk_pdf_path)
+    temp_path = f"{pdf_file_path}.tmp"
+    with open(temp_path, 'wb') as output_pdf_file:
+        writer.write(output_pdf_file)
+    os.replace(temp_path, pdf_file_path)
+
+def convert_messages(message_refs, pdf_file_path, emails_per_chunk=EMAILS_PER_CHUNK, workers=CONVERSION_WORKERS,
+                     html_backend=HTML_TEXT_BACKEND, use_cache=True, source_path=None):
+    """
+    Converts the referenced messages, in order, into a single PDF by rendering
+    them in chunks on a process pool and concatenating the chunk PDFs.
+
+    Args:
+        message_refs (list): Message references (see Message Sources), in output order.
+        pdf_file_path (str): Path of the merged PDF to write.
+        emails_per_chunk (int): Maximum emails laid out per temporary chunk PDF.
+        workers (int): Worker processes that build chunks in parallel.
+        html_backend (str): HTML-to-text backend (see HTML_TEXT_BACKENDS).
+        use_cache (bool): Reuse (and update) the conversion cache next to the
+            output PDF.
+        source_path (str): The folder, mbox or Maildir the messages were
+            listed from, which picks the input's cache folder. Defaults to
+            the folder (or mbox) the messages have in common.
+
+    Returns:
+        dict: 'chunks' (built or reused chunk count), 'cached_chunks' (chunks
+              reused from the cache), 'chunk_folder' (where the chunk PDFs
+              are) and 'failed_chunks', a list of (first email number, last
+              email number, error) for chunks that could not be built.
+    """
+    cache_dir = None
+    if use_cache and message_refs:
+        if source_path is None:
+            source_path = os.path.commonpath([os.path.abspath(message_ref[1]) for message_ref in message_refs])
+        cache_dir = get_cache_dir(pdf_file_path, source_path)
+    if cache_dir:
+        chunk_folder = os.path.join(cache_dir, "chunks")
+        message_hashes = [compute_message_hash(message_ref) for message_ref in message_refs]
+    else:
+        chunk_folder = f"{pdf_file_path}{CHUNK_FOLDER_SUFFIX}"
+        message_hashes = None
+    os.makedirs(chunk_folder, exist_ok=True)
+
+    # Stable boundaries with the cache, so one more email doesn't shift (and invalidate) every chunk
+    chunk_size = get_chunk_size(len(message_refs), emails_per_chunk, workers, stable_boundaries=bool(cache_dir))
+    chunk_pdf_paths = []
+    cached_chunk_count = 0
+    failed_chunks = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunk_jobs = []
+        for chunk_start in range(0, len(message_refs), chunk_size):
+            chunk_refs = message_refs[chunk_start:chunk_start + chunk_size]
+            first_email_number = chunk_start + 1
+            last_email_number = chunk_start + len(chunk_refs)
+            if cache_dir:
+                chunk_hashes = message_hashes[chunk_start:chunk_start + chunk_size]
+                chunk_pdf_path = get_chunk_cache_path(cache_dir, first_email_number, chunk_hashes, html_backend)
+                if os.path.exists(chunk_pdf_path):
+                    chunk_jobs.append((first_email_number, last_email_number, chunk_pdf_path, None))
+                    continue
+            else:
+                chunk_hashes = None
+                chunk_pdf_path = os.path.join(chunk_folder, f"chunk_{first_email_number:06d}.pdf")
+            future = executor.submit(
+                render_chunk_pdf, chunk_pdf_path, chunk_refs, first_email_number, len(message_refs), html_backend,
+                chunk_hashes, cache_dir
+            )
+            chunk_jobs.append((first_email_number, last_email_number, chunk_pdf_path, future))
+
+        # Collect in submission order so the final PDF keeps the sorted order
+        for first_email_number, last_email_number, chunk_pdf_path, future in chunk_jobs:
+            if future is None:
+                chunk_pdf_paths.append(chunk_pdf_path)
+                cached_chunk_count += 1
+                continue
+            try:
+                chunk_pdf_paths.append(future.result())
+                print(f"Built chunk for emails {first_email_number}-{last_email_number}.")
+            except Exception as e:
+                print(f"Error building the chunk for emails {first_email_number}-{last_email_number}: {e}")
+                failed_chunks.append((first_email_number, last_email_number, str(e)))
+
+    if cached_chunk_count:
+        print(f"Reused {cached_chunk_count} of {len(chunk_jobs)} chunks from the cache.")
+    if chunk_pdf_paths:
+        concatenate_chunk_pdfs(chunk_pdf_paths, pdf_file_path)
+    # Keep the chunks around if anything went wrong, so the built part isn't lost
+    if not failed_chunks:
+        if cache_dir:
+            prune_cache(cache_dir, set(message_hashes), chunk_pdf_paths)
+        else:
+            shutil.rmtree(chunk_folder, ignore_errors=True)
+    return {
+        'chunks': len(chunk_pdf_paths),
+        'cached_chunks': cached_chunk_count,
+        'chunk_folder': chunk_folder,
+        'failed_chunks': failed_chunks,
+    }
+
+def eml_to_pdf_batch_converter(output_pdf_name="merged_emails.pdf", use_cache=True):
     """
     Converts all .eml files in a user-selected folder into a single PDF document.
 
@@ -18,13 +661,19 @@ def eml_to_pdf_batch_converter(output_pdf_name="merged_emails.pdf"):
     Attachments are not included in the PDF but their presence can be noted
     if desired (currently not implemented for brevity).
 
-    The output PDF will be generated in the current working directory
-    where the script is executed.
+    The output PDF is saved where the user picks in a save dialog (suggested
+    next to the selected folder), and the conversion cache is kept next to it.
 
     Args:
-        output_pdf_name (str): The name of the output PDF file.
+        output_pdf_name (str): The suggested name of the output PDF file.
                                Defaults to "merged_emails.pdf".
+        use_cache (bool): Reuse (and update) the conversion cache next to the
+                          output PDF, as the CLI does unless --no-cache is given.
     """
+    # tkinter is only needed for the dialogs, so the CLI also runs where it isn't installed
+    import tkinter as tk
+    from tkinter import filedialog, messagebox # Import messagebox for user feedback
+
     # Create a Tkinter root window, but keep it hidden
     root = tk.Tk()
     root.withdraw() # Hide the main window
@@ -46,144 +695,144 @@ def eml_to_pdf_batch_converter(output_pdf_name="merged_emails.pdf"):
         root.destroy()
         return
 
-    # Story is a list of flowables (ReportLab's content elements)
-    story = []
-    styles = getSampleStyleSheet()
-    normal_style = styles['Normal']
-    heading_style = styles['h2']
-    subheading_style = styles['h3']
-    body_style = styles['BodyText']
-
-    # Define the full path for the output PDF file in the current working directory
-    current_working_directory = os.getcwd()
-    pdf_file_path = os.path.join(current_working_directory, output_pdf_name)
-    
-    # Create the PDF document object
-    doc = SimpleDocTemplate(pdf_file_path, pagesize=letter)
+    # Ask where to save the PDF; the conversion cache goes next to it
+    pdf_file_path = filedialog.asksaveasfilename(
+        title="Save Merged PDF As",
+        initialdir=os.path.dirname(os.path.abspath(eml_folder_path)),
+        initialfile=os.path.basename(output_pdf_name),
+        defaultextension=".pdf",
+        filetypes=[("PDF files", "*.pdf")],
+    )
+    if not pdf_file_path:
+        messagebox.showinfo("Operation Cancelled", "No output file selected. Aborting conversion.")
+        print("No output file selected. Aborting conversion.")
+        root.destroy()
+        return
 
     print(f"Starting conversion of .eml files from '{eml_folder_path}'...")
     messagebox.showinfo("Conversion Started", f"Processing emails from:\n{eml_folder_path}\n\nOutput PDF will be saved as:\n{pdf_file_path}")
 
     # Get all .eml files in the specified folder
-    eml_files = [f for f in os.listdir(eml_folder_path) if f.lower().endswith('.eml')]
-    
-    if not eml_files:
+    message_refs = list_eml_folder(eml_folder_path)
+
+    if not message_refs:
         messagebox.showinfo("No Files Found", f"No .eml files found in '{eml_folder_path}'.")
         print(f"No .eml files found in '{eml_folder_path}'.")
         root.destroy()
         return
 
-    # Sort files by name to ensure a consistent order in the PDF
-    eml_files.sort()
-
-    for i, filename in enumerate(eml_files):
-        file_path = os.path.join(eml_folder_path, filename)
-        
-        try:
-            # Open the .eml file in binary read mode
-            with open(file_path, 'rb') as f:
-                # Parse the email message using the default policy for robustness
-                msg = email.message_from_binary_file(f, policy=default)
-
-            # Extract common email headers
-            subject = msg['subject'] if msg['subject'] else "No Subject"
-            from_header = msg['from'] if msg['from'] else "Unknown Sender"
-            date_header = msg['date'] if msg['date'] else "Unknown Date"
-            
-            print(f"Processing ({i+1}/{len(eml_files)}): {subject[:70]}...") # Print progress to console
-
-            # Add a prominent title for each email in the PDF
-            story.append(Paragraph(f"--- Email {i+1}: {subject} ---", heading_style))
-            story.append(Spacer(1, 0.1 * inch)) # Small space after title
-            
-            # Add sender and date information
-            story.append(Paragraph(f"<b>From:</b> {from_header}", normal_style))
-            story.append(Paragraph(f"<b>Date:</b> {date_header}", normal_style))
-            story.append(Spacer(1, 0.1 * inch)) # Small space after headers
-
-            # Extract email body content
-            body_content = ""
-            if msg.is_multipart():
-                # Iterate over parts to find the body
-                for part in msg.walk():
-                    ctype = part.get_content_type()
-                    cdispo = str(part.get('Content-Disposition'))
-
-                    # Prioritize HTML content, then plain text.
-                    # Ensure it's not an attachment.
-                    if ctype == 'text/html' and 'attachment' not in cdispo:
-                        charset = part.get_content_charset()
-                        html_body = part.get_payload(decode=True).decode(charset if charset else 'utf-8', errors='ignore')
-                        # Use BeautifulSoup to strip HTML tags and get clean text
-                        soup = BeautifulSoup(html_body, 'html.parser')
-                        body_content = soup.get_text(separator='\n')
-                        break # Found HTML, no need to look for plain text now
-                    elif ctype == 'text/plain' and 'attachment' not in cdispo:
-                        charset = part.get_content_charset()
-                        plain_body = part.get_payload(decode=True).decode(charset if charset else 'utf-8', errors='ignore')
-                        # Only set plain_body if HTML hasn't been found yet
-                        if not body_content: # This ensures HTML preference
-                            body_content = plain_body
-            else: # Not multipart, assume single part message
-                ctype = msg.get_content_type()
-                if ctype == 'text/html':
-                    charset = msg.get_content_charset()
-                    html_body = msg.get_payload(decode=True).decode(charset if charset else 'utf-8', errors='ignore')
-                    soup = BeautifulSoup(html_body, 'html.parser')
-                    body_content = soup.get_text(separator='\n')
-                elif ctype == 'text/plain':
-                    charset = msg.get_content_charset()
-                    plain_body = msg.get_payload(decode=True).decode(charset if charset else 'utf-8', errors='ignore')
-                    body_content = plain_body
+    # Drop duplicate messages and order the rest by date, reading headers only
+    message_refs, duplicate_count = order_messages(message_refs)
+    if duplicate_count:
+        print(f"Skipping {duplicate_count} duplicate emails (same Message-ID).")
 
-            if body_content:
-                # Prepare text for ReportLab Paragraph:
-                # 1. Replace ampersands, less-than, and greater-than signs to avoid XML parsing issues in ReportLab.
-                # 2. Replace newlines with <br/> for proper line breaks in the PDF paragraph.
-                formatted_body = body_content.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-                formatted_body = formatted_body.replace('\n', '<br/>\n')
-                story.append(Paragraph(formatted_body, body_style))
-            else:
-                story.append(Paragraph("<i>No readable body content found for this email.</i>", normal_style))
-
-            # Add a separator between emails for readability
-            story.append(Spacer(1, 0.5 * inch)) # Space before divider
-            story.append(Paragraph("=" * 100, normal_style)) # A visual divider line
-            story.append(Spacer(1, 0.5 * inch)) # Space after divider
-
-        except Exception as e:
-            # Catch any errors during processing of a single file
-            error_message = f"Error processing '{filename}': {e}"
-            print(error_message)
-            story.append(Paragraph(f"<b>{error_message}</b>", styles['h5']))
-            story.append(Spacer(1, 0.5 * inch))
-
-    # Build the PDF document if there's any content to add
-    if story:
-        try:
-            doc.build(story)
-            final_message = f"Successfully created '{pdf_file_path}' with content from {len(eml_files)} emails."
-            print(final_message)
-            messagebox.showinfo("Conversion Complete", final_message)
-        except Exception as e:
-            error_message = f"An error occurred while building the PDF document: {e}"
-            print(error_message)
-            messagebox.showerror("PDF Generation Error", error_message)
+    try:
+        result = convert_messages(message_refs, pdf_file_path, use_cache=use_cache, source_path=eml_folder_path)
+    except Exception as e:
+        error_message = f"An error occurred while building the PDF document: {e}"
+        print(error_message)
+        messagebox.showerror("PDF Generation Error", error_message)
+        root.destroy()
+        return
+
+    if not result['chunks']:
+        error_message = "No content was added to the PDF. Every chunk of emails failed to build."
+        print(error_message)
+        messagebox.showerror("PDF Generation Error", error_message)
+    elif result['failed_chunks']:
+        failed_ranges = ", ".join(f"{first}-{last}" for first, last, _ in result['failed_chunks'])
+        warning_message = (f"Created '{pdf_file_path}', but emails {failed_ranges} could not be added. "
+                           f"The built chunks are kept in '{result['chunk_folder']}'.")
+        print(warning_message)
+        messagebox.showwarning("Conversion Partially Complete", warning_message)
     else:
-        messagebox.showinfo("No Content", "No content was added to the PDF. Check if .eml files exist and are readable.")
-        print("No content was added to the PDF. Check if .eml files exist and are readable.")
-    
+        final_message = f"Successfully created '{pdf_file_path}' with content from {len(message_refs)} emails."
+        print(final_message)
+        messagebox.showinfo("Conversion Complete", final_message)
+
     root.destroy() # Destroy the hidden root window when done
 
+def main():
+    """
+    Command line entry point. With an input path the conversion runs headless
+    (no tkinter needed), so it can be scheduled or run on a server; without
+    one, the folder dialog opens as before.
+
+    Returns:
+        int: Process exit code (0 on success, 1 if nothing or only part of
+             the input could be converted).
+    """
+    parser = argparse.ArgumentParser(description="Convert a folder of .eml files, an mbox or a Maildir into one PDF.")
+    parser.add_argument("input", nargs="?", help="Folder of .eml files, mbox file or Maildir. Omit to pick a folder in a dialog.")
+    parser.add_argument("-o", "--output", default="merged_emails.pdf", help="Output PDF path.")
+    parser.add_argument("--format", choices=INPUT_FORMATS, default='auto', dest="input_format",
+                        help="Input type. 'auto' picks Maildir for folders with cur/ or new/, folder for other folders, mbox for files.")
+    parser.add_argument("--workers", type=int, default=CONVERSION_WORKERS, help="Worker processes for rendering.")
+    parser.add_argument("--chunk-size", type=int, default=EMAILS_PER_CHUNK, help="Maximum emails per temporary chunk PDF.")
+    parser.add_argument("--html-backend", choices=sorted(HTML_TEXT_BACKENDS), default=HTML_TEXT_BACKEND,
+                        help="HTML-to-text backend for HTML bodies.")
+    parser.add_argument("--keep-duplicates", action="store_true",
+                        help="Keep messages whose Message-ID was already seen.")
+    parser.add_argument("--listing-order", action="store_true",
+                        help="Keep the file name (or mbox) order instead of sorting by the Date header.")
+    parser.add_argument("--no-cache", action="store_true",
+                        help=f"Convert everything from scratch without reading or writing the '{EML_CACHE_DIR}' cache.")
+    args = parser.parse_args()
+
+    if not args.input:
+        eml_to_pdf_batch_converter(args.output, use_cache=not args.no_cache)
+        return 0
+
+    if not os.path.exists(args.input):
+        print(f"Error: '{args.input}' not found.")
+        return 1
+
+    try:
+        message_refs = list_messages(args.input, args.input_format)
+    except OSError as e:
+        print(f"Error: Could not read '{args.input}': {e}")
+        return 1
+    if not message_refs:
+        print(f"No messages found in '{args.input}'.")
+        return 1
+
+    message_refs, duplicate_count = order_messages(
+        message_refs, drop_duplicates=not args.keep_duplicates, sort_by_date=not args.listing_order
+    )
+    if duplicate_count:
+        print(f"Skipping {duplicate_count} duplicate messages (same Message-ID).")
+
+    pdf_file_path = os.path.abspath(args.output)
+    print(f"Starting conversion of {len(message_refs)} messages from '{args.input}' into '{pdf_file_path}'...")
+    try:
+        result = convert_messages(message_refs, pdf_file_path, emails_per_chunk=args.chunk_size,
+                                  workers=args.workers, html_backend=args.html_backend, use_cache=not args.no_cache,
+                                  source_path=args.input)
+    except Exception as e:
+        print(f"An error occurred while building the PDF document: {e}")
+        return 1
+
+    if not result['chunks']:
+        print("No content was added to the PDF. Every chunk of emails failed to build.")
+        return 1
+    if result['failed_chunks']:
+        failed_ranges = ", ".join(f"{first}-{last}" for first, last, _ in result['failed_chunks'])
+        print(f"Created '{pdf_file_path}', but emails {failed_ranges} could not be added. "
+              f"The built chunks are kept in '{result['chunk_folder']}'.")
+        return 1
+    print(f"Successfully created '{pdf_file_path}' with content from {len(message_refs)} emails.")
+    return 0
+
 # --- How to Use ---
-# 1. Save this code as a Python file (e.g., `eml_converter_gui.py`).
-# 2. Ensure you have the required libraries installed:
-#    `pip install reportlab beautifulsoup4`
-# 3. Run the script from your terminal: `python eml_converter_gui.py`
+# 1. Ensure you have the required libraries installed:
+#    `pip install reportlab beautifulsoup4 pypdf lxml`
+# 2. Run the script from your terminal: `python eml_merger.py`
 #    A folder selection dialog will appear.
-#    Select the folder containing your .eml files.
-#    The merged PDF will be created in the same directory where you ran the script.
-
-# Call the function to start the process
-eml_to_pdf_batch_converter()
+#    Select the folder containing your .eml files, then where to save the merged PDF.
+#    Add --no-cache to skip the conversion cache that is kept next to the PDF.
+# 3. Or pass a folder, mbox or Maildir to run without any dialogs (see Usage above).
 
+# The guard keeps the chunk worker processes, which import this module, from
+# starting a conversion (or opening the folder dialog) themselves.
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from student_pdf_join import (  # noqa: E402
+    PageSource,
+    load_manifest,
+    merge_student_pdfs,
+    scan_sources,
+)
+
+# Writes one manifest job both as per-student packets and as per-advisor
+# bundles (into throwaway folders) and compares total output size and write
+# time, to show what bundle mode saves on real report cards.
+#
+# Usage:
+#   python benchmarks/bench_bundle_output.py student_pdf_jobs.json --job grade_10
+
+def write_job(job, source_data, page_sources, output_mode, output_dir):
+    """Writes the job in one output mode into output_dir and returns its totals."""
+    mode_job = dict(job, output_mode=output_mode, output_dir=output_dir)
+    return merge_student_pdfs(mode_job, source_data, page_sources)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-student and per-advisor bundle output of a merge job.")
+    parser.add_argument("manifest", help="Path to the job manifest (JSON).")
+    parser.add_argument("--job", required=True, help="Name of the job to measure.")
+    args = parser.parse_args()
+
+    manifest = load_manifest(args.manifest)
+    job = next((job for job in manifest['jobs'] if job['name'] == args.job), None)
+    if job is None:
+        print(f"ERROR: No job named '{args.job}' in '{args.manifest}'.")
+        return 1
+
+    source_data = scan_sources(manifest, job['page_order'])
+    page_sources = {}
+    results = {}
+    work_dir = tempfile.mkdtemp(prefix="bundle_bench_")
+    try:
+        for name in job['page_order']:
+            pdf_path = manifest['sources'][name]['path']
+            if pdf_path not in page_sources:
+                page_sources[pdf_path] = PageSource(pdf_path)
+        for output_mode in ('student', 'bundle'):
+            results[output_mode] = write_job(
+                job, source_data, page_sources, output_mode, os.path.join(work_dir, output_mode)
+            )
+    finally:
+        for page_source in page_sources.values():
+            page_source.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\n--- Output comparison for '{args.job}' ---")
+    for output_mode, totals in results.items():
+        print(f"{output_mode:>8}: {totals['files_written']} files, {totals['bytes_written'] / 1024:.0f} KB, "
+              f"{totals['write_seconds']:.2f} s for {totals['merged']} students")
+    student_totals = results['student']
+    bundle_totals = results['bundle']
+    if student_totals['bytes_written'] and student_totals['write_seconds']:
+        size_saving = 1 - bundle_totals['bytes_written'] / student_totals['bytes_written']
+        time_saving = 1 - bundle_totals['write_seconds'] / student_totals['write_seconds']
+        print(f"Bundle mode saves {size_saving:.0%} of the output size and {time_saving:.0%} of the write time.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+from pypdf import PdfReader
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from student_pdf_join import (  # noqa: E402
+    HEADER_MAX_TEXT_OBJECTS,
+    HEADER_REGION_FRACTION,
+    SourceExtractor,
+    extract_header_text,
+    extract_info_from_page,
+)
+
+# Measures the per-page cost of full-text extraction against header-region
+# extraction (including its full-text fallback on pages where the header has
+# no ID, e.g. continuation pages) on real report-card PDFs, and checks both
+# find the same student.
+#
+# Usage:
+#   python benchmarks/bench_header_extraction.py Ednovate_East_College_Prep.pdf grade_10.pdf
+#   python benchmarks/bench_header_extraction.py grade_10.pdf --pages 100 --max-objects 40
+
+DEFAULT_ID_PATTERN = r"Student ID(?: / ID de Estudiante)?:\s*(\d{5})"
+
+def time_call(function, *args):
+    """Returns (result, elapsed seconds) of one call."""
+    start_time = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start_time
+
+def benchmark_pdf(pdf_path, extractor, page_limit=None):
+    """
+    Times full and header extraction on each page of one PDF and prints a
+    summary. Header mode is timed the way the merger runs it: a page whose
+    header snippet misses falls back to full-text extraction, and that
+    fallback is counted in the header mode's time.
+    """
+    with open(pdf_path, 'rb') as pdf_file:
+        reader = PdfReader(pdf_file)
+        page_count = len(reader.pages) if page_limit is None else min(page_limit, len(reader.pages))
+
+        full_times = []
+        header_times = []
+        mismatches = 0
+        header_misses = 0
+        for i in range(page_count):
+            # Separate readers so neither mode benefits from the other's parsed objects
+            full_page = PdfReader(pdf_file).pages[i]
+            header_page = PdfReader(pdf_file).pages[i]
+
+            full_text, full_elapsed = time_call(full_page.extract_text)
+            header_text, header_elapsed = time_call(
+                extract_header_text, header_page, extractor.header_region_fraction, extractor.header_max_text_objects
+            )
+            full_info = extract_info_from_page(full_text or "", extractor)
+            header_info = extract_info_from_page(header_text, extractor, allow_defaults=False)
+            if header_info is None:
+                header_misses += 1
+                fallback_text, fallback_elapsed = time_call(header_page.extract_text)
+                header_elapsed += fallback_elapsed
+                header_info = extract_info_from_page(fallback_text or "", extractor)
+            full_times.append(full_elapsed)
+            header_times.append(header_elapsed)
+
+            full_id = full_info['student_id'] if full_info else None
+            header_id = header_info['student_id'] if header_info else None
+            if full_id != header_id:
+                mismatches += 1
+
+    full_median = statistics.median(full_times) * 1000
+    header_median = statistics.median(header_times) * 1000
+    print(f"\n--- {pdf_path} ({page_count} pages) ---")
+    print(f"Full text:             median {full_median:.2f} ms/page, total {sum(full_times):.2f} s")
+    print(f"Header (+ fallback):   median {header_median:.2f} ms/page, total {sum(header_times):.2f} s")
+    print(f"Speedup:               {sum(full_times) / max(sum(header_times), 1e-9):.1f}x")
+    print(f"Header misses (fell back to full text, included above): {header_misses}")
+    print(f"ID mismatches between modes: {mismatches}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark header-region vs full-text extraction per page.")
+    parser.add_argument("pdfs", nargs="+", help="Report-card PDFs to measure.")
+    parser.add_argument("--id-pattern", default=DEFAULT_ID_PATTERN, help="Regex capturing the student ID in group 1.")
+    parser.add_argument("--pages", type=int, help="Only measure the first N pages of each PDF.")
+    parser.add_argument("--region", type=float, default=HEADER_REGION_FRACTION, help="Top fraction of the page treated as header.")
+    parser.add_argument("--max-objects", type=int, default=HEADER_MAX_TEXT_OBJECTS, help="Text objects to read before stopping.")
+    args = parser.parse_args()
+
+    extractor = SourceExtractor(
+        "benchmark", args.id_pattern, extraction_mode='header',
+        header_region_fraction=args.region, header_max_text_objects=args.max_objects,
+    )
+    for pdf_path in args.pdfs:
+        benchmark_pdf(pdf_path, extractor, page_limit=args.pages)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import argparse
+import json
+import os
+import random
+import sys
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+# Generates Ednovate-style and grade-style report card PDFs with the same header
+# lines the merger's manifest patterns look for, plus a manifest to run them.
+# The grade PDF can have several pages per student (only the first carries the
+# student ID) and can leave out a fraction of the students, so the join's skip
+# path is exercised too.
+#
+# Usage:
+#   python benchmarks/generate_synthetic_pdfs.py bench_data --students 1000
+#   python benchmarks/generate_synthetic_pdfs.py bench_data --students 5000 --pages-per-student 3 --missing-id-rate 0.02
+
+MANIFEST_TEMPLATE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "student_pdf_jobs.json")
+ADVISOR_COUNT = 25
+COURSE_ROWS = 30
+FIRST_STUDENT_ID = 10000
+
+def draw_course_table(pdf_canvas, student_number, page_number):
+    """Draws the body rows that make extraction realistically expensive."""
+    pdf_canvas.setFont("Helvetica", 9)
+    for row in range(COURSE_ROWS):
+        pdf_canvas.drawString(
+            72, 640 - row * 18,
+            f"Course {row + 1:02d}  Period {row % 7 + 1}  Grade {'ABCDF'[(student_number + row) % 5]}  "
+            f"{60 + (student_number * 7 + row * 3) % 40}%  Page {page_number + 1} comments for student {student_number}"
+        )
+
+def generate_ednovate_pdf(pdf_path, students):
+    """One page per student with the name, ID and advisor header lines."""
+    pdf_canvas = canvas.Canvas(pdf_path, pagesize=letter)
+    for student_number, student in enumerate(students):
+        pdf_canvas.setFont("Helvetica-Bold", 11)
+        pdf_canvas.drawString(72, 740, f"Student / Estudiante: {student['name']}")
+        pdf_canvas.drawString(72, 724, f"Student ID / ID de Estudiante: {student['student_id']}")
+        pdf_canvas.drawString(72, 708, f"Advisor / Asesor: {student['advisor']}, Teacher")
+        draw_course_table(pdf_canvas, student_number, 0)
+        pdf_canvas.showPage()
+    pdf_canvas.save()
+
+def generate_grade_pdf(pdf_path, students, pages_per_student, missing_id_rate, rng):
+    """pages_per_student pages per student (ID on the first); leaves out about missing_id_rate of them."""
+    pdf_canvas = canvas.Canvas(pdf_path, pagesize=letter)
+    missing_count = 0
+    for student_number, student in enumerate(students):
+        if rng.random() < missing_id_rate:
+            missing_count += 1
+            continue
+        for page_number in range(pages_per_student):
+            if page_number == 0:
+                pdf_canvas.setFont("Helvetica-Bold", 11)
+                pdf_canvas.drawString(72, 740, f"Student ID: {student['student_id']}")
+            draw_course_table(pdf_canvas, student_number, page_number)
+            pdf_canvas.showPage()
+    pdf_canvas.save()
+    return missing_count
+
+def write_manifest(output_dir, grade):
+    """Writes a manifest for the generated PDFs, using the real manifest's patterns."""
+    with open(MANIFEST_TEMPLATE, 'r') as f:
+        template = json.load(f)
+    grade_source = f"grade_{grade}"
+    manifest = {
+        'workers': None,
+        'sources': {
+            'ednovate': dict(template['sources']['ednovate'], path="Ednovate_East_College_Prep.pdf"),
+            grade_source: dict(template['sources'][grade_source], path=f"{grade_source}.pdf"),
+        },
+        'jobs': [{
+            'name': grade_source,
+            'output_dir': f"output_{grade_source}",
+            'page_order': ['ednovate', grade_source],
+            'naming_source': 'ednovate',
+        }],
+    }
+    manifest_path = os.path.join(output_dir, "student_pdf_jobs.json")
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest_path
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic report card PDFs for benchmarking the merger.")
+    parser.add_argument("output_dir", help="Folder to write the PDFs and manifest into.")
+    parser.add_argument("--students", type=int, default=500, help="Number of students (typically 100 to 5000).")
+    parser.add_argument("--pages-per-student", type=int, default=1, help="Pages per student in the grade PDF.")
+    parser.add_argument("--missing-id-rate", type=float, default=0.05,
+                        help="Fraction of students left out of the grade PDF (skipped by the join).")
+    parser.add_argument("--grade", type=int, choices=(9, 10, 11, 12), default=10, help="Grade PDF to generate.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for which students are missing.")
+    args = parser.parse_args()
+
+    if args.students < 1 or args.pages_per_student < 1 or not 0 <= args.missing_id_rate < 1:
+        print("ERROR: --students and --pages-per-student must be positive and --missing-id-rate in [0, 1).")
+        return 1
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    students = [
+        {
+            'student_id': str(FIRST_STUDENT_ID + n),
+            'name': f"Lastname{n}, Firstname{n}",
+            'advisor': f"Advisor{n % ADVISOR_COUNT:02d}",
+        }
+        for n in range(args.students)
+    ]
+
+    ednovate_path = os.path.join(args.output_dir, "Ednovate_East_College_Prep.pdf")
+    grade_path = os.path.join(args.output_dir, f"grade_{args.grade}.pdf")
+    generate_ednovate_pdf(ednovate_path, students)
+    missing_count = generate_grade_pdf(
+        grade_path, students, args.pages_per_student, args.missing_id_rate, random.Random(args.seed)
+    )
+    manifest_path = write_manifest(args.output_dir, args.grade)
+
+    print(f"SUCCESS: Wrote {args.students} students to '{ednovate_path}' and "
+          f"{args.students - missing_count} ({args.pages_per_student} page(s) each) to '{grade_path}'.")
+    print(f"Manifest: '{manifest_path}'")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
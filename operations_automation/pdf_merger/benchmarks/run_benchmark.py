@@ -0,0 +1,112 @@
+import argparse
+import json
+import os
+import resource
+import shutil
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from student_pdf_join import (  # noqa: E402
+    EXTRACTION_CACHE_DIR,
+    OUTPUT_MODES,
+    PageSource,
+    build_extractor,
+    load_manifest,
+    merge_student_pdfs,
+    process_pdf,
+)
+
+# Times the merger's two phases on one manifest job (e.g. the synthetic PDFs
+# from generate_synthetic_pdfs.py): process_pdf for each source, then
+# merge_student_pdfs into a fresh output folder. Reports peak RSS of the main
+# process and of the extraction workers, and the output size.
+#
+# Usage:
+#   python benchmarks/run_benchmark.py bench_data/student_pdf_jobs.json --job grade_10
+#   python benchmarks/run_benchmark.py bench_data/student_pdf_jobs.json --job grade_10 --warm-cache --json results.json
+
+def peak_rss_mb(who):
+    """Peak resident set size in MB (ru_maxrss is KB on Linux, bytes on macOS)."""
+    max_rss = resource.getrusage(who).ru_maxrss
+    return max_rss / (1024 * 1024) if sys.platform == 'darwin' else max_rss / 1024
+
+def directory_size(path):
+    """Total bytes of all files below path."""
+    total_bytes = 0
+    for dir_path, _, file_names in os.walk(path):
+        for file_name in file_names:
+            total_bytes += os.path.getsize(os.path.join(dir_path, file_name))
+    return total_bytes
+
+def run_benchmark(manifest, job, output_mode, warm_cache=False):
+    """Runs one job end to end and returns its timings and sizes."""
+    results = {'job': job['name'], 'output_mode': output_mode, 'sources': {}}
+    source_data = {}
+    for name in job['page_order']:
+        source = manifest['sources'][name]
+        if not warm_cache:
+            shutil.rmtree(os.path.join(os.path.dirname(source['path']), EXTRACTION_CACHE_DIR), ignore_errors=True)
+        start_time = time.perf_counter()
+        source_data[name] = process_pdf(source['path'], build_extractor(name, source))
+        results['sources'][name] = {
+            'process_pdf_seconds': round(time.perf_counter() - start_time, 3),
+            'input_bytes': os.path.getsize(source['path']),
+            'students': len(source_data[name]),
+        }
+
+    output_dir = f"{job['output_dir']}_{output_mode}_benchmark"
+    shutil.rmtree(output_dir, ignore_errors=True)
+    page_sources = {}
+    start_time = time.perf_counter()
+    try:
+        for name in job['page_order']:
+            pdf_path = manifest['sources'][name]['path']
+            if pdf_path not in page_sources:
+                page_sources[pdf_path] = PageSource(pdf_path)
+        totals = merge_student_pdfs(dict(job, output_dir=output_dir, output_mode=output_mode), source_data, page_sources)
+    finally:
+        for page_source in page_sources.values():
+            page_source.close()
+    results['merge_seconds'] = round(time.perf_counter() - start_time, 3)
+    results['merged'] = totals['merged']
+    results['skipped'] = totals['skipped']
+    results['output_bytes'] = directory_size(output_dir)
+    results['peak_rss_mb'] = round(peak_rss_mb(resource.RUSAGE_SELF), 1)
+    results['peak_worker_rss_mb'] = round(peak_rss_mb(resource.RUSAGE_CHILDREN), 1)
+    shutil.rmtree(output_dir, ignore_errors=True)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the student PDF merger on one manifest job.")
+    parser.add_argument("manifest", help="Path to the job manifest (JSON).")
+    parser.add_argument("--job", required=True, help="Name of the job to run.")
+    parser.add_argument("--output-mode", choices=OUTPUT_MODES, default='student', help="Output mode to write.")
+    parser.add_argument("--warm-cache", action="store_true",
+                        help="Keep the extraction cache (measures a re-run instead of a cold scan).")
+    parser.add_argument("--json", help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    manifest = load_manifest(args.manifest)
+    job = next((job for job in manifest['jobs'] if job['name'] == args.job), None)
+    if job is None:
+        print(f"ERROR: No job named '{args.job}' in '{args.manifest}'.")
+        return 1
+
+    results = run_benchmark(manifest, job, args.output_mode, warm_cache=args.warm_cache)
+
+    print(f"\n--- Benchmark results for '{args.job}' ({args.output_mode} output) ---")
+    for name, source_results in results['sources'].items():
+        print(f"process_pdf {name}: {source_results['process_pdf_seconds']:.2f} s, "
+              f"{source_results['students']} students, {source_results['input_bytes'] / 1024:.0f} KB in")
+    print(f"merge_student_pdfs: {results['merge_seconds']:.2f} s, merged {results['merged']}, skipped {results['skipped']}")
+    print(f"Output: {results['output_bytes'] / 1024:.0f} KB")
+    print(f"Peak RSS: {results['peak_rss_mb']:.0f} MB main process, {results['peak_worker_rss_mb']:.0f} MB largest worker")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to '{args.json}'.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
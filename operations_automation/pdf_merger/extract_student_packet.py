@@ -0,0 +1,121 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from pypdf import PdfReader, PdfWriter
+from student_pdf_join import compute_file_hash
+
+# Usage (the index is written by the merger into its output directory):
+#   python extract_student_packet.py grade_10/student_index.json --student 16703
+#   python extract_student_packet.py grade_10/student_index.json --advisor Duggan -o duggan.pdf
+
+def load_student_index(index_path):
+    """Loads the list of student entries from a student_index.json file."""
+    with open(index_path, 'r') as f:
+        return json.load(f)['students']
+
+def select_students(index_entries, student_id=None, advisor=None):
+    """Returns the index entries for one student ID or one advisor (case-insensitive)."""
+    if student_id:
+        return [entry for entry in index_entries if entry['student_id'] == student_id]
+    advisor_key = advisor.lower().replace(" ", "_").replace(",", "")
+    return [entry for entry in index_entries if entry['advisor'].lower() == advisor_key]
+
+def verify_sources(selected_entries):
+    """
+    Checks that every source PDF still has the content hash recorded in the
+    index. Returns a list of (source_file, problem) tuples; empty if all match.
+    """
+    expected_hashes = {}
+    for entry in selected_entries:
+        for page in entry['pages']:
+            expected_hashes[page['source_file']] = page['content_hash']
+
+    problems = []
+    for source_file, expected_hash in expected_hashes.items():
+        if not os.path.exists(source_file):
+            problems.append((source_file, "file not found"))
+        elif compute_file_hash(source_file) != expected_hash:
+            problems.append((source_file, "content changed since the index was written"))
+    return problems
+
+def build_packet(selected_entries, output_path):
+    """
+    Writes the packet pages of the selected students, in index order, to
+    output_path. Each source PDF is opened once and only the listed pages
+    are read from it.
+    """
+    open_files = {}
+    readers = {}
+    writer = PdfWriter()
+    try:
+        for entry in selected_entries:
+            for page in entry['pages']:
+                source_file = page['source_file']
+                if source_file not in readers:
+                    open_files[source_file] = open(source_file, 'rb')
+                    readers[source_file] = PdfReader(open_files[source_file])
+                writer.add_page(readers[source_file].pages[page['page_number'] - 1])
+        with open(output_path, 'wb') as output_pdf_file:
+            writer.write(output_pdf_file)
+    finally:
+        for pdf_file in open_files.values():
+            pdf_file.close()
+    return len(writer.pages)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build one student's or one advisor's merged packet from a merger student index."
+    )
+    parser.add_argument("index", help="Path to the student_index.json written by the merger.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--student", help="5-digit student ID.")
+    target.add_argument("--advisor", help="Advisor last name (as in the output folder name).")
+    parser.add_argument("-o", "--output", help="Output PDF path. Defaults to the student or advisor name.")
+    parser.add_argument("--verify", action="store_true",
+                        help="Re-hash the source PDFs and refuse to build if they changed since indexing.")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    try:
+        index_entries = load_student_index(args.index)
+    except (OSError, json.JSONDecodeError, KeyError) as e:
+        print(f"ERROR: Could not read student index '{args.index}': {e}")
+        return 1
+
+    selected_entries = select_students(index_entries, student_id=args.student, advisor=args.advisor)
+    if not selected_entries:
+        target_description = f"student ID '{args.student}'" if args.student else f"advisor '{args.advisor}'"
+        print(f"ERROR: No merged students found for {target_description} in '{args.index}'.")
+        return 1
+
+    if args.verify:
+        problems = verify_sources(selected_entries)
+        if problems:
+            for source_file, problem in problems:
+                print(f"ERROR: '{source_file}': {problem}. Re-run the merger to refresh the index.")
+            return 1
+
+    output_path = args.output
+    if not output_path:
+        if args.student:
+            output_name = selected_entries[0]['student_name']
+        else:
+            output_name = selected_entries[0]['advisor']
+        sanitized_output_name = re.sub(r'[\\/:*?"<>|]', '', output_name).strip() or "packet"
+        output_path = f"{sanitized_output_name}.pdf"
+
+    try:
+        page_count = build_packet(selected_entries, output_path)
+    except Exception as e:
+        print(f"ERROR: Failed to build packet '{output_path}': {e}")
+        return 1
+
+    elapsed_ms = (time.perf_counter() - start_time) * 1000
+    print(f"SUCCESS: Wrote {len(selected_entries)} student(s), {page_count} page(s) to '{output_path}' in {elapsed_ms:.0f} ms.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,922 @@
+import argparse
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pypdf import PageObject, PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject, NameObject
+
+# Joins any number of source PDFs on the 5-digit student ID and writes one
+# packet per student, organized by advisor. What to join is described by a job
+# manifest (see student_pdf_jobs.json):
+#
+#   "sources": each source PDF with its own extraction patterns. A source is
+#              scanned once even when several jobs use it (e.g. the Ednovate
+#              PDF, which covers every grade). "multi_page": true marks a
+#              source whose reports continue over pages without an ID.
+#   "jobs":    one entry per output folder, listing the sources to join in the
+#              page order of the packet, and optionally "output_mode":
+#              "bundle" for one PDF per advisor instead of one per student.
+#
+# This replaces merge_student_data_10.py and merge_student_data_11.py, two
+# per-grade copies of the same merger. The parallel extraction, lazy page
+# loading, extraction cache and student index below were first added to both
+# copies; a new grade is now a source and a job in the manifest, not a copy.
+#
+# Usage:
+#   python student_pdf_join.py student_pdf_jobs.json
+#   python student_pdf_join.py student_pdf_jobs.json --job grade_10
+#   python student_pdf_join.py student_pdf_jobs.json --output-mode bundle
+
+# --- Parallel Extraction Settings ---
+# Text extraction is CPU-bound, so each PDF is split into page ranges that are
+# extracted on a pool of worker processes. Several ranges per worker keep all
+# cores busy when some pages (e.g. large grade tables) are slower than others.
+EXTRACTION_WORKERS = os.cpu_count() or 1
+RANGES_PER_WORKER = 4
+
+# --- Extraction Cache ---
+# Extracted page info is cached in a sidecar folder next to each source PDF,
+# keyed by the PDF's content hash, the source's extraction patterns and
+# EXTRACTOR_VERSION. Re-runs against unchanged PDFs skip extraction entirely.
+# Bump EXTRACTOR_VERSION whenever extract_info_from_page or the cached page
+# data changes.
+EXTRACTOR_VERSION = 5
+EXTRACTION_CACHE_DIR = ".pdf_merge_cache"
+
+def compute_file_hash(file_path):
+    """Returns the SHA-256 hex digest of a file's contents."""
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+def get_extraction_cache_path(pdf_path, extractor, content_hash):
+    """Returns the sidecar cache file for a PDF's content and extraction rules."""
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(pdf_path)), EXTRACTION_CACHE_DIR)
+    return os.path.join(cache_dir, f"{content_hash}_{extractor.fingerprint[:12]}_v{EXTRACTOR_VERSION}.json")
+
+def load_cached_extraction(cache_path):
+    """Returns the cached student segments (see segment_student_pages), or None on a cache miss."""
+    try:
+        with open(cache_path, 'r') as f:
+            cached = json.load(f)
+        return [
+            {'info': segment['info'], 'page_indices': segment['page_indices'], 'page_digests': segment['page_digests']}
+            for segment in cached['segments']
+        ]
+    except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError, ValueError):
+        return None
+
+def save_cached_extraction(cache_path, pdf_path, segments):
+    """Writes the student segments to the cache, via a temp file so a crash can't leave a partial cache."""
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temp_path = f"{cache_path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({
+                'source_pdf': os.path.basename(pdf_path),
+                'extractor_version': EXTRACTOR_VERSION,
+                'segments': segments,
+            }, f)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        print(f"  Warning: Could not write extraction cache '{cache_path}': {e}")
+
+# --- Student Index ---
+# After a merge, a compact index of every merged student (ID, name, advisor
+# and the source file, page number and content hash of each packet page) is
+# written next to the output. extract_student_packet.py uses it to rebuild a
+# single student's or advisor's packet without re-parsing the big PDFs.
+#
+# The index doubles as the output manifest for incremental merges: each entry
+# records a packet_hash over the digests of its source pages. On the next run
+# a packet whose hash is unchanged (and whose file still exists) is not
+# rewritten, and packets listed in the old index that are no longer produced
+# are removed. That pruning only happens when every source of the job was
+# found and fully scanned: a missing or partly unreadable source would make
+# every student look gone, so such a run keeps the previous packets and their
+# index entries.
+STUDENT_INDEX_FILENAME = "student_index.json"
+
+# --- Output Modes ---
+# 'student' writes {advisor}/{student}.pdf for every student. 'bundle' writes
+# a single {advisor}.pdf per advisor with an outline bookmark per student.
+# Bundles share one copy of the fonts and images the source pages have in
+# common (identical objects are deduplicated) and their content streams are
+# compressed. Measured against the same students as separate files, bundles
+# came out about 28% smaller but took about 27% longer to write, so they
+# trade write time for disk space and fewer files to hand out. See
+# benchmarks/bench_bundle_output.py.
+OUTPUT_MODES = ('student', 'bundle')
+
+def load_previous_index_entries(output_base_dir):
+    """Returns the entries of the previous run's student index, or an empty list if there is no usable index."""
+    index_path = os.path.join(output_base_dir, STUDENT_INDEX_FILENAME)
+    try:
+        with open(index_path, 'r') as f:
+            index_entries = json.load(f)['students']
+        if all(isinstance(entry, dict) and 'output_file' in entry for entry in index_entries):
+            return index_entries
+    except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+        pass
+    return []
+
+def load_previous_packets(output_base_dir, index_entries=None):
+    """
+    Returns {output_file: [packet_hash, ...]} from the student index of the
+    previous run (one hash per student in the file, in order), or an empty
+    dict if there is no usable index.
+    """
+    if index_entries is None:
+        index_entries = load_previous_index_entries(output_base_dir)
+    previous_packets = {}
+    for entry in index_entries:
+        previous_packets.setdefault(entry['output_file'], []).append(entry.get('packet_hash'))
+    return previous_packets
+
+def compute_packet_hash(page_order, entries):
+    """
+    Returns a hash over the job's page order and the digest of every source
+    page in the packet, or None if any page has no digest (always rewritten).
+    """
+    page_digests = [page_digest for name in page_order for page_digest in entries[name]['page_digests']]
+    if None in page_digests:
+        return None
+    packet_key = json.dumps([page_order, page_digests])
+    return hashlib.sha256(packet_key.encode('utf-8')).hexdigest()
+
+def remove_stale_packets(output_base_dir, stale_output_files):
+    """Deletes packets from a previous run that are no longer produced, and any advisor folder left empty."""
+    removed_count = 0
+    for output_file in stale_output_files:
+        output_path = os.path.join(output_base_dir, output_file)
+        try:
+            os.remove(output_path)
+            removed_count += 1
+            print(f"REMOVED: Stale packet '{output_path}'")
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            print(f"ERROR: Could not remove stale packet '{output_path}': {e}")
+            continue
+        advisor_output_dir = os.path.dirname(output_path)
+        if os.path.abspath(advisor_output_dir) != os.path.abspath(output_base_dir) and not os.listdir(advisor_output_dir):
+            os.rmdir(advisor_output_dir)
+    return removed_count
+
+def write_student_index(output_base_dir, index_entries):
+    """Writes the student index into the output directory (via a temp file)."""
+    index_path = os.path.join(output_base_dir, STUDENT_INDEX_FILENAME)
+    temp_path = f"{index_path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump({'students': index_entries}, f, separators=(',', ':'))
+    os.replace(temp_path, index_path)
+    return index_path
+
+# --- Lazy Page Loading ---
+# The scan phase only records (file, page indices, extracted info). Pages are
+# pulled from the source PDFs when a merged packet is written. pypdf caches
+# every page it parses on its reader, so the reader is reopened every
+# READER_RECYCLE_PAGES pages to keep peak memory flat as the PDFs grow.
+READER_RECYCLE_PAGES = 200
+
+class PageSource:
+    """Serves single pages of a source PDF on demand during the merge."""
+
+    def __init__(self, pdf_path):
+        self.pdf_path = pdf_path
+        self.pdf_file = open(pdf_path, 'rb')
+        self.reader = None
+        self.pages_served = 0
+
+    def get_page(self, page_index):
+        if self.reader is None or self.pages_served >= READER_RECYCLE_PAGES:
+            # A reader over the open file reads objects lazily instead of
+            # loading the whole PDF into memory.
+            self.reader = PdfReader(self.pdf_file)
+            self.pages_served = 0
+        self.pages_served += 1
+        return self.reader.pages[page_index]
+
+    def close(self):
+        self.reader = None
+        self.pdf_file.close()
+
+# --- Source Extraction ---
+# 'header' extraction mode only reads the top of each page, where the student
+# ID, advisor and name lines are, instead of the full text with grade tables.
+# Only the first HEADER_CONTENT_BYTES of the page's content stream are parsed
+# (cut at the end of a text object), text outside the top
+# HEADER_REGION_FRACTION of the page is ignored, and extraction stops after
+# HEADER_MAX_TEXT_OBJECTS text-showing operators. Pages where the header
+# snippet doesn't contain every field fall back to full-text extraction, so
+# the mode never loses a student. That fallback is why the mode only pays off
+# for sources with one page per student (with an ID on every page): on
+# multi_page sources every continuation page misses in the header and is then
+# extracted in full anyway, so those sources use 'full' extraction.
+EXTRACTION_MODES = ('full', 'header')
+HEADER_REGION_FRACTION = 0.3
+HEADER_MAX_TEXT_OBJECTS = 60
+HEADER_CONTENT_BYTES = 8192
+END_TEXT_OBJECT = re.compile(rb'\sET\s')
+TEXT_SHOWING_OPERATORS = (b'Tj', b'TJ', b"'", b'"')
+
+class SourceExtractor:
+    """
+    Compiled extraction rules for one source PDF, built from a manifest
+    'sources' entry. The ID pattern must capture the student ID in group 1;
+    each field pattern captures the field value in group 1. multi_page marks
+    sources whose reports run over several pages, where a page without an ID
+    continues the previous student's report.
+    """
+
+    def __init__(self, name, id_pattern, fields=None, extraction_mode='full',
+                 header_region_fraction=HEADER_REGION_FRACTION,
+                 header_max_text_objects=HEADER_MAX_TEXT_OBJECTS, multi_page=False):
+        self.name = name
+        self.id_pattern = id_pattern
+        self.fields = fields or {}
+        self.extraction_mode = extraction_mode
+        self.multi_page = multi_page
+        self.header_region_fraction = header_region_fraction
+        self.header_max_text_objects = header_max_text_objects
+        self.id_regex = re.compile(id_pattern)
+        self.field_rules = [
+            (field_name, re.compile(rule['pattern']), rule.get('default'))
+            for field_name, rule in self.fields.items()
+        ]
+        rules = json.dumps({
+            'id_pattern': id_pattern,
+            'fields': self.fields,
+            'extraction_mode': extraction_mode,
+            'header_region_fraction': header_region_fraction,
+            'header_max_text_objects': header_max_text_objects,
+            'multi_page': multi_page,
+        }, sort_keys=True)
+        self.fingerprint = hashlib.sha256(rules.encode('utf-8')).hexdigest()
+
+class _HeaderComplete(Exception):
+    """Raised from the pypdf visitor to stop extraction once the header is read."""
+
+def extract_header_text(page, region_fraction=HEADER_REGION_FRACTION, max_text_objects=HEADER_MAX_TEXT_OBJECTS):
+    """
+    Extracts only the text in the top region_fraction of a page, stopping after
+    max_text_objects text-showing operators. The text of the operator in
+    progress when extraction stops may be dropped, so keep the limit a little
+    above the number of text objects in the header.
+    """
+    mediabox = page.mediabox
+    region_bottom = float(mediabox.top) - float(mediabox.height) * region_fraction
+    header_contents = _content_stream_prefix(page)
+    if header_contents is not None:
+        # Extract from a shallow copy of the page dictionary pointing at the
+        # shortened stream, so the page itself (and a possible full-text
+        # fallback on it) is never modified
+        header_page = PageObject(page.pdf)
+        header_page.update(page)
+        header_page[NameObject('/Contents')] = header_contents
+        page = header_page
+    header_chunks = []
+    text_objects_seen = 0
+
+    def collect_header_text(text, cm, tm, font_dict, font_size):
+        # Position of the text on the page: text matrix translated by the CTM
+        y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5]
+        if text and y >= region_bottom:
+            header_chunks.append(text)
+
+    def stop_after_header(operator, operands, cm, tm):
+        nonlocal text_objects_seen
+        if operator in TEXT_SHOWING_OPERATORS:
+            text_objects_seen += 1
+            if text_objects_seen > max_text_objects:
+                raise _HeaderComplete()
+
+    try:
+        page.extract_text(visitor_text=collect_header_text, visitor_operand_before=stop_after_header)
+    except _HeaderComplete:
+        pass
+    return ''.join(header_chunks)
+
+def _content_stream_prefix(page):
+    """
+    Returns a stream holding the start of the page's content stream, cut after
+    the last complete text object within HEADER_CONTENT_BYTES, or None when the
+    content is short enough (or has no text object end) to use as is.
+    """
+    contents = page.get_contents()
+    if contents is None:
+        return None
+    content_data = contents.get_data()
+    if len(content_data) <= HEADER_CONTENT_BYTES:
+        return None
+    last_end = None
+    for last_end in END_TEXT_OBJECT.finditer(content_data, 0, HEADER_CONTENT_BYTES):
+        pass
+    if last_end is None:
+        return None
+    prefix_stream = DecodedStreamObject()
+    prefix_stream.set_data(content_data[:last_end.end()])
+    return prefix_stream
+
+def compute_page_digest(page):
+    """
+    Returns a SHA-256 digest of a page's decoded content stream and media box,
+    or None if the content can't be read. Two pages with the same digest draw
+    the same thing, even when the PDF around them changed.
+    """
+    try:
+        contents = page.get_contents()
+        page_digest = hashlib.sha256(repr([float(v) for v in page.mediabox]).encode('utf-8'))
+        if contents is not None:
+            page_digest.update(contents.get_data())
+        return page_digest.hexdigest()
+    except Exception:
+        return None
+
+def extract_info_from_page(page_text, extractor, allow_defaults=True):
+    """
+    Extracts the student ID and the source's configured fields (e.g. advisor
+    and student name) from the given page text.
+
+    Args:
+        page_text (str): The text content of a single PDF page (or its header).
+        extractor (SourceExtractor): The compiled patterns for the page's source.
+        allow_defaults (bool): Fill missing fields with their defaults. When
+            False, a missing field makes the whole page return None.
+
+    Returns:
+        dict: A dictionary containing extracted information, or None if ID is not found.
+    """
+    id_match = extractor.id_regex.search(page_text)
+    if not id_match:
+        return None # ID is crucial, return None if not found
+
+    student_id = id_match.group(1)
+    extracted_data = {'student_id': student_id}
+    for field_name, field_regex, default in extractor.field_rules:
+        field_match = field_regex.search(page_text)
+        if field_match:
+            extracted_data[field_name] = field_match.group(1).strip()
+        elif not allow_defaults:
+            return None
+        else:
+            extracted_data[field_name] = default.format(student_id=student_id) if default else None
+            print(f"Warning: {field_name} not found for student ID {student_id} in {extractor.name} PDF.")
+    return extracted_data
+
+def extract_page_range(pdf_path, extractor, start_index, end_index):
+    """
+    Extracts student information from pages [start_index, end_index) of a PDF.
+
+    Runs inside a worker process, so it opens its own reader and returns only
+    plain data that can be sent back to the main process.
+
+    Returns:
+        list: (page_index, extracted_info, page_digest, error) tuples in page
+              order. extracted_info is None when no student ID was found on the
+              page (e.g. a continuation page of a multi-page report) or the
+              page could not be read, and error describes the failure (or None).
+    """
+    results = []
+    with open(pdf_path, 'rb') as pdf_file:
+        reader = PdfReader(pdf_file)
+        for i in range(start_index, end_index):
+            try:
+                page = reader.pages[i]
+                extracted_info = None
+                if extractor.extraction_mode == 'header':
+                    header_text = extract_header_text(page, extractor.header_region_fraction, extractor.header_max_text_objects)
+                    extracted_info = extract_info_from_page(header_text, extractor, allow_defaults=False)
+
+                if extracted_info is None:
+                    text = page.extract_text()
+                    if text:
+                        extracted_info = extract_info_from_page(text, extractor)
+
+                results.append((i, extracted_info, compute_page_digest(page), None))
+            except Exception as e:
+                results.append((i, None, None, f"  Error processing page {i+1} of '{pdf_path}': {e}"))
+    return results
+
+def split_page_ranges(page_count, range_count):
+    """Splits pages 0..page_count-1 into at most range_count contiguous (start, end) ranges."""
+    range_count = max(1, min(range_count, page_count))
+    base_size, remainder = divmod(page_count, range_count)
+    ranges = []
+    start = 0
+    for r in range(range_count):
+        end = start + base_size + (1 if r < remainder else 0)
+        if end > start:
+            ranges.append((start, end))
+        start = end
+    return ranges
+
+def start_pdf_processing(executor, pdf_path, extractor):
+    """
+    Opens a PDF and submits its page ranges to the process pool, unless the
+    extraction cache already holds the results for this exact PDF content.
+
+    Returns:
+        dict: The pending futures (or cached segments) for finish_pdf_processing,
+              or None if the PDF could not be read.
+    """
+    print(f"\n--- Processing '{pdf_path}' ({extractor.name} source) ---")
+    try:
+        content_hash = compute_file_hash(pdf_path)
+        cache_path = get_extraction_cache_path(pdf_path, extractor, content_hash)
+        cached_segments = load_cached_extraction(cache_path)
+        if cached_segments is not None:
+            print(f"  Using cached extraction for '{pdf_path}' ({len(cached_segments)} student segments).")
+            return {'pdf_path': pdf_path, 'content_hash': content_hash, 'cached_segments': cached_segments}
+
+        with open(pdf_path, 'rb') as pdf_file:
+            page_count = len(PdfReader(pdf_file).pages)
+    except Exception as e:
+        print(f"ERROR: Could not read PDF file '{pdf_path}': {e}")
+        return None
+
+    page_ranges = split_page_ranges(page_count, EXTRACTION_WORKERS * RANGES_PER_WORKER)
+    futures = [
+        executor.submit(extract_page_range, pdf_path, extractor, start, end)
+        for start, end in page_ranges
+    ]
+    return {
+        'pdf_path': pdf_path,
+        'source_name': extractor.name,
+        'multi_page': extractor.multi_page,
+        'content_hash': content_hash,
+        'cache_path': cache_path,
+        'futures': futures,
+    }
+
+def segment_student_pages(page_results, pdf_path, source_name, multi_page=False, page_errors=None):
+    """
+    Groups consecutive pages into per-student segments in a single pass over
+    the page results (in page order). A page whose student ID differs from the
+    current segment's starts a new segment. A page without an ID is added to
+    the current segment only for multi_page sources (a continuation page of
+    the report); otherwise it is skipped. A page that could not be read is
+    skipped and ends the current segment, since it may be another student's
+    report, and its index is appended to page_errors. Only the segment being
+    built is held, so memory doesn't grow with the page count.
+
+    Yields:
+        dict: {'info', 'page_indices', 'page_digests'} for each student segment.
+    """
+    segment = None
+    for i, extracted_info, page_digest, error in page_results:
+        if error:
+            print(error)
+            print(f"  Skipping page {i+1} of '{pdf_path}'. It is not added to any student's packet.")
+            if page_errors is not None:
+                page_errors.append(i)
+            if segment is not None:
+                yield segment
+                segment = None
+        elif extracted_info and (segment is None or extracted_info['student_id'] != segment['info']['student_id']):
+            if segment is not None:
+                yield segment
+            segment = {'info': extracted_info, 'page_indices': [i], 'page_digests': [page_digest]}
+        elif extracted_info or (multi_page and segment is not None):
+            segment['page_indices'].append(i)
+            segment['page_digests'].append(page_digest)
+        elif multi_page:
+            print(f"  Could not extract student ID from page {i+1} of '{pdf_path}' and no readable student page precedes it. Skipping. "
+                  f"Please check the '{source_name}' id_pattern if this is unexpected.")
+        else:
+            print(f"  Could not extract student ID from page {i+1} of '{pdf_path}'. Skipping. "
+                  f"Set \"multi_page\" on the '{source_name}' source if its reports continue over several pages.")
+    if segment is not None:
+        yield segment
+
+def _completed_page_results(pending, range_failures):
+    """Yields the page results of a PDF's page ranges in page order, recording failed ranges."""
+    for future in pending['futures']:
+        try:
+            page_results = future.result()
+        except Exception as e:
+            print(f"ERROR: A page range of '{pending['pdf_path']}' failed to process: {e}")
+            range_failures.append(e)
+            continue
+        yield from page_results
+
+def finish_pdf_processing(pending, scan_problems=None):
+    """
+    Waits for a PDF's page ranges and segments their pages into one page range
+    per student. Ranges are consumed in page order, so a student's pages stay
+    together even when they span two ranges. Segments with the same ID (e.g. a
+    student's pages split by an unreadable page) are combined in page order.
+    If the PDF could not be read, or some of its ranges or pages failed, a
+    description is appended to scan_problems.
+
+    Returns:
+        dict: A dictionary where keys are student IDs and values are
+              dictionaries containing the source file, its content hash, the
+              student's page indices, their page digests and extracted info.
+    """
+    if pending is None:
+        if scan_problems is not None:
+            scan_problems.append("the PDF could not be read")
+        return {}
+
+    pdf_path = pending['pdf_path']
+    segments = pending.get('cached_segments')
+    if segments is None:
+        range_failures = []
+        page_errors = []
+        segments = list(segment_student_pages(_completed_page_results(pending, range_failures), pdf_path,
+                                              pending['source_name'], pending['multi_page'], page_errors))
+        # Only complete scans are cached, so failed ranges and pages are retried next run
+        if range_failures or page_errors:
+            problem = f"{len(range_failures)} page range(s) and {len(page_errors)} page(s) failed"
+            print(f"  Not caching the extraction of '{pdf_path}': {problem}.")
+            if scan_problems is not None:
+                scan_problems.append(problem)
+        else:
+            save_cached_extraction(pending['cache_path'], pdf_path, segments)
+
+    id_to_page_data = {}
+    for segment in segments:
+        student_id = segment['info']['student_id']
+        if student_id in id_to_page_data:
+            print(f"  Warning: Student ID '{student_id}' appears again at page {segment['page_indices'][0]+1} of '{pdf_path}'. "
+                  f"Adding these pages to the student's earlier pages.")
+            id_to_page_data[student_id]['page_indices'].extend(segment['page_indices'])
+            id_to_page_data[student_id]['page_digests'].extend(segment['page_digests'])
+            continue
+        # Store where the pages live rather than the page objects themselves
+        id_to_page_data[student_id] = {
+            'source': pdf_path,
+            'content_hash': pending['content_hash'],
+            'page_indices': list(segment['page_indices']),
+            'page_digests': list(segment['page_digests']),
+            'info': segment['info']
+        }
+    page_count = sum(len(entry['page_indices']) for entry in id_to_page_data.values())
+    print(f"--- Finished processing '{pdf_path}'. Found {len(id_to_page_data)} unique student IDs on {page_count} pages. ---")
+    return id_to_page_data
+
+def process_pdf(pdf_path, extractor, executor=None):
+    """
+    Reads a PDF, extracts text from each page, and maps student IDs to their
+    pages (source file and page indices, including continuation pages without
+    an ID) and their extracted information. Pages are extracted in parallel
+    ranges on a process pool.
+
+    Args:
+        pdf_path (str): The path to the PDF file.
+        extractor (SourceExtractor): The compiled patterns for this source.
+        executor (ProcessPoolExecutor, optional): Pool to run the extraction on.
+            A pool of EXTRACTION_WORKERS processes is created if not given.
+
+    Returns:
+        dict: See finish_pdf_processing.
+    """
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS) as own_executor:
+            return finish_pdf_processing(start_pdf_processing(own_executor, pdf_path, extractor))
+    return finish_pdf_processing(start_pdf_processing(executor, pdf_path, extractor))
+
+# --- Join and Output ---
+def _sorted_source_stream(source_name, id_to_page_data):
+    """Yields (student_id, source_name, entry) for one source in student ID order."""
+    for student_id in sorted(id_to_page_data):
+        yield student_id, source_name, id_to_page_data[student_id]
+
+def join_on_student_id(source_data, source_names):
+    """
+    Streams the scanned sources of a job as one k-way merge in student ID
+    order, yielding (student_id, {source_name: entry}) for every ID found in
+    at least one source.
+    """
+    streams = [_sorted_source_stream(name, source_data[name]) for name in source_names]
+    merged = heapq.merge(*streams, key=lambda item: item[0])
+    for student_id, group in itertools.groupby(merged, key=lambda item: item[0]):
+        yield student_id, {source_name: entry for _, source_name, entry in group}
+
+def write_packet_pdf(output_filename, packets, page_order, page_sources, bundle=False):
+    """
+    Writes one or more student packets to output_filename, atomically (the PDF
+    is written next to the target and renamed, so an interrupted run never
+    leaves a partial file).
+
+    Args:
+        output_filename (str): Target PDF path.
+        packets (list): Packets ({'student_name', 'entries', ...}) in page order.
+        page_order (list): Source names in packet page order.
+        page_sources (dict): Source PDF path -> PageSource.
+        bundle (bool): Add an outline bookmark per student, compress content
+            streams and deduplicate identical objects.
+
+    Returns:
+        int: The size of the written file in bytes.
+    """
+    # Pages are only loaded from the source PDFs as each packet is written
+    writer = PdfWriter()
+    for packet in packets:
+        first_page_number = len(writer.pages)
+        for name in page_order:
+            entry = packet['entries'][name]
+            for page_index in entry['page_indices']:
+                writer.add_page(page_sources[entry['source']].get_page(page_index))
+        if bundle:
+            writer.add_outline_item(packet['student_name'], first_page_number)
+
+    if bundle:
+        for page in writer.pages:
+            page.compress_content_streams()
+        writer.compress_identical_objects()
+
+    temp_filename = f"{output_filename}.tmp"
+    with open(temp_filename, "wb") as output_pdf_file:
+        writer.write(output_pdf_file)
+    os.replace(temp_filename, output_filename)
+    return os.path.getsize(output_filename)
+
+def merge_student_pdfs(job, source_data, page_sources, incomplete_sources=()):
+    """
+    Merges student pages from the job's sources based on matching student IDs,
+    organizing output by advisor (one file per student, or one bundle per
+    advisor in 'bundle' output mode). Students missing from any of the job's
+    sources are skipped. Files whose source pages are unchanged since the
+    previous run are left as they are, and files that are no longer produced
+    are removed, unless one of the job's sources is in incomplete_sources.
+
+    Args:
+        job (dict): A manifest job ('name', 'output_dir', 'page_order',
+            'naming_source', 'output_mode').
+        source_data (dict): Source name -> ID map returned by finish_pdf_processing.
+        page_sources (dict): Source PDF path -> PageSource shared by all jobs.
+        incomplete_sources (collection): Sources that were missing, unreadable
+            or only partly scanned (see scan_sources).
+    """
+    output_base_dir = job['output_dir']
+    page_order = job['page_order']
+    naming_source = job['naming_source']
+    bundle = job.get('output_mode', 'student') == 'bundle'
+    totals = {'merged': 0, 'unchanged': 0, 'skipped': 0, 'removed': 0, 'files_written': 0, 'bytes_written': 0, 'write_seconds': 0.0}
+
+    if not any(source_data[name] for name in page_order):
+        print(f"No student data found in any source of job '{job['name']}'. Skipping.")
+        return totals
+
+    # Ensure the base output directory exists
+    os.makedirs(output_base_dir, exist_ok=True)
+
+    print(f"\n--- Initiating Merge Process for '{job['name']}' ---")
+    for name in page_order:
+        print(f"Students found in '{name}': {len(source_data[name])}")
+    print(f"Merged PDFs will be saved in '{os.path.abspath(output_base_dir)}'.")
+
+    # Group the joined students by output file: one file per student, or one
+    # per advisor in bundle mode
+    output_groups = {}
+    for student_id, entries in join_on_student_id(source_data, page_order):
+        missing_sources = [name for name in page_order if name not in entries]
+        if missing_sources:
+            totals['skipped'] += 1
+            print(f"INFO: Student ID '{student_id}' was NOT found in: {', '.join(missing_sources)}. Skipping merge.")
+            continue
+
+        naming_info = entries[naming_source]['info']
+        advisor_name = (naming_info.get('advisor') or 'UnknownAdvisor').replace(" ", "_").replace(",", "") # Sanitize for filename, remove commas
+        student_name = naming_info.get('student_name') or f"Student_{student_id}"
+
+        if bundle:
+            output_file = f"{advisor_name}.pdf"
+        else:
+            # Sanitize student name for filename (remove invalid characters and leading/trailing spaces)
+            sanitized_student_name = re.sub(r'[\\/:*?"<>|]', '', student_name).strip()
+            if not sanitized_student_name: # Fallback if name becomes empty after sanitization
+                sanitized_student_name = f"Student_{student_id}"
+            output_file = os.path.join(advisor_name, f"{sanitized_student_name}.pdf")
+
+        packet = {
+            'student_id': student_id,
+            'student_name': student_name,
+            'advisor': advisor_name,
+            'packet_hash': compute_packet_hash(page_order, entries),
+            'entries': entries,
+        }
+        if bundle:
+            output_groups.setdefault(output_file, []).append(packet)
+        else:
+            # A later student with the same name replaces the earlier file, as before
+            output_groups[output_file] = [packet]
+
+    student_index_entries = []
+    previous_index_entries = load_previous_index_entries(output_base_dir)
+    previous_packets = load_previous_packets(output_base_dir, previous_index_entries)
+    for output_file, packets in output_groups.items():
+        if bundle:
+            packets.sort(key=lambda packet: packet['student_name'].lower())
+        output_filename = os.path.join(output_base_dir, output_file)
+        packet_hashes = [packet['packet_hash'] for packet in packets]
+
+        try:
+            if (None not in packet_hashes and previous_packets.get(output_file) == packet_hashes
+                    and os.path.exists(output_filename)):
+                totals['unchanged'] += len(packets)
+            else:
+                # Create advisor-specific directory
+                os.makedirs(os.path.dirname(output_filename), exist_ok=True)
+                write_start = time.perf_counter()
+                totals['bytes_written'] += write_packet_pdf(output_filename, packets, page_order, page_sources, bundle)
+                totals['write_seconds'] += time.perf_counter() - write_start
+                totals['files_written'] += 1
+                totals['merged'] += len(packets)
+                if bundle:
+                    print(f"SUCCESS: Bundled {len(packets)} students of advisor '{packets[0]['advisor']}' into '{output_filename}'")
+                else:
+                    print(f"SUCCESS: Merged '{packets[0]['student_id']}' ({packets[0]['student_name']}) into '{output_filename}'")
+        except Exception as e:
+            print(f"ERROR: Failed to save merged PDF '{output_filename}' ({len(packets)} student(s)): {e}")
+            totals['skipped'] += len(packets)
+            continue
+
+        for packet in packets:
+            entries = packet['entries']
+            student_index_entries.append({
+                'student_id': packet['student_id'],
+                'student_name': packet['student_name'],
+                'advisor': packet['advisor'],
+                'output_file': output_file,
+                'packet_hash': packet['packet_hash'],
+                'pages': [
+                    {
+                        'source_file': os.path.abspath(entries[name]['source']),
+                        'page_number': page_index + 1,
+                        'content_hash': entries[name]['content_hash'],
+                    }
+                    for name in page_order
+                    for page_index in entries[name]['page_indices']
+                ],
+            })
+
+    incomplete_job_sources = [name for name in page_order if name in incomplete_sources]
+    if incomplete_job_sources:
+        # Students missing from an incomplete source may still exist: keep their packets and index entries
+        kept_entries = [entry for entry in previous_index_entries if entry['output_file'] not in output_groups]
+        student_index_entries.extend(kept_entries)
+        print(f"WARNING: Not all pages of {', '.join(incomplete_job_sources)} were scanned. "
+              f"Keeping {len({entry['output_file'] for entry in kept_entries})} packet(s) from the previous run "
+              f"instead of removing packets that were not produced this time.")
+    else:
+        totals['removed'] = remove_stale_packets(
+            output_base_dir, [output_file for output_file in previous_packets if output_file not in output_groups]
+        )
+
+    try:
+        index_path = write_student_index(output_base_dir, student_index_entries)
+        print(f"Student index written to '{index_path}'.")
+    except OSError as e:
+        print(f"ERROR: Could not write student index to '{output_base_dir}': {e}")
+
+    return totals
+
+# --- Manifest ---
+def load_manifest(manifest_path):
+    """
+    Loads and validates a job manifest. Relative paths are resolved against
+    the manifest's own folder.
+
+    Raises:
+        ValueError: If the manifest is missing required keys or a job refers
+                    to an undefined source.
+    """
+    with open(manifest_path, 'r') as f:
+        manifest = json.load(f)
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    sources = manifest.get('sources')
+    jobs = manifest.get('jobs')
+    if not sources or not jobs:
+        raise ValueError("Manifest needs both a 'sources' and a 'jobs' section.")
+
+    for name, source in sources.items():
+        if 'path' not in source or 'id_pattern' not in source:
+            raise ValueError(f"Source '{name}' needs a 'path' and an 'id_pattern'.")
+        if source.get('extraction_mode', 'full') not in EXTRACTION_MODES:
+            raise ValueError(f"Source '{name}' extraction_mode must be one of: {', '.join(EXTRACTION_MODES)}.")
+        source['path'] = os.path.join(base_dir, source['path'])
+
+    for job in jobs:
+        if 'name' not in job or not job.get('page_order'):
+            raise ValueError("Every job needs a 'name' and a non-empty 'page_order'.")
+        undefined = [name for name in job['page_order'] if name not in sources]
+        if undefined:
+            raise ValueError(f"Job '{job['name']}' uses undefined source(s): {', '.join(undefined)}.")
+        job.setdefault('naming_source', job['page_order'][0])
+        if job['naming_source'] not in job['page_order']:
+            raise ValueError(f"Job '{job['name']}' naming_source must be one of its page_order sources.")
+        job['output_dir'] = os.path.join(base_dir, job.get('output_dir', job['name']))
+        if job.setdefault('output_mode', 'student') not in OUTPUT_MODES:
+            raise ValueError(f"Job '{job['name']}' output_mode must be one of: {', '.join(OUTPUT_MODES)}.")
+    return manifest
+
+def build_extractor(name, source):
+    """Builds the SourceExtractor for a manifest 'sources' entry."""
+    return SourceExtractor(
+        name,
+        source['id_pattern'],
+        source.get('fields'),
+        extraction_mode=source.get('extraction_mode', 'full'),
+        header_region_fraction=source.get('header_region_fraction', HEADER_REGION_FRACTION),
+        header_max_text_objects=source.get('header_max_text_objects', HEADER_MAX_TEXT_OBJECTS),
+        multi_page=source.get('multi_page', False),
+    )
+
+def scan_sources(manifest, source_names, incomplete_sources=None):
+    """
+    Scans the named manifest sources concurrently on one shared worker pool.
+    The names of sources that were missing, unreadable or only partly scanned
+    are added to incomplete_sources (a set), if given.
+
+    Returns:
+        dict: Source name -> ID map returned by finish_pdf_processing.
+    """
+    extractors = {name: build_extractor(name, manifest['sources'][name]) for name in source_names}
+    workers = manifest.get('workers') or EXTRACTION_WORKERS
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = {
+            name: start_pdf_processing(executor, manifest['sources'][name]['path'], extractors[name])
+            for name in source_names
+        }
+        source_data = {}
+        for name in source_names:
+            scan_problems = []
+            source_data[name] = finish_pdf_processing(pending[name], scan_problems)
+            if scan_problems and incomplete_sources is not None:
+                incomplete_sources.add(name)
+        return source_data
+
+def run_manifest(manifest, job_names=None, output_mode=None):
+    """
+    Runs the manifest's jobs (or only those in job_names). Every source used by
+    the selected jobs is scanned once, concurrently, on one shared worker pool;
+    then each job is joined and written. output_mode, if given, overrides the
+    jobs' own output_mode.
+    """
+    jobs = [job for job in manifest['jobs'] if not job_names or job['name'] in job_names]
+    if not jobs:
+        print("No matching jobs in the manifest. Exiting.")
+        return
+    if output_mode:
+        for job in jobs:
+            job['output_mode'] = output_mode
+
+    used_source_names = sorted({name for job in jobs for name in job['page_order']})
+    incomplete_sources = set()
+    source_data = scan_sources(manifest, used_source_names, incomplete_sources)
+
+    page_sources = {}
+    totals = {}
+    try:
+        for name in used_source_names:
+            pdf_path = manifest['sources'][name]['path']
+            if source_data[name] and pdf_path not in page_sources:
+                page_sources[pdf_path] = PageSource(pdf_path)
+        for job in jobs:
+            totals[job['name']] = merge_student_pdfs(job, source_data, page_sources, incomplete_sources)
+    finally:
+        for page_source in page_sources.values():
+            page_source.close()
+
+    print(f"\n--- Merging Summary ---")
+    for job in jobs:
+        job_totals = totals[job['name']]
+        print(f"{job['name']}: merged {job_totals['merged']}, unchanged {job_totals['unchanged']}, "
+              f"skipped {job_totals['skipped']}, removed {job_totals['removed']} -> '{job['output_dir']}'")
+        if job_totals['files_written']:
+            print(f"  wrote {job_totals['files_written']} {job['output_mode']} file(s), "
+                  f"{job_totals['bytes_written'] / 1024:.0f} KB in {job_totals['write_seconds']:.2f} s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Join student pages from several PDFs into per-student packets.")
+    parser.add_argument("manifest", help="Path to the job manifest (JSON).")
+    parser.add_argument("--job", action="append", dest="jobs",
+                        help="Only run this job (can be repeated). Defaults to all jobs.")
+    parser.add_argument("--output-mode", choices=OUTPUT_MODES,
+                        help="Write one PDF per student or one bundle per advisor, for every job. "
+                             "Defaults to each job's 'output_mode' in the manifest.")
+    args = parser.parse_args()
+
+    try:
+        manifest = load_manifest(args.manifest)
+    except (OSError, json.JSONDecodeError, ValueError) as e:
+        print(f"ERROR: Could not load manifest '{args.manifest}': {e}")
+        return 1
+
+    run_manifest(manifest, job_names=args.jobs, output_mode=args.output_mode)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
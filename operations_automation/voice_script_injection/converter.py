@@ -1,26 +1,246 @@
-# convert.py
+# converter.py
 
-from pydub import AudioSegment
+import argparse
+import hashlib
+import json
 import os
+import sys
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pydub import AudioSegment
+
+# Usage:
+#   python converter.py                          # every voicemail in this folder -> WAV next to it
+#   python converter.py voicemails/ -o wav/      # a whole folder of scripts (languages/versions)
+#   python converter.py voicemails/ --rate 48000 --workers 4 --force
+
+# --- Configuration ---
+# Name of the virtual audio device the player sends voicemails to (see voicemail_player.py)
+VIRTUAL_DEVICE_NAME = "BlackHole 2ch"
+# Used when the device's native rate can't be queried (no sounddevice/PortAudio)
+DEFAULT_SAMPLE_RATE = 48000
+# Source formats picked up from the input folder
+SOURCE_EXTENSIONS = ('.m4a', '.mp3', '.aac', '.ogg', '.flac', '.wav')
+
+# --- Conversion Cache ---
+# Converting is decode + resample + encode through ffmpeg, so it is done once,
+# ahead of time, at the rate the output device runs at; the player then only
+# reads a WAV that needs no decoding or resampling at play time. The output
+# folder keeps a small manifest recording, for every WAV, the content hash of
+# its source and the rate it was written at. A source whose hash and rate
+# match and whose WAV still exists is skipped. A WAV source converted in place
+# is its own output, so it is checked by the rate in its header instead: one
+# already at the target rate is left alone, any other is resampled over itself.
+CACHE_MANIFEST_FILE = ".conversion_cache.json"
+CACHE_VERSION = 1
+
+def compute_file_hash(file_path):
+    """Returns the SHA-256 hex digest of a file's contents."""
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+def get_device_sample_rate(device_name):
+    """
+    Returns the native (default) sample rate of the named output device, or
+    None if sounddevice isn't available or the device isn't found.
+    """
+    try:
+        import sounddevice as sd
+    except (ImportError, OSError):
+        return None
+    try:
+        for device in sd.query_devices():
+            if device_name.lower() in device['name'].lower() and device['max_output_channels'] > 0:
+                return int(device['default_samplerate'])
+    except Exception as e:
+        print(f"⚠️ Could not query audio devices: {e}")
+    return None
+
+def get_wav_sample_rate(wav_path):
+    """Returns the sample rate in a WAV file's header, or None if it can't be read."""
+    try:
+        with wave.open(wav_path, 'rb') as wav_file:
+            return wav_file.getframerate()
+    except (OSError, EOFError, wave.Error):
+        return None
+
+def list_source_files(input_dir, output_dir):
+    """
+    Returns the audio files to convert in input_dir. When converting in place,
+    a WAV with the same name as another source is that source's output and is
+    left out; any other WAV is a source of its own.
+    """
+    source_files = []
+    for file_name in sorted(os.listdir(input_dir)):
+        file_path = os.path.join(input_dir, file_name)
+        extension = os.path.splitext(file_name)[1]
+        if os.path.isfile(file_path) and extension.lower() in SOURCE_EXTENSIONS:
+            source_files.append(file_path)
+    if os.path.abspath(input_dir) == os.path.abspath(output_dir):
+        converted_stems = {os.path.splitext(file_path)[0] for file_path in source_files
+                           if not file_path.lower().endswith('.wav')}
+        source_files = [file_path for file_path in source_files
+                        if not (file_path.lower().endswith('.wav') and os.path.splitext(file_path)[0] in converted_stems)]
+    return source_files
 
-# Define the input and output filenames
-m4a_file = "english_vm.m4a"
-wav_file = "english_vm.wav"
+def get_output_path(source_path, output_dir):
+    """english_vm.m4a -> <output_dir>/english_vm.wav"""
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    return os.path.join(output_dir, f"{stem}.wav")
 
-# Check if the input file exists
-if not os.path.exists(m4a_file):
-    print(f"Error: The file '{m4a_file}' was not found in this directory.")
-else:
+def load_cache_manifest(output_dir):
+    """Returns {wav_file_name: {'source_hash', 'sample_rate'}} or {} if missing/outdated."""
+    manifest_path = os.path.join(output_dir, CACHE_MANIFEST_FILE)
     try:
-        # Load the M4A file
-        print(f"Loading '{m4a_file}'...")
-        audio = AudioSegment.from_file(m4a_file, format="m4a")
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if manifest.get('version') != CACHE_VERSION:
+        return {}
+    return manifest.get('files', {})
 
-        # Export it as a WAV file
-        print(f"Converting and exporting to '{wav_file}'...")
-        audio.export(wav_file, format="wav")
+def save_cache_manifest(output_dir, files):
+    """Writes the cache manifest atomically (temp file + replace)."""
+    manifest_path = os.path.join(output_dir, CACHE_MANIFEST_FILE)
+    temp_path = f"{manifest_path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump({'version': CACHE_VERSION, 'files': files}, f, indent=2, sort_keys=True)
+    os.replace(temp_path, manifest_path)
 
-        print("\nConversion successful!")
-        print(f"A new file named '{wav_file}' has been created.")
+def is_up_to_date(cache_entry, source_hash, sample_rate, output_path):
+    """True if the WAV exists and was written from this exact source at this rate."""
+    return (cache_entry is not None
+            and cache_entry.get('source_hash') == source_hash
+            and cache_entry.get('sample_rate') == sample_rate
+            and os.path.exists(output_path))
+
+def convert_file(source_path, output_path, sample_rate):
+    """
+    Decodes one source file, resamples it to sample_rate and writes a WAV.
+    Runs in a worker process. Returns (source_path, seconds, error or None).
+    """
+    start_time = time.perf_counter()
+    try:
+        audio = AudioSegment.from_file(source_path)
+        if audio.frame_rate != sample_rate:
+            audio = audio.set_frame_rate(sample_rate)
+        # Write next to the target and swap it in, so a failed export never
+        # leaves a truncated WAV that the player would pick up
+        temp_path = f"{output_path}.tmp"
+        audio.export(temp_path, format="wav")
+        os.replace(temp_path, output_path)
     except Exception as e:
-        print(f"An error occurred during conversion: {e}")
+        return source_path, time.perf_counter() - start_time, str(e)
+    return source_path, time.perf_counter() - start_time, None
+
+def convert_directory(input_dir, output_dir, sample_rate, workers=None, force=False):
+    """
+    Converts every voicemail source in input_dir to a WAV at sample_rate in
+    output_dir, in parallel, skipping sources whose WAV is already up to date.
+
+    Args:
+        input_dir (str): Folder containing the source recordings.
+        output_dir (str): Folder for the WAV files and the cache manifest.
+        sample_rate (int): Rate to resample to (the output device's native rate).
+        workers (int): Worker processes. Defaults to the CPU count.
+        force (bool): Convert everything, ignoring the cache.
+
+    Returns:
+        dict: Counts of 'converted', 'skipped' and 'failed' files.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    source_files = list_source_files(input_dir, output_dir)
+    if not source_files:
+        print(f"No audio files ({', '.join(SOURCE_EXTENSIONS)}) found in '{input_dir}'.")
+        return {'converted': 0, 'skipped': 0, 'failed': 0}
+
+    cache = {} if force else load_cache_manifest(output_dir)
+    updated_cache = {}
+    pending = {}
+    claimed_wav_names = set()
+    skipped = 0
+    for source_path in source_files:
+        output_path = get_output_path(source_path, output_dir)
+        wav_file_name = os.path.basename(output_path)
+        if wav_file_name in claimed_wav_names:
+            print(f"⚠️ Skipping '{source_path}': another source already converts to '{wav_file_name}'.")
+            continue
+        claimed_wav_names.add(wav_file_name)
+        if os.path.abspath(output_path) == os.path.abspath(source_path):
+            if get_wav_sample_rate(source_path) == sample_rate:
+                skipped += 1
+                continue
+        source_hash = compute_file_hash(source_path)
+        cache_entry = cache.get(wav_file_name)
+        if is_up_to_date(cache_entry, source_hash, sample_rate, output_path):
+            updated_cache[wav_file_name] = cache_entry
+            skipped += 1
+            continue
+        pending[source_path] = (output_path, source_hash)
+
+    print(f"🔁 {len(pending)} file(s) to convert at {sample_rate} Hz, {skipped} already up to date.")
+    converted = 0
+    failed = 0
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(convert_file, source_path, output_path, sample_rate)
+                       for source_path, (output_path, _) in pending.items()]
+            for future in as_completed(futures):
+                source_path, seconds, error = future.result()
+                output_path, source_hash = pending[source_path]
+                if error:
+                    print(f"❌ Failed to convert '{source_path}': {error}")
+                    failed += 1
+                    continue
+                updated_cache[os.path.basename(output_path)] = {
+                    'source_file': os.path.basename(source_path),
+                    'source_hash': source_hash,
+                    'sample_rate': sample_rate,
+                }
+                converted += 1
+                print(f"✅ '{source_path}' -> '{output_path}' ({seconds:.1f} s)")
+
+    save_cache_manifest(output_dir, updated_cache)
+    return {'converted': converted, 'skipped': skipped, 'failed': failed}
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Converts voicemail recordings to WAV at the playback device's native rate."
+    )
+    parser.add_argument("input_dir", nargs="?", default=".", help="Folder with the source recordings (default: this folder).")
+    parser.add_argument("-o", "--output-dir", help="Folder for the WAV files (default: the input folder).")
+    parser.add_argument("--rate", type=int,
+                        help=f"Output sample rate. Defaults to the native rate of '{VIRTUAL_DEVICE_NAME}', "
+                             f"or {DEFAULT_SAMPLE_RATE} Hz if it can't be queried.")
+    parser.add_argument("--workers", type=int, help="Parallel conversions (default: CPU count).")
+    parser.add_argument("--force", action="store_true", help="Reconvert everything, ignoring the cache.")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.input_dir):
+        print(f"Error: The folder '{args.input_dir}' was not found.")
+        return 1
+    output_dir = args.output_dir or args.input_dir
+
+    sample_rate = args.rate
+    if sample_rate is None:
+        sample_rate = get_device_sample_rate(VIRTUAL_DEVICE_NAME)
+        if sample_rate is None:
+            sample_rate = DEFAULT_SAMPLE_RATE
+            print(f"ℹ️ Could not query '{VIRTUAL_DEVICE_NAME}'; converting at {sample_rate} Hz.")
+        else:
+            print(f"🎚️ '{VIRTUAL_DEVICE_NAME}' runs at {sample_rate} Hz; converting to match.")
+
+    start_time = time.perf_counter()
+    totals = convert_directory(args.input_dir, output_dir, sample_rate, workers=args.workers, force=args.force)
+    elapsed = time.perf_counter() - start_time
+    print(f"\nConverted {totals['converted']}, skipped {totals['skipped']} up to date, "
+          f"{totals['failed']} failed in {elapsed:.1f} s.")
+    return 1 if totals['failed'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
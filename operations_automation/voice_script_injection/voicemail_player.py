@@ -1,8 +1,16 @@
+import abc
+import argparse
+import statistics
 import subprocess
-import sounddevice as sd
+import threading
+import numpy as np
 import soundfile as sf
 import os
 import time
+try:
+    import sounddevice as sd
+except (ImportError, OSError):
+    sd = None  # No PortAudio (e.g. a Linux box without audio): only the file/null sinks work
 
 # --- Configuration ---
 # Name of the virtual audio device (BlackHole 2ch)
@@ -11,6 +19,13 @@ VIRTUAL_DEVICE_NAME = "BlackHole 2ch"
 VOICEMAIL_FILE = "english_vm.wav"
 # Small delay in seconds to allow the system to register device changes
 DEVICE_SWITCH_DELAY = 0.5
+# Frames handed to the output per callback. Smaller blocks start playback
+# sooner; larger ones are more robust against dropouts.
+PLAYBACK_BLOCK_FRAMES = 512
+# Extra seconds allowed beyond the clip length before a play that hasn't
+# finished is treated as a dead output stream
+PLAYBACK_TIMEOUT_MARGIN = 5.0
+SINK_TYPES = ('device', 'file', 'null')
 
 def run_command(command):
     """Executes a shell command and returns the output, handling errors."""
@@ -60,79 +75,324 @@ def set_input_device(device_name):
     run_command(f"SwitchAudioSource -t input -s '{device_name}'")
     time.sleep(DEVICE_SWITCH_DELAY) # Give the system a moment to recognize the change
 
-def play_audio_to_device(file_path, output_device_index):
-    """Plays a WAV file to a SPECIFIC output device and waits for it to finish."""
-    if output_device_index is None:
-        print("❌ Error: Cannot play audio, invalid output device index provided.")
-        return
+# --- Playback ---
+# The voicemail is decoded once at startup into a float32 (frames, channels)
+# buffer, and the output is opened once and kept running. Pressing play only
+# hands the buffer to a BlockWriter, which copies it block by block into the
+# output from the sink's callback, so no file I/O or stream setup happens
+# while the caller is waiting. Sinks share one interface: DeviceSink plays to
+# a sounddevice output; FileSink and NullSink run the same block loop without
+# an audio device (writing to a WAV file or discarding). Without a device no
+# output clock is involved, so for those sinks the time to the first block is
+# only the sink's own overhead, not a playback latency.
 
-    try:
-        data, fs = sf.read(file_path, dtype='float32')
-        # Ensure 'channels' matches the audio file's channel count
-        num_channels = data.shape[1] if data.ndim > 1 else 1
-
-        # Use an explicit OutputStream to direct audio to the correct device
-        with sd.OutputStream(samplerate=fs,
-                             device=output_device_index,
-                             channels=num_channels) as stream:
-            print(f"▶️ Playing '{os.path.basename(file_path)}' to device {output_device_index} ({sd.query_devices(output_device_index)['name']})...")
-            stream.write(data)
-        print("✅ Playback finished.")
+def load_voicemail(file_path):
+    """Decodes a WAV file once. Returns (float32 buffer of shape (frames, channels), sample rate)."""
+    data, samplerate = sf.read(file_path, dtype='float32', always_2d=True)
+    return np.ascontiguousarray(data), samplerate
 
-    except FileNotFoundError:
-        print(f"❌ Error: Audio file not found at '{file_path}'")
-    except Exception as e:
-        print(f"❌ Error playing audio to device {output_device_index}: {e}")
-        print("💡 Ensure the audio file is valid and the device supports the sample rate/channels.")
+class BlockWriter:
+    """Copies the current buffer into output blocks; outputs silence when idle."""
 
-def main():
-    """Main application loop."""
-    print("--- 🎙️ Voicemail Player Initializing ---")
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buffer = None
+        self.position = 0
+        self.started_at = None
+        self.first_block_at = None
+        self.finished = threading.Event()
+        self.finished.set()
 
-    if not os.path.exists(VOICEMAIL_FILE):
-        print(f"❌ Fatal Error: The voicemail file '{VOICEMAIL_FILE}' was not found.")
-        print("Please ensure the file is in the same directory as this script, or provide its full path.")
+    def start(self, buffer):
+        """Queues a buffer for playback; blocks are taken from it by fill()."""
+        with self.lock:
+            self.finished.clear()
+            self.buffer = buffer
+            self.position = 0
+            self.started_at = time.perf_counter()
+            self.first_block_at = None
+
+    def fill(self, outdata):
+        """Writes the next block into outdata (called from the output callback)."""
+        with self.lock:
+            if self.buffer is None:
+                outdata.fill(0)
+                return
+            if self.first_block_at is None:
+                self.first_block_at = time.perf_counter()
+            frames = len(outdata)
+            block = self.buffer[self.position:self.position + frames]
+            outdata[:len(block)] = block
+            outdata[len(block):] = 0
+            self.position += len(block)
+            if self.position >= len(self.buffer):
+                self.buffer = None
+                self.finished.set()
+
+    def cancel(self):
+        """Drops the current buffer (e.g. when the output stopped calling fill())."""
+        with self.lock:
+            self.buffer = None
+            self.finished.set()
+
+    def latency(self):
+        """Seconds from start() to the first block being written, or None."""
+        if self.first_block_at is None:
+            return None
+        return self.first_block_at - self.started_at
+
+class AudioSink(abc.ABC):
+    """
+    Where voicemail audio goes. open() is called once at startup with the
+    buffer's format; play() plays one buffer and returns once it's done
+    (returning the seconds until its first block was written, described by
+    timing_label); close() releases the sink.
+    """
+
+    timing_label = "start latency"
+
+    def __init__(self, blocksize=PLAYBACK_BLOCK_FRAMES):
+        self.blocksize = blocksize
+        self.writer = BlockWriter()
+
+    def open(self, samplerate, channels):
+        self.samplerate = samplerate
+        self.channels = channels
+
+    @abc.abstractmethod
+    def play(self, buffer):
+        """Plays one buffer, returns when done. Returns the seconds until its first block, or None."""
+
+    def close(self):
+        pass
+
+    def describe(self):
+        return self.__class__.__name__
+
+class DeviceSink(AudioSink):
+    """Plays to a sounddevice output through one persistent callback stream."""
+
+    def __init__(self, device_index, blocksize=PLAYBACK_BLOCK_FRAMES):
+        super().__init__(blocksize)
+        self.device_index = device_index
+        self.stream = None
+
+    def open(self, samplerate, channels):
+        super().open(samplerate, channels)
+        device_rate = int(sd.query_devices(self.device_index)['default_samplerate'])
+        if device_rate != samplerate:
+            print(f"⚠️ The voicemail is {samplerate} Hz but the device runs at {device_rate} Hz, so it will be "
+                  f"resampled during playback. Convert it ahead of time with: python converter.py --rate {device_rate}")
+
+        def callback(outdata, frames, time_info, status):
+            if status:
+                print(f"⚠️ Output stream status: {status}")
+            self.writer.fill(outdata)
+
+        self.stream = sd.OutputStream(samplerate=samplerate, device=self.device_index, channels=channels,
+                                      dtype='float32', blocksize=self.blocksize, callback=callback)
+        self.stream.start()
+
+    def play(self, buffer):
+        self.writer.start(buffer)
+        timeout = len(buffer) / self.samplerate + PLAYBACK_TIMEOUT_MARGIN
+        if not self.writer.finished.wait(timeout):
+            self.writer.cancel()
+            raise RuntimeError(f"Playback did not finish within {timeout:.1f} s; the output stream stopped "
+                               f"(active: {self.stream.active}).")
+        # Let the last block drain out of the device before the mic is switched back
+        time.sleep(self.stream.latency)
+        return self.writer.latency()
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+    def describe(self):
+        return f"device {self.device_index} ({sd.query_devices(self.device_index)['name']})"
+
+class NullSink(AudioSink):
+    """Runs the block loop and discards the audio (as fast as possible)."""
+
+    timing_label = "sink overhead"
+
+    def play(self, buffer):
+        self.writer.start(buffer)
+        block = np.zeros((self.blocksize, self.channels), dtype='float32')
+        while not self.writer.finished.is_set():
+            self.writer.fill(block)
+            self.write_block(block)
+        return self.writer.latency()
+
+    def write_block(self, block):
+        pass
+
+    def describe(self):
+        return "null sink"
+
+class FileSink(NullSink):
+    """Runs the block loop and writes every played block to a WAV file."""
+
+    def __init__(self, output_path, blocksize=PLAYBACK_BLOCK_FRAMES):
+        super().__init__(blocksize)
+        self.output_path = output_path
+        self.output_file = None
+
+    def open(self, samplerate, channels):
+        super().open(samplerate, channels)
+        self.output_file = sf.SoundFile(self.output_path, mode='w', samplerate=samplerate,
+                                        channels=channels, subtype='FLOAT')
+
+    def write_block(self, block):
+        self.output_file.write(block)
+
+    def close(self):
+        if self.output_file is not None:
+            self.output_file.close()
+            self.output_file = None
+
+    def describe(self):
+        return f"file '{self.output_path}'"
+
+def play_voicemail(sink, buffer):
+    """Plays the preloaded voicemail buffer on an opened sink and waits for it to finish."""
+    try:
+        print(f"▶️ Playing voicemail to {sink.describe()}...")
+        latency = sink.play(buffer)
+        latency_text = f" ({sink.timing_label}: {latency * 1000:.1f} ms)" if latency is not None else ""
+        print(f"✅ Playback finished{latency_text}.")
+        return latency
+    except Exception as e:
+        print(f"❌ Error playing audio to {sink.describe()}: {e}")
+        return None
+
+def measure_playback_latency(sink, buffer, runs):
+    """
+    Plays the voicemail runs times and prints the start latency statistics
+    (only the sink's overhead for the file and null sinks). A failed play
+    (e.g. a device stream that stopped) ends the measurement; the plays
+    before it are still reported.
+    """
+    latencies = []
+    for run in range(1, runs + 1):
+        try:
+            latency = sink.play(buffer)
+        except Exception as e:
+            print(f"❌ Play {run} of {runs} on {sink.describe()} failed: {e}")
+            break
+        if latency is not None:
+            latencies.append(latency)
+    if not latencies:
+        print("❌ No playback started.")
         return
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    p95_ms = latencies_ms[min(len(latencies_ms) - 1, int(len(latencies_ms) * 0.95))]
+    print(f"Playback {sink.timing_label} over {len(latencies_ms)} plays on {sink.describe()}: "
+          f"median {statistics.median(latencies_ms):.3f} ms, p95 {p95_ms:.3f} ms, max {latencies_ms[-1]:.3f} ms")
 
+def build_sink(sink_type, output_path=None):
+    """Creates the sink for --sink (the device sink needs BlackHole, found by name)."""
+    if sink_type == 'null':
+        return NullSink()
+    if sink_type == 'file':
+        return FileSink(output_path or "voicemail_playback.wav")
+    if sd is None:
+        print("❌ Fatal Error: sounddevice/PortAudio is not available, so only the 'file' and 'null' sinks work.")
+        return None
     # 1. Get the device index for BlackHole output
     blackhole_output_index = get_device_index(VIRTUAL_DEVICE_NAME, kind='output')
     if blackhole_output_index is None:
         print(f"❌ Fatal Error: Could not find virtual audio device '{VIRTUAL_DEVICE_NAME}' output.")
         print("Please ensure BlackHole is installed and working. Check your macOS 'Audio MIDI Setup' utility.")
-        return
+        return None
     print(f"✅ Found virtual audio device '{VIRTUAL_DEVICE_NAME}' output at index: {blackhole_output_index}")
+    return DeviceSink(blackhole_output_index)
+
+def main():
+    """Main application loop."""
+    parser = argparse.ArgumentParser(description="Plays a voicemail into calls through the BlackHole virtual mic.")
+    parser.add_argument("--file", default=VOICEMAIL_FILE, help=f"Voicemail WAV file (default: {VOICEMAIL_FILE}).")
+    parser.add_argument("--sink", choices=SINK_TYPES, default='device',
+                        help="Where to play: the BlackHole device (default), a WAV file, or nowhere (null).")
+    parser.add_argument("--sink-file", help="Output WAV for --sink file (default: voicemail_playback.wav).")
+    parser.add_argument("--measure", type=int, metavar="N",
+                        help="Play the voicemail N times without prompting or switching mics and report start latency "
+                             "(only the sink overhead for the file and null sinks).")
+    args = parser.parse_args()
+
+    print("--- 🎙️ Voicemail Player Initializing ---")
 
-    # 2. Get the user's original, physical microphone.
-    original_mic = get_current_input_device()
-    if original_mic is None or original_mic.lower() == VIRTUAL_DEVICE_NAME.lower():
-        print(f"⚠️ Warning: Your current system microphone is '{original_mic}'.")
-        print("It should NOT be BlackHole at the start. Please set your default input to your actual microphone in System Settings -> Sound -> Input, and then restart the script.")
-        # If it's already BlackHole, we can't reliably restore the original later.
-        # Forcing exit to prevent issues.
+    if not os.path.exists(args.file):
+        print(f"❌ Fatal Error: The voicemail file '{args.file}' was not found.")
+        print("Please ensure the file is in the same directory as this script, or provide its full path.")
         return
-    print(f"✅ Detected original microphone: '{original_mic}'")
+
+    # Decode the voicemail once; every play reuses this buffer
+    try:
+        voicemail_buffer, samplerate = load_voicemail(args.file)
+    except Exception as e:
+        print(f"❌ Fatal Error: Could not read '{args.file}': {e}")
+        return
+    print(f"✅ Loaded '{args.file}' ({len(voicemail_buffer) / samplerate:.1f} s, {samplerate} Hz, {voicemail_buffer.shape[1]} ch)")
+
+    sink = build_sink(args.sink, args.sink_file)
+    if sink is None:
+        return
+    try:
+        sink.open(samplerate, voicemail_buffer.shape[1])
+    except Exception as e:
+        print(f"❌ Fatal Error: Could not open {sink.describe()}: {e}")
+        return
+
+    if args.measure:
+        try:
+            measure_playback_latency(sink, voicemail_buffer, args.measure)
+        finally:
+            sink.close()
+        return
+
+    # 2. Get the user's original, physical microphone (only the device sink feeds the mic)
+    switch_mic = isinstance(sink, DeviceSink)
+    original_mic = None
+    if switch_mic:
+        original_mic = get_current_input_device()
+        if original_mic is None or original_mic.lower() == VIRTUAL_DEVICE_NAME.lower():
+            print(f"⚠️ Warning: Your current system microphone is '{original_mic}'.")
+            print("It should NOT be BlackHole at the start. Please set your default input to your actual microphone in System Settings -> Sound -> Input, and then restart the script.")
+            # If it's already BlackHole, we can't reliably restore the original later.
+            # Forcing exit to prevent issues.
+            sink.close()
+            return
+        print(f"✅ Detected original microphone: '{original_mic}'")
     print("-" * 40)
 
     try:
         while True:
             print("\nWaiting for your command...")
-            print("  [1] Play Voicemail (Will temporarily switch your mic to BlackHole)")
+            if switch_mic:
+                print("  [1] Play Voicemail (Will temporarily switch your mic to BlackHole)")
+            else:
+                print(f"  [1] Play Voicemail to {sink.describe()}")
             print("  [q] Quit")
             choice = input("Enter your choice: ").strip()
 
             if choice == '1':
                 print("\n--- Initiating Voicemail Playback Sequence ---")
-                # Step 1: Switch system input to BlackHole
-                set_input_device(VIRTUAL_DEVICE_NAME)
-                print(f"🕒 Waiting {DEVICE_SWITCH_DELAY} seconds for system to adjust...")
+                if switch_mic:
+                    # Step 1: Switch system input to BlackHole
+                    set_input_device(VIRTUAL_DEVICE_NAME)
+                    print(f"🕒 Waiting {DEVICE_SWITCH_DELAY} seconds for system to adjust...")
 
-                # Step 2: Play audio to BlackHole's output
-                play_audio_to_device(VOICEMAIL_FILE, blackhole_output_index)
+                # Step 2: Play the preloaded voicemail through the already-open sink
+                play_voicemail(sink, voicemail_buffer)
 
-                # Step 3: Switch system input back to original mic
                 print("--- Voicemail Playback Complete ---")
-                set_input_device(original_mic)
-                print(f"✅ Switched system microphone back to '{original_mic}'. You can speak again.")
+                if switch_mic:
+                    # Step 3: Switch system input back to original mic
+                    set_input_device(original_mic)
+                    print(f"✅ Switched system microphone back to '{original_mic}'. You can speak again.")
 
             elif choice.lower() == 'q':
                 print("Exiting application.")
@@ -143,13 +403,14 @@ def main():
     except KeyboardInterrupt:
         print("\nInterrupted by user.")
     finally:
+        sink.close()
         # Always attempt to restore the original microphone on exit
-        current_mic = get_current_input_device()
-        if current_mic is not None and current_mic.lower() == VIRTUAL_DEVICE_NAME.lower():
-            print("\n🚨 Cleaning up: restoring original microphone...")
-            set_input_device(original_mic)
+        if switch_mic:
+            current_mic = get_current_input_device()
+            if current_mic is not None and current_mic.lower() == VIRTUAL_DEVICE_NAME.lower():
+                print("\n🚨 Cleaning up: restoring original microphone...")
+                set_input_device(original_mic)
         print("--- Application Closed ---")
 
 if __name__ == "__main__":
     main()
-
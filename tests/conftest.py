@@ -0,0 +1,12 @@
+import os
+import sys
+
+# The scripts are run from their own folders and import their neighbours by
+# module name, so the tests put those folders on the import path the same way.
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for script_folder in ('attendance_automation',
+                      os.path.join('operations_automation', 'pdf_merger'),
+                      os.path.join('operations_automation', 'eml_merge'),
+                      os.path.join('operations_automation', 'eml_merge', 'benchmarks'),
+                      os.path.join('operations_automation', 'voice_script_injection')):
+    sys.path.insert(0, os.path.join(REPO_ROOT, script_folder))
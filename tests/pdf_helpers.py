@@ -0,0 +1,40 @@
+import json
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+def write_text_pdf(pdf_path, page_texts):
+    """Writes a PDF with one page per entry of page_texts, each a list of lines drawn from the top."""
+    pdf_canvas = canvas.Canvas(str(pdf_path), pagesize=letter)
+    for lines in page_texts:
+        y = 740
+        for line in lines:
+            pdf_canvas.drawString(72, y, line)
+            y -= 16
+        pdf_canvas.showPage()
+    pdf_canvas.save()
+
+def ednovate_page(student_id, student_name, advisor):
+    return [f"Student ID / ID de Estudiante: {student_id}",
+            f"Student / Estudiante: {student_name}",
+            f"Advisor / Asesor: {advisor}, Room 101"]
+
+def grade_page(student_id):
+    return [f"Student ID: {student_id}", "Course grades"]
+
+def write_manifest(folder, sources, jobs, workers=1):
+    """Writes a job manifest into folder and returns its path."""
+    manifest_path = folder / "jobs.json"
+    manifest_path.write_text(json.dumps({'workers': workers, 'sources': sources, 'jobs': jobs}))
+    return str(manifest_path)
+
+ID_PATTERNS = {
+    'ednovate': {
+        'id_pattern': r"Student ID / ID de Estudiante:\s*(\d{5})",
+        'fields': {
+            'advisor': {'pattern': r"Advisor / Asesor:\s*([^,]+),", 'default': "UnknownAdvisor"},
+            'student_name': {'pattern': r"Student / Estudiante:\s*([^\n]+)", 'default': "Student_{student_id}"},
+        },
+    },
+    'grade': {'id_pattern': r"Student ID:\s*(\d{5})"},
+}
@@ -0,0 +1,53 @@
+import os
+import wave
+
+import pytest
+
+pytest.importorskip("pydub")
+
+from converter import convert_directory, get_wav_sample_rate, list_source_files  # noqa: E402
+
+def write_wav(path, sample_rate, seconds=0.1):
+    with wave.open(str(path), 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(b'\x00\x00' * int(sample_rate * seconds))
+
+def test_in_place_wavs_are_resampled_unless_already_at_the_target_rate(tmp_path):
+    write_wav(tmp_path / "english_vm.wav", 22050)
+    write_wav(tmp_path / "spanish_vm.wav", 48000)
+    spanish_before = (tmp_path / "spanish_vm.wav").read_bytes()
+
+    totals = convert_directory(str(tmp_path), str(tmp_path), 48000, workers=1)
+    assert totals == {'converted': 1, 'skipped': 1, 'failed': 0}
+    assert get_wav_sample_rate(str(tmp_path / "english_vm.wav")) == 48000
+    assert (tmp_path / "spanish_vm.wav").read_bytes() == spanish_before
+
+    assert convert_directory(str(tmp_path), str(tmp_path), 48000, workers=1) == {
+        'converted': 0, 'skipped': 2, 'failed': 0}
+
+def test_in_place_wav_next_to_its_source_is_not_a_source(tmp_path):
+    (tmp_path / "english_vm.m4a").write_bytes(b"not decoded here")
+    write_wav(tmp_path / "english_vm.wav", 48000)
+    write_wav(tmp_path / "spanish_vm.wav", 48000)
+    (tmp_path / "notes.txt").write_text("not audio")
+    source_names = [os.path.basename(path) for path in list_source_files(str(tmp_path), str(tmp_path))]
+    assert source_names == ['english_vm.m4a', 'spanish_vm.wav']
+    # Into another folder every recording is a source
+    assert len(list_source_files(str(tmp_path), str(tmp_path / "wav"))) == 3
+
+def test_converted_wavs_are_reused_until_the_source_or_rate_changes(tmp_path):
+    input_dir = tmp_path / "voicemails"
+    input_dir.mkdir()
+    output_dir = str(tmp_path / "wav")
+    write_wav(input_dir / "english_vm.wav", 22050)
+
+    assert convert_directory(str(input_dir), output_dir, 48000, workers=1)['converted'] == 1
+    assert get_wav_sample_rate(os.path.join(output_dir, "english_vm.wav")) == 48000
+    assert convert_directory(str(input_dir), output_dir, 48000, workers=1)['skipped'] == 1
+    assert convert_directory(str(input_dir), output_dir, 44100, workers=1)['converted'] == 1
+
+    write_wav(input_dir / "english_vm.wav", 22050, seconds=0.2)
+    assert convert_directory(str(input_dir), output_dir, 44100, workers=1)['converted'] == 1
+    assert convert_directory(str(input_dir), output_dir, 44100, workers=1, force=True)['converted'] == 1
@@ -0,0 +1,32 @@
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("selenium")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("openpyxl")
+
+import deanslist_v_0_3 as deanslist  # noqa: E402
+
+def write_master_report(folder, full_names):
+    report_dir = folder / "daily_raptor_report_master"
+    report_dir.mkdir()
+    report_path = report_dir / f"daily_raptor_master_report_{datetime.now().strftime('%Y-%m-%d')}.xlsx"
+    pd.DataFrame({'ID Number': range(len(full_names)), 'Full Name': full_names}).to_excel(report_path, index=False)
+
+def test_each_student_is_recorded_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # A student signed in late in two periods appears twice in the master report
+    write_master_report(tmp_path, ["Ann Lee", "Bo Diaz", "Ann Lee ", None, "  ", "Cy Park"])
+    assert deanslist.load_tardy_students() == ["Ann Lee", "Bo Diaz", "Cy Park"]
+
+def test_missing_report_is_an_error(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    assert deanslist.load_tardy_students() is None
+    assert "was not found" in capsys.readouterr().out
+
+def test_missing_credentials_are_an_error(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / deanslist.CREDENTIALS_FILE).write_text('{"deanslist": {"username": "office"}}')
+    assert deanslist.load_deanslist_credentials() is None
+    assert "username or password not found" in capsys.readouterr().out
@@ -0,0 +1,255 @@
+import os
+import sys
+
+import pytest
+from pypdf import PdfReader
+
+from bench_html_to_text import normalize_text
+from eml_merger import (EML_CACHE_DIR, convert_messages, detect_input_format, get_cache_dir, get_chunk_cache_path,
+                        get_chunk_size, html_to_text_bs4, html_to_text_lxml, list_eml_folder, list_messages,
+                        order_messages, read_message_bytes, read_message_headers, split_body_paragraphs)
+from eml_merger import etree
+from eml_merger import main as eml_merger_main
+
+requires_lxml = pytest.mark.skipif(etree is None, reason="lxml is not installed")
+
+HTML_FIXTURES = {
+    'paragraphs': "<html><body><p>First paragraph.</p>\n\n<p>Second paragraph.</p></body></html>",
+    'inline_markup': "<p>Please <b>sign</b> the <a href='#'>form</a> by <i>Friday</i>.</p>",
+    'line_breaks': "<div>Line one<br>Line two<br/>Line three</div>",
+    'script_and_style': ("<html><head><style>p { color: red; }</style><script>var a = 1;</script></head>"
+                         "<body><p>Visible</p><script>track();</script> after script</body></html>"),
+    'template': ("<body><p>Before</p><template><p>Hidden <b>markup</b></p>hidden text</template>"
+                 " after template<p>After</p></body>"),
+    'comments': "<p>Kept<!-- dropped --> text</p><!-- <p>dropped paragraph</p> -->",
+    'table': "<table><tr><th>Name</th><th>Grade</th></tr><tr><td>Ann</td><td>A</td></tr></table>",
+    'entities': "<p>Fish &amp; chips&nbsp;today &lt;3</p>",
+    'unclosed_tags': "<div><p>Unclosed paragraph<p>Another<div>Nested",
+    'title_and_blank_runs': "<html><head><title>Subject</title></head><body>\n\n\n<p>Body</p>\n\n\n</body></html>",
+}
+
+@requires_lxml
+@pytest.mark.parametrize('fixture_name', sorted(HTML_FIXTURES))
+def test_lxml_backend_matches_html_parser(fixture_name):
+    html_body = HTML_FIXTURES[fixture_name]
+    assert normalize_text(html_to_text_lxml(html_body)) == normalize_text(html_to_text_bs4(html_body))
+
+@pytest.mark.parametrize('html_to_text', [pytest.param(html_to_text_lxml, marks=requires_lxml), html_to_text_bs4])
+@pytest.mark.parametrize('fixture_name, hidden, visible', [
+    ('script_and_style', ("color", "var a", "track"), ("Visible", "after script")),
+    ('template', ("Hidden", "markup", "hidden text"), ("Before", "after template", "After")),
+    ('comments', ("dropped",), ("Kept", "text")),
+])
+def test_script_style_template_and_comment_content_is_skipped(html_to_text, fixture_name, hidden, visible):
+    text = html_to_text(HTML_FIXTURES[fixture_name])
+    for hidden_text in hidden:
+        assert hidden_text not in text
+    for visible_text in visible:
+        assert visible_text in text
+
+def test_normalize_text_keeps_paragraph_breaks():
+    assert normalize_text("\n A \n\n\n B\nC \n\n") == ['A', '', 'B', 'C']
+    assert normalize_text("A\nB") != normalize_text("A\n\nB")
+
+def test_body_is_split_on_blank_lines():
+    body = "Dear families,\n\n  \nThe field trip is Friday.\nBring a lunch.\n\n\nThanks\n"
+    assert split_body_paragraphs(body) == ["Dear families,", "The field trip is Friday.\nBring a lunch.", "Thanks"]
+
+def test_long_blocks_are_cut_at_line_then_word_boundaries():
+    lines = "\n".join(f"Line {i:02d}" for i in range(10))
+    assert split_body_paragraphs(lines, max_chars=20) == [
+        "Line 00\nLine 01", "Line 02\nLine 03", "Line 04\nLine 05", "Line 06\nLine 07", "Line 08\nLine 09"]
+    words = " ".join(["word"] * 10)
+    pieces = split_body_paragraphs(words, max_chars=12)
+    assert all(len(piece) <= 12 for piece in pieces)
+    assert " ".join(piece.strip() for piece in pieces) == words
+    assert split_body_paragraphs("x" * 25, max_chars=10) == ["x" * 10, "x" * 10, "x" * 5]
+
+MBOX_BYTES = (b"From alice@example.com Mon Oct  5 09:00:00 2026\n"
+              b"From: alice@example.com\nSubject: First\nMessage-ID: <1@example.com>\n"
+              b"Date: Mon, 05 Oct 2026 09:00:00 +0000\n\n"
+              b"Hello\n>From the office\n>>From a quoted reply\n> From is not escaped here\n\n"
+              b"From bob@example.com Mon Oct  5 08:00:00 2026\n"
+              b"From: bob@example.com\nSubject: Second\nMessage-ID: <2@example.com>\n"
+              b"Date: Mon, 05 Oct 2026 08:00:00 +0000\n\nBye\n")
+
+def write_message(path, subject, message_id):
+    path.write_bytes(f"From: a@example.com\nSubject: {subject}\nMessage-ID: <{message_id}>\n\nBody\n".encode())
+
+def test_mbox_messages_are_split_on_from_lines_and_unescaped(tmp_path):
+    mbox_path = tmp_path / "export.mbox"
+    mbox_path.write_bytes(MBOX_BYTES)
+    message_refs = list_messages(str(mbox_path))
+    assert [ref[0] for ref in message_refs] == ['mbox', 'mbox']
+
+    first_message = read_message_bytes(message_refs[0])
+    assert first_message.startswith(b"From: alice@example.com\n")
+    assert b"\nFrom the office\n>From a quoted reply\n> From is not escaped here\n" in first_message
+    assert read_message_bytes(message_refs[1]).endswith(b"\n\nBye\n")
+
+def test_mbox_headers_are_read_without_the_separator_line(tmp_path):
+    mbox_path = tmp_path / "export.mbox"
+    mbox_path.write_bytes(MBOX_BYTES)
+    mapped_files = {}
+    subjects = [read_message_headers(ref, mapped_files)['Subject'] for ref in list_messages(str(mbox_path))]
+    for mapped in mapped_files.values():
+        mapped.close()
+    assert subjects == ['First', 'Second']
+
+def test_mbox_messages_are_deduplicated_and_sorted_by_date(tmp_path):
+    mbox_path = tmp_path / "export.mbox"
+    mbox_path.write_bytes(MBOX_BYTES + MBOX_BYTES.split(b"\n\nFrom bob", 1)[0] + b"\n")
+    ordered_refs, duplicate_count = order_messages(list_messages(str(mbox_path)))
+    assert duplicate_count == 1
+    assert [read_message_headers(ref, {})['Subject'] for ref in ordered_refs] == ['Second', 'First']
+
+def test_undated_messages_follow_the_dated_ones_in_listing_order(tmp_path):
+    (tmp_path / "a.eml").write_text("Subject: Undated A\nMessage-ID: <a@example.com>\n\nBody\n")
+    (tmp_path / "b.eml").write_text("Subject: Late\nMessage-ID: <b@example.com>\n"
+                                    "Date: Tue, 06 Oct 2026 09:00:00 +0000\n\nBody\n")
+    (tmp_path / "c.eml").write_text("Subject: Undated C\nDate: not a date\n\nBody\n")
+    (tmp_path / "d.eml").write_text("Subject: Early\nMessage-ID: <d@example.com>\n"
+                                    "Date: Mon, 05 Oct 2026 09:00:00 -0400\n\nBody\n")
+    (tmp_path / "e.eml").write_text("Subject: Late again\nMessage-ID: <b@example.com>\n\nBody\n")
+    (tmp_path / "f.eml").write_text("")
+    ordered_refs, duplicate_count = order_messages(list_messages(str(tmp_path)))
+    assert duplicate_count == 1
+    assert [os.path.basename(ref[1]) for ref in ordered_refs] == ['d.eml', 'b.eml', 'a.eml', 'c.eml', 'f.eml']
+
+@pytest.mark.parametrize('subfolders', [('cur', 'new'), ('cur',), ('new',)])
+def test_maildir_is_detected_with_either_subfolder(tmp_path, subfolders):
+    for subfolder in subfolders:
+        (tmp_path / subfolder).mkdir()
+        write_message(tmp_path / subfolder / f"1700000000.{subfolder}.host", subfolder, f"{subfolder}@example.com")
+    (tmp_path / subfolders[0] / ".hidden").write_text("not a message")
+    assert detect_input_format(str(tmp_path)) == 'maildir'
+    message_paths = [ref[1] for ref in list_messages(str(tmp_path))]
+    assert sorted(os.path.basename(os.path.dirname(path)) for path in message_paths) == sorted(subfolders)
+
+def test_folder_of_eml_files_lists_only_eml_files(tmp_path):
+    write_message(tmp_path / "b.eml", "B", "b@example.com")
+    write_message(tmp_path / "a.EML", "A", "a@example.com")
+    (tmp_path / "notes.txt").write_text("not a message")
+    assert detect_input_format(str(tmp_path)) == 'folder'
+    assert [os.path.basename(ref[1]) for ref in list_messages(str(tmp_path))] == ['a.EML', 'b.eml']
+
+def test_headless_cli_converts_an_mbox(tmp_path, monkeypatch):
+    mbox_path = tmp_path / "export.mbox"
+    mbox_path.write_bytes(MBOX_BYTES)
+    output_path = tmp_path / "merged.pdf"
+    monkeypatch.setattr(sys, 'argv', ["eml_merger.py", str(mbox_path), "-o", str(output_path), "--workers", "1"])
+    assert eml_merger_main() == 0
+    assert len(PdfReader(str(output_path)).pages) >= 1
+
+def write_eml(folder, number):
+    (folder / f"email_{number:02d}.eml").write_text(
+        f"From: sender{number}@example.com\nTo: office@example.com\nSubject: Message {number}\n"
+        f"Message-ID: <{number}@example.com>\nDate: Mon, 05 Oct 2026 09:{number:02d}:00 +0000\n\n"
+        f"Body of message {number}.\n")
+
+def pdf_text(pdf_path):
+    return "\n".join(page.extract_text() for page in PdfReader(str(pdf_path)).pages)
+
+def test_chunks_are_concatenated_in_order_with_continuous_numbering(tmp_path):
+    eml_folder = tmp_path / "emails"
+    eml_folder.mkdir()
+    for number in range(1, 6):
+        write_eml(eml_folder, number)
+    pdf_file_path = str(tmp_path / "merged.pdf")
+
+    result = convert_messages(list_eml_folder(str(eml_folder)), pdf_file_path, emails_per_chunk=2, workers=1,
+                              use_cache=False)
+    assert result['failed_chunks'] == []
+    assert result['chunks'] == 3
+    text = pdf_text(pdf_file_path)
+    title_positions = [text.index(f"Email {number}: Message {number}") for number in range(1, 6)]
+    assert title_positions == sorted(title_positions)
+    assert "Body of message 5." in text
+    assert not os.path.exists(result['chunk_folder'])
+
+def test_small_folders_are_spread_over_every_worker():
+    assert get_chunk_size(12, 200, 4) == 3
+    assert get_chunk_size(2000, 200, 4) == 200
+    assert get_chunk_size(3, 200, 8) == 1
+    # With the cache the size only changes when the folder doubles
+    assert [get_chunk_size(count, 200, 4, stable_boundaries=True) for count in (12, 13, 20, 28, 29)] == [2, 4, 4, 4, 8]
+    assert get_chunk_size(2000, 200, 4, stable_boundaries=True) == 200
+
+def test_cached_conversion_of_a_small_folder_uses_every_worker(tmp_path):
+    eml_folder = tmp_path / "emails"
+    eml_folder.mkdir()
+    for number in range(1, 7):
+        write_eml(eml_folder, number)
+    pdf_file_path = str(tmp_path / "merged.pdf")
+
+    first_run = convert_messages(list_eml_folder(str(eml_folder)), pdf_file_path, workers=3)
+    assert first_run['failed_chunks'] == []
+    assert (first_run['chunks'], first_run['cached_chunks']) == (3, 0)
+
+    write_eml(eml_folder, 7)
+    second_run = convert_messages(list_eml_folder(str(eml_folder)), pdf_file_path, workers=3)
+    assert (second_run['chunks'], second_run['cached_chunks']) == (4, 3)
+    assert "Email 7: Message 7" in pdf_text(pdf_file_path)
+
+def test_chunk_cache_path_depends_on_position_and_content(tmp_path):
+    cache_dir = str(tmp_path)
+    path = get_chunk_cache_path(cache_dir, 1, ['a', 'b'], 'lxml')
+    assert path == get_chunk_cache_path(cache_dir, 1, ['a', 'b'], 'lxml')
+    assert path != get_chunk_cache_path(cache_dir, 3, ['a', 'b'], 'lxml')
+    assert path != get_chunk_cache_path(cache_dir, 1, ['a', 'c'], 'lxml')
+    assert path != get_chunk_cache_path(cache_dir, 1, ['a', 'b'], 'html.parser')
+
+def make_eml_folder(tmp_path, name, count):
+    eml_folder = tmp_path / name
+    eml_folder.mkdir()
+    for number in range(1, count + 1):
+        write_eml(eml_folder, number)
+    return eml_folder
+
+def cached_chunk_files(pdf_file_path, eml_folder):
+    return os.listdir(os.path.join(get_cache_dir(pdf_file_path, str(eml_folder)), "chunks"))
+
+def test_adding_an_email_reuses_the_chunks_before_it(tmp_path):
+    eml_folder = make_eml_folder(tmp_path, "emails", 5)
+    pdf_file_path = str(tmp_path / "merged.pdf")
+
+    first_run = convert_messages(list_eml_folder(str(eml_folder)), pdf_file_path, emails_per_chunk=2, workers=1,
+                                 source_path=str(eml_folder))
+    assert first_run['failed_chunks'] == []
+    assert (first_run['chunks'], first_run['cached_chunks']) == (3, 0)
+
+    # Chunk boundaries stay at emails 1-2, 3-4, 5-6: only the last chunk changes
+    write_eml(eml_folder, 6)
+    second_run = convert_messages(list_eml_folder(str(eml_folder)), pdf_file_path, emails_per_chunk=2, workers=1,
+                                  source_path=str(eml_folder))
+    assert second_run['failed_chunks'] == []
+    assert (second_run['chunks'], second_run['cached_chunks']) == (3, 2)
+    assert "Email 6: Message 6" in pdf_text(pdf_file_path)
+
+    # The replaced chunk is pruned after the complete run
+    assert len(cached_chunk_files(pdf_file_path, eml_folder)) == 3
+
+def test_inputs_converted_into_the_same_folder_keep_their_own_cache(tmp_path):
+    office_folder = make_eml_folder(tmp_path, "office", 4)
+    counselor_folder = make_eml_folder(tmp_path, "counselor", 3)
+    office_pdf = str(tmp_path / "office.pdf")
+    counselor_pdf = str(tmp_path / "counselor.pdf")
+
+    convert_messages(list_eml_folder(str(office_folder)), office_pdf, emails_per_chunk=2, workers=1)
+    convert_messages(list_eml_folder(str(counselor_folder)), counselor_pdf, emails_per_chunk=2, workers=1)
+    assert len(os.listdir(tmp_path / EML_CACHE_DIR)) == 2
+    assert len(cached_chunk_files(office_pdf, office_folder)) == 2
+
+    rerun = convert_messages(list_eml_folder(str(office_folder)), office_pdf, emails_per_chunk=2, workers=1)
+    assert (rerun['chunks'], rerun['cached_chunks']) == (2, 2)
+
+def test_without_the_cache_nothing_is_left_behind(tmp_path):
+    eml_folder = make_eml_folder(tmp_path, "emails", 3)
+    pdf_file_path = str(tmp_path / "merged.pdf")
+
+    result = convert_messages(list_eml_folder(str(eml_folder)), pdf_file_path, emails_per_chunk=2, workers=1,
+                              use_cache=False)
+    assert result['cached_chunks'] == 0
+    assert os.path.exists(pdf_file_path)
+    assert not os.path.exists(tmp_path / EML_CACHE_DIR)
+    assert not os.path.exists(result['chunk_folder'])
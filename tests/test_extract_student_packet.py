@@ -0,0 +1,58 @@
+import sys
+
+from pypdf import PdfReader
+
+from pdf_helpers import ID_PATTERNS, ednovate_page, grade_page, write_manifest, write_text_pdf
+import extract_student_packet
+from student_pdf_join import STUDENT_INDEX_FILENAME, load_manifest, run_manifest
+
+def merge_grade_job(tmp_path):
+    """Merges two students' Ednovate and grade pages and returns the written student index path."""
+    write_text_pdf(tmp_path / "ednovate.pdf", [ednovate_page('10001', 'Ann Lee', 'Smith'),
+                                                ednovate_page('10002', 'Bo Diaz', 'Jones')])
+    write_text_pdf(tmp_path / "grade_10.pdf", [grade_page('10001'), grade_page('10002')])
+    manifest_path = write_manifest(
+        tmp_path,
+        {'ednovate': dict(ID_PATTERNS['ednovate'], path="ednovate.pdf"),
+         'grade_10': dict(ID_PATTERNS['grade'], path="grade_10.pdf")},
+        [{'name': 'grade_10', 'output_dir': 'out', 'page_order': ['ednovate', 'grade_10'], 'naming_source': 'ednovate'}],
+    )
+    run_manifest(load_manifest(manifest_path))
+    return tmp_path / "out" / STUDENT_INDEX_FILENAME
+
+def run_cli(monkeypatch, *args):
+    monkeypatch.setattr(sys, 'argv', ["extract_student_packet.py", *args])
+    return extract_student_packet.main()
+
+def page_texts(pdf_path):
+    return [page.extract_text() for page in PdfReader(str(pdf_path)).pages]
+
+def test_student_packet_has_that_students_pages_in_job_order(tmp_path, monkeypatch):
+    index_path = merge_grade_job(tmp_path)
+    packet_path = tmp_path / "packet.pdf"
+    assert run_cli(monkeypatch, str(index_path), "--student", "10002", "--verify", "-o", str(packet_path)) == 0
+    texts = page_texts(packet_path)
+    assert len(texts) == 2
+    assert "Bo Diaz" in texts[0]
+    assert "Student ID: 10002" in texts[1] and "Course grades" in texts[1]
+
+def test_advisor_packet_defaults_to_the_advisor_name(tmp_path, monkeypatch):
+    index_path = merge_grade_job(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    assert run_cli(monkeypatch, str(index_path), "--advisor", "smith") == 0
+    texts = page_texts(tmp_path / "Smith.pdf")
+    assert len(texts) == 2
+    assert "Ann Lee" in texts[0]
+
+def test_unknown_student_is_an_error(tmp_path, monkeypatch, capsys):
+    index_path = merge_grade_job(tmp_path)
+    assert run_cli(monkeypatch, str(index_path), "--student", "99999") == 1
+    assert "No merged students found for student ID '99999'" in capsys.readouterr().out
+
+def test_verify_refuses_a_changed_source(tmp_path, monkeypatch, capsys):
+    index_path = merge_grade_job(tmp_path)
+    write_text_pdf(tmp_path / "grade_10.pdf", [grade_page('10002'), grade_page('10001')])
+    packet_path = tmp_path / "packet.pdf"
+    assert run_cli(monkeypatch, str(index_path), "--student", "10001", "--verify", "-o", str(packet_path)) == 1
+    assert "content changed since the index was written" in capsys.readouterr().out
+    assert not packet_path.exists()
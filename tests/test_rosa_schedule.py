@@ -0,0 +1,86 @@
+import math
+from datetime import date
+
+import numpy as np
+import pytest
+
+from rosa_schedule import CompiledSchedule, compile_schedule_book, load_schedule_book, parse_time_to_minutes
+
+PERIOD_ROWS = [
+    {'id': 'AMA', 'name': 'AM Advisory', 'start': '08:30 AM', 'end': '09:05 AM', 'cb_prefix': 'cb7'},
+    {'id': 'P1', 'name': 'Period 1', 'start': '09:10 AM', 'end': '10:12 AM', 'cb_prefix': 'cb1'},
+    {'id': 'P2', 'name': 'Period 2', 'start': '10:17 AM', 'end': '11:19 AM', 'cb_prefix': 'cb2'},
+]
+
+@pytest.fixture
+def schedule():
+    return CompiledSchedule('test', PERIOD_ROWS)
+
+def minute(time_str):
+    return parse_time_to_minutes(time_str)
+
+@pytest.mark.parametrize('time_str, period_id', [
+    ('08:29 AM', None),
+    ('08:30 AM', 'AMA'),
+    ('09:04 AM', 'AMA'),
+    ('09:05 AM', None),   # passing period
+    ('09:10 AM', 'P1'),
+    ('11:18 AM', 'P2'),
+    ('11:19 AM', None),   # after the last period
+])
+def test_period_at(schedule, time_str, period_id):
+    period = schedule.period_at(minute(time_str))
+    assert (period['id'] if period else None) == period_id
+
+def test_period_at_on_an_empty_schedule():
+    assert CompiledSchedule('none', []).period_at(minute('09:00 AM')) is None
+
+def test_bin_late_arrivals(schedule):
+    seconds_of_day = [
+        minute('08:29 AM') * 60,        # before the day starts
+        minute('08:30 AM') * 60,        # AMA
+        minute('09:05 AM') * 60,        # end of AMA is still AMA's window
+        minute('09:05 AM') * 60 + 1,    # passing period counts toward P1
+        minute('10:12 AM') * 60,        # P1
+        minute('11:00 AM') * 60,        # P2
+        minute('11:19 AM') * 60 + 1,    # after the last period
+        math.nan,                       # missing sign-in time
+    ]
+    assert schedule.bin_late_arrivals(seconds_of_day).tolist() == [-1, 0, 0, 1, 1, 2, -1, -1]
+
+def test_bin_late_arrivals_matches_late_arrival_period_at(schedule):
+    seconds_of_day = np.arange(minute('08:00 AM') * 60, minute('11:30 AM') * 60, 60)
+    expected = []
+    for seconds in seconds_of_day:
+        period = schedule.late_arrival_period_at(seconds // 60)
+        expected.append(period['index'] if period else -1)
+    assert schedule.bin_late_arrivals(seconds_of_day).tolist() == expected
+
+def test_bin_late_arrivals_on_an_empty_schedule():
+    assert CompiledSchedule('none', []).bin_late_arrivals([minute('09:00 AM') * 60]).tolist() == [-1]
+
+def test_overlapping_periods_are_rejected():
+    rows = [PERIOD_ROWS[0], dict(PERIOD_ROWS[1], start='09:00 AM')]
+    with pytest.raises(ValueError):
+        CompiledSchedule('overlap', rows)
+
+def test_calendar_picks_date_overrides_then_weekday_defaults():
+    book = compile_schedule_book({
+        'schedules': {'normal': PERIOD_ROWS, 'enrichment': PERIOD_ROWS[:2]},
+        'weekdays': {'M': 'normal', 'F': 'enrichment'},
+        'dates': {'2026-10-19': 'none'},
+    })
+    assert book.schedule_name_for_date(date(2026, 10, 19)) == 'none'         # Monday, overridden
+    assert book.schedule_name_for_date(date(2026, 10, 26)) == 'normal'       # Monday
+    assert book.schedule_name_for_date(date(2026, 10, 23)) == 'enrichment'   # Friday
+    assert book.schedule_name_for_date(date(2026, 10, 20)) == 'none'         # Tuesday, no default
+    assert book.schedule_name_for_date(date(2026, 10, 24)) == 'none'         # Saturday
+    assert len(book.schedule_for_date(date(2026, 10, 23))) == 2
+
+def test_unknown_schedule_names_are_rejected():
+    with pytest.raises(ValueError):
+        compile_schedule_book({'schedules': {'normal': PERIOD_ROWS}, 'weekdays': {'M': 'holiday'}})
+
+def test_the_shipped_schedule_file_compiles():
+    book = load_schedule_book()
+    assert {'normal', 'enrichment', 'friday', 'special', 'none'} <= set(book.schedules)
@@ -0,0 +1,68 @@
+import json
+from datetime import date, datetime
+
+import pytest
+
+pytest.importorskip("selenium")
+pytest.importorskip("webdriver_manager")
+pytest.importorskip("pandas")
+
+import rosa_scheduler  # noqa: E402
+from rosa_schedule import load_schedule_book  # noqa: E402
+
+SCHOOL_DAY = date(2026, 10, 19)  # A Monday on the 'normal' schedule
+
+class FakePeriodRuns:
+    """Stands in for rosa.automate_raptor_and_powerschool; fails each period a set number of times."""
+
+    def __init__(self, monkeypatch, failures=None, now=datetime(2026, 10, 19, 6, 0)):
+        self.calls = []
+        self.failures_left = dict(failures or {})
+        monkeypatch.setattr(rosa_scheduler.rosa, 'automate_raptor_and_powerschool', self.run_period)
+        monkeypatch.setattr(rosa_scheduler, 'sleep_until', lambda target_time: None)
+        monkeypatch.setattr(rosa_scheduler, 'datetime', type('FakeDatetime', (datetime,), {
+            'now': classmethod(lambda cls: now)}))
+
+    def run_period(self, period_obj, *args, **kwargs):
+        self.calls.append(period_obj['id'])
+        if self.failures_left.get(period_obj['id'], 0):
+            self.failures_left[period_obj['id']] -= 1
+            return {'completed': False}
+        return {'completed': True}
+
+def run_school_day(state_path, catch_up=False):
+    rosa_scheduler.run_day(load_schedule_book(), SCHOOL_DAY, str(state_path), catch_up=catch_up)
+
+def read_state(state_path):
+    with open(state_path) as f:
+        return json.load(f)[SCHOOL_DAY.strftime("%Y-%m-%d")]
+
+def test_a_failed_period_is_retried_until_it_completes(tmp_path, monkeypatch):
+    state_path = tmp_path / "state.json"
+    runs = FakePeriodRuns(monkeypatch, failures={'P1': 2})
+    run_school_day(state_path)
+    assert runs.calls == ['AMA', 'P1', 'P1', 'P1', 'P2', 'P3', 'P4', 'P5', 'PMA']
+    assert read_state(state_path) == {'completed': ['AMA', 'P1', 'P2', 'P3', 'P4', 'P5', 'PMA'], 'failed_attempts': {}}
+
+def test_retries_stop_at_the_attempt_limit_and_survive_a_restart(tmp_path, monkeypatch, capsys):
+    state_path = tmp_path / "state.json"
+    runs = FakePeriodRuns(monkeypatch, failures={'P2': 10})
+    run_school_day(state_path)
+    assert runs.calls.count('P2') == rosa_scheduler.PERIOD_ATTEMPT_LIMIT
+    assert read_state(state_path)['failed_attempts'] == {'P2': rosa_scheduler.PERIOD_ATTEMPT_LIMIT}
+
+    restarted_runs = FakePeriodRuns(monkeypatch, failures={'P2': 10})
+    run_school_day(state_path)
+    assert restarted_runs.calls == []
+    output = capsys.readouterr().out
+    assert f"Earlier failed runs today: Period 2 (Normal) ({rosa_scheduler.PERIOD_ATTEMPT_LIMIT} of" in output
+    assert "Not retrying Period 2" in output
+
+def test_a_restart_retries_an_earlier_failure_even_after_its_window(tmp_path, monkeypatch):
+    state_path = tmp_path / "state.json"
+    rosa_scheduler.save_scheduler_state(str(state_path), SCHOOL_DAY, {'AMA'}, {'P1': 1})
+    # Late in the day: every other period's window closed long ago
+    runs = FakePeriodRuns(monkeypatch, now=datetime(2026, 10, 19, 20, 0))
+    run_school_day(state_path)
+    assert runs.calls == ['P1']
+    assert read_state(state_path) == {'completed': ['AMA', 'P1'], 'failed_attempts': {}}
@@ -0,0 +1,64 @@
+import csv
+import json
+import time
+
+import rosa_timing
+from rosa_timing import percentile, summarize_step_history, timed_run, timed_step
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 21))
+    assert percentile(values, 0.50) == 10
+    assert percentile(values, 0.95) == 19
+    assert percentile([7], 0.95) == 7
+
+def test_nested_steps_record_total_and_self_time(tmp_path):
+    with timed_run("period", timing_dir=str(tmp_path)):
+        with timed_step("mark_au"):
+            time.sleep(0.01)
+            with timed_step("review_wait"):
+                time.sleep(0.05)
+    report_path = next(tmp_path.glob("run_*_period.json"))
+    steps = {step['step']: step for step in json.loads(report_path.read_text())['steps']}
+    assert [step['depth'] for step in (steps['period'], steps['mark_au'], steps['review_wait'])] == [0, 1, 2]
+    # The review prompt's time counts towards the marking step's total, not its self time
+    assert steps['mark_au']['seconds'] >= steps['review_wait']['seconds'] >= 0.05
+    assert steps['mark_au']['self_seconds'] < 0.05
+    assert all(step['ok'] for step in steps.values())
+
+def test_steps_outside_a_run_are_not_recorded(tmp_path):
+    with timed_step("parse"):
+        pass
+    assert rosa_timing._current_run is None
+    assert list(tmp_path.iterdir()) == []
+
+def test_an_inner_operation_is_folded_into_the_outer_run(tmp_path):
+    with timed_run("eod", timing_dir=str(tmp_path)):
+        with timed_run("consolidate", timing_dir=str(tmp_path)):
+            pass
+    assert len(list(tmp_path.glob("run_*.json"))) == 1
+    report = json.loads(next(tmp_path.glob("run_*.json")).read_text())
+    assert [step['step'] for step in report['steps']] == ['eod', 'consolidate']
+
+def test_a_failed_step_is_marked_and_left_out_of_the_summary(tmp_path):
+    try:
+        with timed_run("period", timing_dir=str(tmp_path)):
+            with timed_step("export"):
+                raise RuntimeError("Raptor did not load")
+    except RuntimeError:
+        pass
+    summary = json.loads((tmp_path / rosa_timing.SUMMARY_FILE).read_text())
+    assert 'export' not in summary['period']
+
+def write_history(history_path, run_seconds):
+    with open(history_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['run_id', 'operation', 'step', 'seconds', 'self_seconds', 'ok'])
+        for number, seconds in enumerate(run_seconds):
+            writer.writerow([f"run{number}", 'period', 'export', seconds, seconds, True])
+
+def test_summary_covers_only_the_most_recent_runs(tmp_path):
+    history_path = tmp_path / rosa_timing.STEP_HISTORY_FILE
+    write_history(history_path, [100.0] * 5 + [float(seconds) for seconds in range(1, 11)])
+    export_summary = summarize_step_history(str(history_path), runs=10)['period']['export']
+    assert export_summary['count'] == 10
+    assert (export_summary['p50_seconds'], export_summary['p95_seconds'], export_summary['max_seconds']) == (5, 10, 10)
@@ -0,0 +1,162 @@
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("selenium")
+pytest.importorskip("webdriver_manager")
+pd = pytest.importorskip("pandas")
+
+import rosa_v_0_3 as rosa  # noqa: E402
+from rosa_schedule import load_schedule_book  # noqa: E402
+
+class FakeDriver:
+    def quit(self):
+        pass
+
+class FakeBrowserSteps:
+    """Stands in for the Raptor and PowerSchool browser steps; records which ones ran."""
+
+    def __init__(self, monkeypatch, fail_steps=()):
+        self.calls = []
+        self.fail_steps = set(fail_steps)
+        self.master_reports = []
+        monkeypatch.setattr(rosa, 'load_credentials', lambda path, service: ('user', 'password'))
+        monkeypatch.setattr(rosa, 'setup_webdriver', lambda *args, **kwargs: (FakeDriver(), None))
+        monkeypatch.setattr(rosa, 'export_raptor_report', self.export)
+        monkeypatch.setattr(rosa, 'parse_raptor_report', self.parse)
+        monkeypatch.setattr(rosa, 'update_daily_master_report', self.persist)
+        monkeypatch.setattr(rosa, 'select_students_for_mass_update', self.select)
+        monkeypatch.setattr(rosa, 'mark_periods_au', lambda *args: self.calls.append('mark_au'))
+        monkeypatch.setattr(rosa, 'mark_period_ul', lambda *args: self.calls.append('mark_ul'))
+
+    def export(self, *args):
+        self.calls.append('export')
+        return os.path.abspath("raptor_export.xlsx")
+
+    def parse(self, *args):
+        self.calls.append('parse')
+        students = pd.DataFrame({'ID Number': ['10001', '10002'], 'Full Name': ['Ann Lee', 'Bo Diaz'],
+                                 'Date/Time': pd.to_datetime(['2026-10-19 10:20', '2026-10-19 10:31'])})
+        return ['10001', '10002'], students
+
+    def persist(self, students, report_date):
+        self.calls.append('persist')
+        self.master_reports.append(students)
+        return None if 'persist' in self.fail_steps else os.path.abspath("master.xlsx")
+
+    def select(self, *args):
+        self.calls.append('select')
+        return 'select' not in self.fail_steps
+
+def run_period_p2():
+    periods = load_schedule_book().schedules['normal']
+    p2 = periods[periods.period_index('P2')]
+    return rosa.automate_raptor_and_powerschool(p2, periods, "10:12 AM", "11:19 AM", auto_confirm=True, headless=True)
+
+def checkpoint_files():
+    if not os.path.isdir(rosa.CHECKPOINTS_DIR):
+        return []
+    return os.listdir(rosa.CHECKPOINTS_DIR)
+
+def test_a_failed_run_resumes_from_the_failed_stage(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first_steps = FakeBrowserSteps(monkeypatch, fail_steps=['select'])
+    first_result = run_period_p2()
+    assert not first_result['completed']
+    assert first_result['failed_stage'] == 'select'
+    assert first_steps.calls == ['export', 'parse', 'persist', 'select']
+    assert len(checkpoint_files()) == 1
+
+    second_steps = FakeBrowserSteps(monkeypatch)
+    second_result = run_period_p2()
+    assert second_result['completed']
+    assert second_result['resumed_from'] == 'select'
+    assert second_steps.calls == ['select', 'mark_au', 'mark_ul']
+    assert second_result['student_ids'] == ['10001', '10002']
+    assert second_result['au_period_ids'] == ['AMA', 'P1']
+    assert checkpoint_files() == []
+
+def test_a_resumed_persist_rebuilds_the_students_from_the_checkpoint(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first_steps = FakeBrowserSteps(monkeypatch, fail_steps=['persist'])
+    assert run_period_p2()['failed_stage'] == 'persist'
+    written_in_first_run = first_steps.master_reports[0]
+
+    second_steps = FakeBrowserSteps(monkeypatch)
+    second_result = run_period_p2()
+    assert second_result['completed']
+    assert second_steps.calls == ['persist', 'select', 'mark_au', 'mark_ul']
+    rebuilt = second_steps.master_reports[0]
+    assert rebuilt['ID Number'].tolist() == written_in_first_run['ID Number'].tolist()
+    assert rebuilt['Full Name'].tolist() == written_in_first_run['Full Name'].tolist()
+    assert (pd.to_datetime(rebuilt['Date/Time']).tolist()
+            == pd.to_datetime(written_in_first_run['Date/Time']).tolist())
+
+def test_a_fresh_run_ignores_the_checkpoint(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    FakeBrowserSteps(monkeypatch, fail_steps=['select'])
+    run_period_p2()
+
+    steps = FakeBrowserSteps(monkeypatch)
+    periods = load_schedule_book().schedules['normal']
+    p2 = periods[periods.period_index('P2')]
+    result = rosa.automate_raptor_and_powerschool(p2, periods, "10:12 AM", "11:19 AM", auto_confirm=True,
+                                                  headless=True, resume=False)
+    assert result['completed']
+    assert result['resumed_from'] is None
+    assert steps.calls == ['export', 'parse', 'persist', 'select', 'mark_au', 'mark_ul']
+
+class RecordedPeriodRun:
+    """Replaces the period run behind the 'period' subcommand and records how it was called."""
+
+    def __init__(self, monkeypatch, now=None):
+        self.calls = []
+        monkeypatch.setattr(rosa, 'automate_raptor_and_powerschool', self.run_period)
+        if now is not None:
+            monkeypatch.setattr(rosa, 'datetime', type('FakeDatetime', (rosa.datetime,), {
+                'now': classmethod(lambda cls: now)}))
+
+    def run_period(self, selected_period, all_periods_for_day, filter_start, filter_end, **kwargs):
+        self.calls.append((selected_period['id'], all_periods_for_day.name, filter_start, filter_end, kwargs))
+        return {'operation': 'period', 'period_id': selected_period['id'], 'completed': True}
+
+def test_period_cli_prints_only_the_result_json_on_stdout(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    runs = RecordedPeriodRun(monkeypatch)
+    assert rosa.main(["period", "--day", "M", "--period", "P2", "--yes", "--headless", "--json"]) == 0
+    assert runs.calls == [('P2', 'normal', "10:12 AM", "11:19 AM",
+                           {'auto_confirm': True, 'headless': True, 'resume': True})]
+    result = json.loads(capsys.readouterr().out)
+    assert result['period_id'] == 'P2' and result['completed']
+    assert 'elapsed_seconds' in result
+
+def test_period_cli_accepts_menu_numbers_and_fresh_runs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    runs = RecordedPeriodRun(monkeypatch)
+    assert rosa.main(["period", "--day", "T", "--schedule", "enrichment", "--period", "8", "--fresh"]) == 0
+    period_id, schedule_name, _, _, kwargs = runs.calls[0]
+    assert (period_id, schedule_name) == ('PMA', 'enrichment')
+    assert kwargs == {'auto_confirm': False, 'headless': False, 'resume': False}
+
+def test_period_cli_defaults_to_the_window_open_now(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    runs = RecordedPeriodRun(monkeypatch, now=datetime(2026, 10, 19, 10, 40))
+    assert rosa.main(["period"]) == 0
+    assert runs.calls[0][:2] == ('P2', 'normal')
+
+@pytest.mark.parametrize('argv, message', [
+    (["period", "--day", "S", "--period", "AMA"], "need both a START and an END time"),
+    (["period", "--day", "M", "--period", "P9"], "Unknown period 'P9'"),
+    (["period", "--day", "M", "--period", "P1", "--start", "8 o'clock"], "Invalid time"),
+    (["consolidate", "--min-absences", "0"], "--min-absences must be a positive integer"),
+])
+def test_cli_rejects_bad_choices(tmp_path, monkeypatch, capsys, argv, message):
+    monkeypatch.chdir(tmp_path)
+    runs = RecordedPeriodRun(monkeypatch)
+    with pytest.raises(SystemExit) as exit_info:
+        rosa.main(argv)
+    assert exit_info.value.code == 2
+    assert message in capsys.readouterr().err
+    assert runs.calls == []
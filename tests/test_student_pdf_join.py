@@ -0,0 +1,171 @@
+import json
+import os
+
+from pypdf import PdfReader
+
+from pdf_helpers import ID_PATTERNS, ednovate_page, grade_page, write_manifest, write_text_pdf
+from student_pdf_join import (STUDENT_INDEX_FILENAME, SourceExtractor, extract_header_text, extract_page_range,
+                              finish_pdf_processing, join_on_student_id, load_manifest, run_manifest,
+                              segment_student_pages)
+
+def test_join_yields_every_id_in_student_id_order_with_its_sources():
+    source_data = {
+        'ednovate': {'10003': 'e3', '10001': 'e1', '10002': 'e2'},
+        'grade_10': {'10002': 'g2', '10001': 'g1', '10004': 'g4'},
+    }
+    assert list(join_on_student_id(source_data, ['ednovate', 'grade_10'])) == [
+        ('10001', {'ednovate': 'e1', 'grade_10': 'g1'}),
+        ('10002', {'ednovate': 'e2', 'grade_10': 'g2'}),
+        ('10003', {'ednovate': 'e3'}),
+        ('10004', {'grade_10': 'g4'}),
+    ]
+
+def test_join_only_reads_the_listed_sources():
+    source_data = {'ednovate': {'10001': 'e1'}, 'grade_9': {'10001': 'g9'}, 'grade_10': {'10001': 'g10'}}
+    assert list(join_on_student_id(source_data, ['ednovate', 'grade_10'])) == [
+        ('10001', {'ednovate': 'e1', 'grade_10': 'g10'}),
+    ]
+
+def test_join_of_empty_sources_yields_nothing():
+    assert list(join_on_student_id({'ednovate': {}, 'grade_10': {}}, ['ednovate', 'grade_10'])) == []
+
+def make_grade_job(tmp_path, output_mode='student'):
+    """Two students in an Ednovate PDF and a grade PDF, joined by one job. Returns (manifest_path, output_dir)."""
+    write_text_pdf(tmp_path / "ednovate.pdf", [ednovate_page('10001', 'Ann Lee', 'Smith'),
+                                                ednovate_page('10002', 'Bo Diaz', 'Jones')])
+    write_text_pdf(tmp_path / "grade_10.pdf", [grade_page('10001'), grade_page('10002')])
+    manifest_path = write_manifest(
+        tmp_path,
+        {'ednovate': dict(ID_PATTERNS['ednovate'], path="ednovate.pdf"),
+         'grade_10': dict(ID_PATTERNS['grade'], path="grade_10.pdf")},
+        [{'name': 'grade_10', 'output_dir': 'out', 'page_order': ['ednovate', 'grade_10'], 'naming_source': 'ednovate',
+          'output_mode': output_mode}],
+    )
+    return manifest_path, tmp_path / "out"
+
+def read_index(output_dir):
+    with open(output_dir / STUDENT_INDEX_FILENAME) as f:
+        return sorted(entry['student_id'] for entry in json.load(f)['students'])
+
+def test_a_missing_source_keeps_the_previous_packets_and_index(tmp_path):
+    manifest_path, output_dir = make_grade_job(tmp_path)
+    run_manifest(load_manifest(manifest_path))
+    packets = sorted(str(path.relative_to(output_dir)) for path in output_dir.rglob("*.pdf"))
+    assert packets == ['Jones/Bo Diaz.pdf', 'Smith/Ann Lee.pdf']
+
+    os.remove(tmp_path / "grade_10.pdf")
+    run_manifest(load_manifest(manifest_path))
+    assert sorted(str(path.relative_to(output_dir)) for path in output_dir.rglob("*.pdf")) == packets
+    assert read_index(output_dir) == ['10001', '10002']
+
+def test_a_complete_scan_removes_packets_that_are_no_longer_produced(tmp_path):
+    manifest_path, output_dir = make_grade_job(tmp_path)
+    run_manifest(load_manifest(manifest_path))
+
+    write_text_pdf(tmp_path / "grade_10.pdf", [grade_page('10001')])
+    run_manifest(load_manifest(manifest_path))
+    assert sorted(str(path.relative_to(output_dir)) for path in output_dir.rglob("*.pdf")) == ['Smith/Ann Lee.pdf']
+    assert read_index(output_dir) == ['10001']
+
+def test_bundle_mode_writes_one_pdf_per_advisor_with_a_bookmark_per_student(tmp_path):
+    manifest_path, output_dir = make_grade_job(tmp_path, output_mode='bundle')
+    write_text_pdf(tmp_path / "ednovate.pdf", [ednovate_page('10001', 'Ann Lee', 'Smith'),
+                                                ednovate_page('10002', 'Bo Diaz', 'Jones'),
+                                                ednovate_page('10003', 'Cy Park', 'Smith')])
+    write_text_pdf(tmp_path / "grade_10.pdf", [grade_page('10001'), grade_page('10002'), grade_page('10003')])
+    run_manifest(load_manifest(manifest_path))
+    assert sorted(str(path.relative_to(output_dir)) for path in output_dir.rglob("*.pdf")) == ['Jones.pdf', 'Smith.pdf']
+
+    bundle = PdfReader(str(output_dir / "Smith.pdf"))
+    assert len(bundle.pages) == 4
+    assert [item.title for item in bundle.outline] == ['Ann Lee', 'Cy Park']
+    assert [bundle.get_destination_page_number(item) for item in bundle.outline] == [0, 2]
+    assert "Cy Park" in bundle.pages[2].extract_text()
+    assert read_index(output_dir) == ['10001', '10002', '10003']
+
+def student_page(i, student_id):
+    return (i, {'student_id': student_id}, f"digest{i}", None)
+
+def blank_page(i):
+    return (i, None, f"digest{i}", None)
+
+def error_page(i):
+    return (i, None, None, f"ERROR: page {i+1} could not be read")
+
+def segment(page_results, multi_page=False, page_errors=None):
+    return [(s['info']['student_id'], s['page_indices'])
+            for s in segment_student_pages(page_results, "grades.pdf", "grades", multi_page, page_errors)]
+
+def test_consecutive_pages_with_the_same_id_form_one_segment():
+    pages = [student_page(0, '10001'), student_page(1, '10001'), student_page(2, '10002')]
+    assert segment(pages) == [('10001', [0, 1]), ('10002', [2])]
+
+def test_page_digests_follow_the_page_indices():
+    pages = [student_page(0, '10001'), student_page(1, '10001')]
+    segments = list(segment_student_pages(pages, "grades.pdf", "grades"))
+    assert segments[0]['page_digests'] == ['digest0', 'digest1']
+
+def test_page_without_id_is_skipped_for_single_page_sources():
+    pages = [student_page(0, '10001'), blank_page(1), student_page(2, '10002')]
+    assert segment(pages) == [('10001', [0]), ('10002', [2])]
+
+def test_page_without_id_continues_the_segment_for_multi_page_sources():
+    pages = [student_page(0, '10001'), blank_page(1), student_page(2, '10002'), blank_page(3)]
+    assert segment(pages, multi_page=True) == [('10001', [0, 1]), ('10002', [2, 3])]
+
+def test_leading_page_without_id_is_skipped_for_multi_page_sources():
+    pages = [blank_page(0), student_page(1, '10001')]
+    assert segment(pages, multi_page=True) == [('10001', [1])]
+
+def test_unreadable_page_ends_the_segment_and_is_recorded():
+    page_errors = []
+    pages = [student_page(0, '10001'), error_page(1), blank_page(2), student_page(3, '10001')]
+    # The page after the error can't be attached to 10001: it may belong to the unreadable page's student
+    assert segment(pages, multi_page=True, page_errors=page_errors) == [('10001', [0]), ('10001', [3])]
+    assert page_errors == [1]
+
+def test_segments_split_by_an_unreadable_page_are_combined_into_one_packet():
+    pages = [student_page(0, '10001'), error_page(1), blank_page(2), student_page(3, '10001'), student_page(4, '10002')]
+    segments = list(segment_student_pages(pages, "grades.pdf", "grades", multi_page=True))
+    pending = {'pdf_path': "grades.pdf", 'content_hash': "hash", 'cached_segments': segments}
+    id_to_page_data = finish_pdf_processing(pending)
+    assert id_to_page_data['10001']['page_indices'] == [0, 3]
+    assert id_to_page_data['10001']['page_digests'] == ['digest0', 'digest3']
+    assert id_to_page_data['10002']['page_indices'] == [4]
+    # The cached segments themselves are left as they were
+    assert segments[0]['page_indices'] == [0]
+
+def test_no_pages_yield_no_segments():
+    assert segment([]) == []
+
+def make_ednovate_extractors():
+    rules = ID_PATTERNS['ednovate']
+    return (SourceExtractor('ednovate', rules['id_pattern'], rules['fields']),
+            SourceExtractor('ednovate', rules['id_pattern'], rules['fields'], extraction_mode='header'))
+
+def test_header_mode_finds_the_same_students_as_full_extraction(tmp_path):
+    pdf_path = tmp_path / "ednovate.pdf"
+    write_text_pdf(pdf_path, [
+        ednovate_page('10001', 'Ann Lee', 'Smith') + ["Attendance summary"] * 20,
+        # Header fields low on the page: the header region misses them and the full text is used
+        ["Progress report"] + [""] * 30 + ednovate_page('10002', 'Bo Diaz', 'Jones'),
+        ["Notes without a student ID"],
+    ])
+    full_extractor, header_extractor = make_ednovate_extractors()
+    full_results = extract_page_range(str(pdf_path), full_extractor, 0, 3)
+    header_results = extract_page_range(str(pdf_path), header_extractor, 0, 3)
+    assert header_results == full_results
+    assert [result[1] and result[1]['student_id'] for result in full_results] == ['10001', '10002', None]
+    assert full_results[1][1]['advisor'] == 'Jones'
+
+def test_header_extraction_leaves_the_page_unchanged(tmp_path):
+    pdf_path = tmp_path / "ednovate.pdf"
+    write_text_pdf(pdf_path, [ednovate_page('10001', 'Ann Lee', 'Smith') + [f"Attendance row {i}" for i in range(40)]])
+    page = PdfReader(str(pdf_path)).pages[0]
+    contents_before = page.get_contents().get_data()
+    header_text = extract_header_text(page)
+    assert "10001" in header_text
+    # Only the top of the page is read
+    assert "Attendance row 39" not in header_text
+    assert page.get_contents().get_data() == contents_before
+    assert "Attendance row 39" in page.extract_text()
@@ -0,0 +1,50 @@
+import numpy as np
+
+from voicemail_player import FileSink, NullSink, measure_playback_latency
+
+class StoppingSink(NullSink):
+    """A null sink whose output stream 'stops' after a number of plays."""
+
+    def __init__(self, plays_before_failure):
+        super().__init__()
+        self.plays_left = plays_before_failure
+
+    def play(self, buffer):
+        if not self.plays_left:
+            raise RuntimeError("Playback did not finish within 5.0 s; the output stream stopped (active: False).")
+        self.plays_left -= 1
+        return super().play(buffer)
+
+def silence(frames=2048, channels=2):
+    return np.zeros((frames, channels), dtype='float32')
+
+def test_a_failed_play_ends_the_measurement_with_the_plays_so_far(capsys):
+    sink = StoppingSink(plays_before_failure=2)
+    sink.open(48000, 2)
+    measure_playback_latency(sink, silence(), 5)
+    output = capsys.readouterr().out
+    assert "Play 3 of 5 on null sink failed: Playback did not finish" in output
+    assert "over 2 plays on null sink" in output
+
+def test_a_sink_that_never_plays_is_reported(capsys):
+    sink = StoppingSink(plays_before_failure=0)
+    sink.open(48000, 2)
+    measure_playback_latency(sink, silence(), 3)
+    output = capsys.readouterr().out
+    assert "Play 1 of 3 on null sink failed" in output
+    assert "No playback started." in output
+
+def test_file_sink_writes_every_played_frame(tmp_path):
+    import soundfile as sf
+    buffer = np.random.default_rng(0).uniform(-0.5, 0.5, size=(1000, 2)).astype('float32')
+    sink = FileSink(str(tmp_path / "playback.wav"), blocksize=256)
+    sink.open(48000, 2)
+    sink.play(buffer)
+    sink.play(buffer)
+    sink.close()
+    written, samplerate = sf.read(str(tmp_path / "playback.wav"), dtype='float32', always_2d=True)
+    assert samplerate == 48000
+    # Each play ends on a whole block, padded with silence
+    assert len(written) == 2 * 1024
+    assert np.array_equal(written[:1000], buffer)
+    assert not written[1000:1024].any()